@@ -1,6 +1,8 @@
 # === agent_framework.py ===
 from typing import List, Callable, Awaitable, Optional
 from dataclasses import dataclass
+from run_context import RunContext, run_status
+from tracing import active_trace, start_trace, span, export_trace
 
 @dataclass
 class InputGuardrail:
@@ -13,7 +15,7 @@ class Agent:
             instructions: str,
             handoffs: List["Agent"],
             input_guardrails: Optional[List[InputGuardrail]] = None,
-            handler: Optional[Callable[[str, str], Awaitable[str]]] = None
+            handler: Optional[Callable[..., Awaitable[str]]] = None
     ):
         self.name = name
         self.instructions = instructions
@@ -22,25 +24,44 @@ class Agent:
         self.handler = handler
 
 
-    async def run(self, prompt:str, llm_provider: str) -> str:
-        # 1. Run input guardrails
-        for guardrail in self.input_guardrails:
-            guardrail_result = await guardrail.guardrail_function(prompt, llm_provider)
-            if hasattr(guardrail_result, 'is_test_related') and not guardrail_result.is_test_related:
-                # Fail guardrail: stop and return reasoning
-                return f"[Guardrail Triggered] Input rejected: {guardrail_result.reasoning}"
+    async def run(self, prompt:str, llm_provider: str, run_context: Optional[RunContext] = None) -> str:
+        # The outermost agent owns the run: it creates the workspace and publishes the result
+        if run_context is None:
+            run_context = RunContext.create()
+            result = await self.run(prompt, llm_provider, run_context)
+            run_context.publish(run_status(result), str(result))
+            return result
 
-        # 2. If this agent has a handler, call it directly (leaf agent)
-        if self.handler:
-            return await self.handler(prompt, llm_provider)
+        # One trace per run, exported next to the run's workspace
+        if active_trace() is None:
+            with start_trace("run", run_id=run_context.run_id, llm_provider=llm_provider) as trace:
+                result = await self.run(prompt, llm_provider, run_context)
+            export_trace(trace, run_context.root)
+            return result
 
-        # 3. Otherwise, classify prompt to decide which handoff agent to call
-        chosen_agent = await self.classify_and_select_agent(prompt, llm_provider)
+        with span("agent.run", agent=self.name):
+            # 1. Run input guardrails
+            for guardrail in self.input_guardrails:
+                with span("agent.guardrail", agent=self.name):
+                    guardrail_result = await guardrail.guardrail_function(prompt, llm_provider)
+                if hasattr(guardrail_result, 'is_test_related') and not guardrail_result.is_test_related:
+                    # Fail guardrail: stop and return reasoning
+                    return f"[Guardrail Triggered] Input rejected: {guardrail_result.reasoning}"
 
-        if chosen_agent:
-            return await chosen_agent.run(prompt, llm_provider)
-        else:
-            return "Sorry, I couldnt determine the appropriate agent to handle  your request."
+            # 2. If this agent has a handler, call it directly (leaf agent)
+            if self.handler:
+                with span("agent.handler", agent=self.name):
+                    return await self.handler(prompt, llm_provider, run_context=run_context)
+
+            # 3. Otherwise, classify prompt to decide which handoff agent to call
+            with span("agent.route", agent=self.name) as route_span:
+                chosen_agent = await self.classify_and_select_agent(prompt, llm_provider)
+                route_span.set(chosen=chosen_agent.name if chosen_agent else None)
+
+            if chosen_agent:
+                return await chosen_agent.run(prompt, llm_provider, run_context)
+            else:
+                return "Sorry, I couldnt determine the appropriate agent to handle  your request."
         
     async def classify_and_select_agent(self, prompt: str, llm_provider: str):
         # Compose classification prompt to ask which handoff to use
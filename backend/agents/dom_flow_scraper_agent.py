@@ -4,7 +4,7 @@ import re
 # from tools.scrap_dom import scrape_dom_structure
 from tools.ai_dom_navigator import ai_guided_flow_navigator
 
-async def dom_scraper_handler(prompt : str, llm_provider :str) -> str:
+async def dom_scraper_handler(prompt : str, llm_provider :str, run_context=None) -> str:
     print("[DEBUG] dom_scraper_handler triggered...")
 
     match = re.search(r"(https?://[^\s\"'>]+)", prompt)
@@ -12,7 +12,7 @@ async def dom_scraper_handler(prompt : str, llm_provider :str) -> str:
         return "\n Please provide a valid URL starting with http or https."
     url = match.group(0)
 
-    result = await ai_guided_flow_navigator(url, llm_provider,goal_prompt=prompt)
+    result = await ai_guided_flow_navigator(url, llm_provider,goal_prompt=prompt, run_context=run_context)
     if isinstance(result, dict) and "error" in result:
         print(f"[ERROR] Flow execution issue: {result['error']}")
         return result 
@@ -1,12 +1,19 @@
 # === Executor_agent.py ===
+import asyncio
+import re
 import subprocess
 import shutil
 import os
 from agent_framework import Agent
+from tools.code_validation import validate_framework, describe_failures
+from run_context import workspace_path, emit_progress
+from tracing import span
 
-FRAMEWORK_FOLDER = "framework_output"
+PYTEST_LOG_FILE = "pytest_output.log"
+PYTEST_SUMMARY = re.compile(r"^=+ (.+? in [\d.]+s.*?) =+\s*$", re.MULTILINE)  # e.g. "== 3 passed, 1 failed in 4.2s =="
 
-async def test_executor_fn(prompt: str, llm_provider: str):
+async def test_executor_fn(prompt: str, llm_provider: str, run_context=None):
+    FRAMEWORK_FOLDER = workspace_path(run_context)  # this run's workspace
     try:
         if not os.path.exists(FRAMEWORK_FOLDER):
             return f"No framework found at {FRAMEWORK_FOLDER}"
@@ -25,6 +32,12 @@ async def test_executor_fn(prompt: str, llm_provider: str):
             print("[DEBUG] No conftest.py found in root or tests directory.")
             return "conftest.py not found in root or tests directory."
 
+        # Never launch pytest on a framework that does not import
+        with span("executor.validate"):
+            report = await asyncio.to_thread(validate_framework, FRAMEWORK_FOLDER)
+        if not report["ok"]:
+            return "Framework validation failed, tests were not executed:\n" + describe_failures(report)
+
         # Ensure allure-results directory
         allure_result_path = os.path.join(FRAMEWORK_FOLDER, "allure-results")
         os.makedirs(allure_result_path, exist_ok=True)  # to ensure directory exists
@@ -35,23 +48,35 @@ async def test_executor_fn(prompt: str, llm_provider: str):
             return "pytest is not installed or not found in PATH."
         
         # Run tests
-        result = subprocess.run(
-            [
-                pytest_path, test_folder,
-                "-v", 
-                "--tb=short", 
-                "--maxfail=1",
-                "--disable-warnings",
-                # "--browser=chromium",
-                "--alluredir=allure-results",
-                "-rs"
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            cwd=FRAMEWORK_FOLDER,
-            env=env
-        )
+        with span("executor.pytest", test_folder=test_folder) as pytest_span:
+            # In a thread, so a resident service keeps serving other jobs while pytest runs
+            result = await asyncio.to_thread(
+                subprocess.run,
+                [
+                    pytest_path, test_folder,
+                    "-v", 
+                    "--tb=short", 
+                    "--maxfail=1",
+                    "--disable-warnings",
+                    # "--browser=chromium",
+                    "--alluredir=allure-results",
+                    "-rs"
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                cwd=FRAMEWORK_FOLDER,
+                env=env
+            )
+            pytest_span.set(returncode=result.returncode)
+        # Kept with the run so the results browser can page through it later
+        with open(os.path.join(FRAMEWORK_FOLDER, PYTEST_LOG_FILE), "w", encoding="utf-8") as f:
+            f.write(result.stdout)
+            if result.stderr:
+                f.write("\n--- stderr ---\n" + result.stderr)
+        summaries = PYTEST_SUMMARY.findall(result.stdout)
+        emit_progress(run_context, "test_results", returncode=result.returncode,
+                      summary=summaries[-1] if summaries else None, allure_results=os.path.abspath(allure_result_path))
 
         # Check if Allure is installed
         allure_path = shutil.which("allure")
@@ -2,7 +2,7 @@
 from agent_framework import Agent
 from tools.analyze_test_results import analyze_results
 
-async def test_analyzer_fn(prompt : str, llm_provider: str) -> str:
+async def test_analyzer_fn(prompt : str, llm_provider: str, run_context=None) -> str:
     return await analyze_results(prompt, llm_provider)
 
 test_analyzer_agent = Agent(
@@ -2,11 +2,15 @@
 from agent_framework import Agent
 from agents.dom_flow_scraper_agent import dom_scraper_agent
 from tools.generate_test_scripts import generate_test_scripts
+from tools.framework_orchestrator import build_module_plan, generate_framework_fanout, FANOUT_MIN_PAGES
 # from tools.scrap_dom import scrape_dom_structure
 import re
 import os
 import json
 from agents.executor_agent import test_executor_agent
+from run_context import workspace_path
+from pipeline import Stage, StageGraph
+from tools.step_profile import flow_actions
 
     
 async def summarize_dom(action_log: list) -> str:
@@ -28,15 +32,18 @@ async def summarize_dom(action_log: list) -> str:
 
     return "\n".join(summary_lines)
 
-async def test_script_generator_fn(prompt: str, llm_provider:str)->str:
-    dom_summary = None
-    dom_file_path = os.path.join("framework_output", "actions_log.json")  # changed to action_log file
+def build_generation_pipeline(prompt: str, llm_provider: str, run_context=None) -> StageGraph:
+    """
+    scrape -> (summarize, plan) -> generate -> execute. Unchanged inputs restore a stage
+    from its checkpoint; summarize and plan only depend on the scrape and run concurrently.
+    """
+    workspace = workspace_path(run_context)
+    dom_file_path = os.path.join(workspace, "actions_log.json")  # changed to action_log file
 
-    # Step 1: Extract locators from the page content
-    print("[DEBUG] Extracting DOM context from user flow...")
-    try:
+    async def scrape(outputs):
         # Step 1: Perform DOM scraping using the agent
-        result = await dom_scraper_agent.handler(prompt=prompt, llm_provider=llm_provider)
+        print("[DEBUG] Extracting DOM context from user flow...")
+        result = await dom_scraper_agent.handler(prompt=prompt, llm_provider=llm_provider, run_context=run_context)
         if isinstance(result, dict) and result.get("error"):
             print(f"[ERROR] DOM scraping failed: {result['error']}")
             return f"[ERROR] DOM scraping failed. Cannot generate test framework.\nDetails: {result['error']}"
@@ -50,29 +57,90 @@ async def test_script_generator_fn(prompt: str, llm_provider:str)->str:
 
         if not isinstance(action_log, list):
             raise ValueError("DOM output is not a list of pages. Cannot summarize.")
-        
+        # The trailing timing profile is for tuning the navigator, not part of the flow to script
+        return {"action_log": flow_actions(action_log)}
+
+    async def summarize(outputs):
         # Step 3: Summarize the DOM structure
-        dom_summary = await summarize_dom(action_log)
+        dom_summary = await summarize_dom(outputs["scrape"]["action_log"])
         if not dom_summary.strip():
-            raise ValueError("DOM summary is empty. Cannot generate test framework.")
+            return "[ERROR] DOM summary is empty. Cannot generate test framework."
         print(f"[DEBUG] DOM summary extracted successfully.\n\n", dom_summary)
+        return dom_summary
 
-    except Exception as e:
-        print(f"[ERROR] Failed to extract or summarize DOM: {e}")
-        return f"[ERROR] DOM scraping/summarization failed. Cannot generate test framework.\nDetails: {e}"
+    async def plan(outputs):
+        # Multi-page flows are generated per module in parallel, small flows in a single call
+        pages = len(build_module_plan(outputs["scrape"]["action_log"])["pages"])
+        return {"pages": pages, "fanout": pages >= FANOUT_MIN_PAGES}
 
+    async def generate(outputs):
+        # Step 4: Generate the framework with real DOM context
+        print(f"[DEBUG] Generating test framework with DOM context...")
+        if outputs["plan"]["fanout"]:
+            return await generate_framework_fanout(prompt, llm_provider, outputs["scrape"]["action_log"], base_path=workspace)
+        return await generate_test_scripts(prompt, llm_provider, outputs["summarize"], run_context=run_context)
 
-    # Step 3: Generate the framework with real DOM context
-    print(f"[DEBUG] Generating test framework with DOM context...")
-    generate_summary= await generate_test_scripts(prompt, llm_provider, dom_summary)
-    
+    async def execute(outputs):
+        # Step 5: Automatically run executor agent
+        print("[DEBUG] Running test executor...")
+        return await test_executor_agent.handler(prompt="", llm_provider="", run_context=run_context)
+
+    inputs = {"prompt": prompt, "llm_provider": llm_provider}
+    return StageGraph([
+        # The scrape drives the live site, so like the test run it is restored only through --resume-from
+        Stage("scrape", scrape, inputs=inputs, cacheable=False),
+        Stage("summarize", summarize, deps=["scrape"]),
+        Stage("plan", plan, deps=["scrape"], inputs={"fanout_min_pages": FANOUT_MIN_PAGES}),
+        Stage("generate", generate, deps=["summarize", "plan"], inputs=inputs),
+        # Test runs depend on the live site, so they are never restored from a checkpoint on their own
+        Stage("execute", execute, deps=["generate"], cacheable=False),
+    ], workspace, on_event=getattr(run_context, "emit", None))
+
+
+def describe_pipeline_failure(failed: str, failure) -> str:
+    if failed in ("scrape", "summarize") and not str(failure).startswith("[ERROR] DOM scraping failed"):
+        return f"[ERROR] DOM scraping/summarization failed. Cannot generate test framework.\nDetails: {failure}"
+    return failure if isinstance(failure, str) else f"[ERROR] {failure.get('error')}"
+
+
+# Stage groups that run as one job when flows are spread over worker processes, and the job after each
+JOB_STAGES = {"scrape": ["scrape"], "generate": ["summarize", "plan", "generate"], "execute": ["execute"]}
+NEXT_JOB = {"scrape": "generate", "generate": "execute"}
+
+
+async def run_pipeline_job(kind: str, prompt: str, llm_provider: str, run_context=None, upstream: dict = None) -> dict:
+    """
+    Run one job's stage group against the flow's shared workspace. `upstream` holds the outputs
+    of the earlier jobs the group depends on; the returned "follow_up" carries what the next job needs.
+    """
+    pipeline = build_generation_pipeline(prompt, llm_provider, run_context)
+    result = await pipeline.run(only=JOB_STAGES[kind], given=upstream or {})
+    follow_up = None
+    next_kind = NEXT_JOB.get(kind)
+    if next_kind and not result["failed"]:
+        needed = {dep for name in JOB_STAGES[next_kind] for dep in pipeline.stages[name].deps} - set(JOB_STAGES[next_kind])
+        follow_up = {"kind": next_kind, "upstream": {dep: result["outputs"][dep] for dep in sorted(needed)}}
+    return {
+        "outputs": {name: result["outputs"][name] for name in JOB_STAGES[kind] if name in result["outputs"]},
+        "failed": result["failed"],
+        "report": {name: entry for name, entry in result["report"].items() if name in JOB_STAGES[kind]},
+        "follow_up": follow_up,
+    }
+
+
+async def test_script_generator_fn(prompt: str, llm_provider:str, run_context=None)->str:
+    pipeline = build_generation_pipeline(prompt, llm_provider, run_context)
+    try:
+        result = await pipeline.run(resume_from=getattr(run_context, "resume_from", None))
+    except (ValueError, LookupError) as e:
+        return f"[ERROR] Cannot resume the pipeline: {e}"
 
-    #Step 4: Automatically run executor agent
-    print("[DEBUG] Running test executor...")
-    execution_result = await test_executor_agent.handler(prompt="", llm_provider="")
+    outputs = result["outputs"]
+    if result["failed"]:
+        return describe_pipeline_failure(result["failed"], outputs[result["failed"]])
 
-    # Step 5: Return result
-    return f"{generate_summary}\n\n--\n\n{execution_result}"
+    # Step 6: Return result
+    return f"{outputs['generate']}\n\n--\n\n{outputs['execute']}"
 
 
 test_scripts_generator_agent = Agent(
@@ -0,0 +1,111 @@
+# === benchmarks/fixtures.py ===
+import functools
+import http.server
+import os
+import threading
+
+# Node mix of the filler content: repeated product cards, nested forms and modal dialogs
+CARD_NODES = 6
+FORM_NODES = 9
+MODAL_NODES = 5
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Bench Login</title>
+<style>body { font-family: sans-serif; } .hidden { display: none; }</style></head>
+<body>
+<h1>Sign in</h1>
+<form id="login-form" onsubmit="event.preventDefault(); location.href = '/catalog.html';">
+  <label for="username">Username</label><input id="username" name="username" type="text" placeholder="Username">
+  <label for="password">Password</label><input id="password" name="password" type="password" placeholder="Password">
+  <button id="login" type="submit">Log in</button>
+</form>
+{filler}
+</body></html>
+"""
+
+CATALOG_PAGE = """<!DOCTYPE html>
+<html><head><title>Bench Catalog</title>
+<style>body { font-family: sans-serif; } [hidden] { display: none; } .card { border: 1px solid #ccc; margin: 4px; }</style></head>
+<body>
+<h1>Catalog</h1>
+<p id="status">Cart is empty</p>
+<div id="confirm-modal" role="dialog" hidden>
+  <p>Add this product to the cart?</p>
+  <button id="confirm" onclick="document.getElementById('status').textContent = 'Added to cart'; document.getElementById('confirm-modal').hidden = true;">Confirm</button>
+  <button id="cancel" onclick="document.getElementById('confirm-modal').hidden = true;">Cancel</button>
+</div>
+{filler}
+</body></html>
+"""
+
+
+def _card(i: int) -> str:
+    return (
+        f'<div class="card" data-product="{i}"><h3>Product {i}</h3><p>Description of product {i}</p>'
+        f'<span class="price">{10 + i % 90}.99</span>'
+        f'<button data-testid="add-{i}" onclick="document.getElementById(\'confirm-modal\').hidden = false;">Add to cart</button></div>'
+    )
+
+
+def _nested_form(i: int) -> str:
+    return (
+        f'<form class="filter" id="filter-{i}"><fieldset><legend>Filter group {i}</legend>'
+        f'<div><label>Min {i}<input name="min-{i}" type="number"></label></div>'
+        f'<div><label>Max {i}<input name="max-{i}" type="number"></label></div></fieldset></form>'
+    )
+
+
+def _modal(i: int) -> str:
+    return (
+        f'<div class="modal" role="dialog" hidden><h4>Notice {i}</h4><p>Promotional message {i}</p>'
+        f'<button class="close">Close {i}</button></div>'
+    )
+
+
+def build_filler(nodes: int) -> str:
+    """Roughly `nodes` DOM nodes: 60% cards, 30% nested forms, 10% modals."""
+    cards = max(1, int(nodes * 0.6) // CARD_NODES)
+    forms = int(nodes * 0.3) // FORM_NODES
+    modals = int(nodes * 0.1) // MODAL_NODES
+    parts = [_card(i) for i in range(cards)]
+    parts += [_nested_form(i) for i in range(forms)]
+    parts += [_modal(i) for i in range(modals)]
+    return '<main id="content">' + "".join(parts) + "</main>"
+
+
+def write_site(folder: str, nodes: int) -> str:
+    """Write the two-page flow (login -> catalog) sized to `nodes` per page; returns the folder."""
+    os.makedirs(folder, exist_ok=True)
+    filler = build_filler(nodes)
+    with open(os.path.join(folder, "index.html"), "w", encoding="utf-8") as f:
+        f.write(LOGIN_PAGE.replace("{filler}", build_filler(max(20, nodes // 10))))
+    with open(os.path.join(folder, "catalog.html"), "w", encoding="utf-8") as f:
+        f.write(CATALOG_PAGE.replace("{filler}", filler))
+    return folder
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serves a fixture folder on localhost from a background thread."""
+
+    def __init__(self, folder: str):
+        handler = functools.partial(_QuietHandler, directory=folder)
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
@@ -0,0 +1,306 @@
+# === benchmarks/run_benchmarks.py ===
+"""
+Benchmarks for DOM extraction, locator synthesis and the navigator loop over synthetic pages.
+
+    cd backend
+    python -m benchmarks.run_benchmarks                       # all sizes, compare with baseline.json
+    python -m benchmarks.run_benchmarks --sizes 100 1000      # quicker run
+    python -m benchmarks.run_benchmarks --update-baseline     # accept the current numbers
+
+Browser scenarios need Playwright with Chromium installed; the LLM is a scripted local stand-in.
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_SIZES = [100, 1000, 5000, 20000]
+
+# Relative increase over the baseline that counts as a regression, per metric
+TOLERANCES = {
+    "wall_ms": 0.25,
+    "us_per_call": 0.25,
+    "protocol_calls": 0.05,
+    "prompt_bytes": 0.05,
+    "peak_python_mb": 0.20,
+    "prompt_growth": 0.10,
+}
+
+# Deterministic, headless and isolated from the caches of real runs.
+# Set before the tools are imported, since they read their configuration at import time.
+WORK_DIR = tempfile.mkdtemp(prefix="ai_test_bench_")
+os.environ.setdefault("SCRAPE_HEADLESS", "1")
+os.environ.setdefault("NAVIGATOR_STEP_DELAY", "0.2")
+os.environ.setdefault("AUTH_STATE_CACHE", "0")
+os.environ.setdefault("SCRAPE_HAR_MODE", "off")
+os.environ.setdefault("SCRAPE_ROUTING_PROFILE", "full")
+os.environ.setdefault("TRACE_EXPORT", "off")
+os.environ["SELECTOR_CACHE_PATH"] = os.path.join(WORK_DIR, "selector_cache.json")
+
+from benchmarks.fixtures import FixtureServer, write_site
+from benchmarks.scripted_llm import GOAL_PROMPT, ScriptedLLM
+
+
+class ProtocolCallCounter:
+    """
+    Counts Playwright driver round-trips (each one is at least one CDP command) by wrapping
+    the channel send methods. Relies on Playwright internals, so it degrades to None.
+    """
+
+    METHODS = ("send", "send_return_as_dict", "send_no_reply")
+
+    def __init__(self):
+        self.count = 0
+        self.by_method = {}
+        self._originals = {}
+        try:
+            from playwright._impl._connection import Channel
+            self.channel_cls = Channel
+        except ImportError:
+            self.channel_cls = None
+
+    def _wrap(self, original):
+        counter = self
+
+        def record(method):
+            counter.count += 1
+            counter.by_method[method] = counter.by_method.get(method, 0) + 1
+
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def wrapper(channel, method, *args, **kwargs):
+                record(method)
+                return await original(channel, method, *args, **kwargs)
+        else:
+            @functools.wraps(original)
+            def wrapper(channel, method, *args, **kwargs):
+                record(method)
+                return original(channel, method, *args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        if self.channel_cls is not None:
+            for name in self.METHODS:
+                original = getattr(self.channel_cls, name, None)
+                if original is not None:
+                    self._originals[name] = original
+                    setattr(self.channel_cls, name, self._wrap(original))
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(self.channel_cls, name, original)
+        return False
+
+    @property
+    def total(self):
+        return self.count if self._originals else None
+
+
+def _peak_mb() -> float:
+    return round(tracemalloc.get_traced_memory()[1] / 1_000_000, 2)
+
+
+def _synthetic_elements(count: int) -> list:
+    elements = []
+    for i in range(count):
+        kind = i % 4
+        elements.append({
+            "tag": ("button", "input", "a", "span")[kind],
+            "text": f"Product {i // 3} action" if kind != 1 else "",
+            "id": f"el-{i}" if kind == 1 else "",
+            "name": f"field-{i}" if kind == 1 else "",
+            "type": "text" if kind == 1 else None,
+            "attrs": {"data-testid": f"add-{i}"} if kind == 0 else {"aria-label": f"Link {i}"} if kind == 2 else {},
+            "depth": i % 12,
+            "form_id": "filters" if kind == 1 else None,
+        })
+    return elements
+
+
+def _time_calls(fn, repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - started
+    return {"calls": repeat, "wall_ms": round(elapsed * 1000, 2), "us_per_call": round(elapsed / repeat * 1e6, 2)}
+
+
+def run_micro_benchmarks() -> dict:
+    """Pure-Python passes of the extraction pipeline, no browser needed."""
+    from tools.ai_dom_navigator import enhance_with_smart_locator, dedupe_by_text, parse_llm_response
+
+    elements = _synthetic_elements(5000)
+    many = _synthetic_elements(20000)
+    responses = [
+        '```json\n{"type": "click", "selector": "#login", "description": "Submit"}\n```',
+        json.dumps([{"type": "fill", "selector": f"[name='f{i}']", "value": "x"} for i in range(5)]),
+        "```json\n" + json.dumps([{"type": "end", "action": "end", "description": "done"}], indent=2) + "\n```",
+    ]
+    # Time the parsing, not the error path
+    unparsed = [response for response in responses if not isinstance(parse_llm_response(response), list)]
+    if unparsed:
+        raise ValueError(f"parse_llm_response fixtures do not parse: {unparsed}")
+    results = {
+        "micro:enhance_with_smart_locator": _time_calls(lambda: [enhance_with_smart_locator(dict(el)) for el in elements], 5),
+        "micro:dedupe_by_text": _time_calls(lambda: dedupe_by_text(many), 20),
+        "micro:parse_llm_response": _time_calls(lambda: [parse_llm_response(r) for r in responses], 2000),
+    }
+    # us_per_call of the locator pass covers all elements; also report it per element
+    results["micro:enhance_with_smart_locator"]["us_per_element"] = round(
+        results["micro:enhance_with_smart_locator"]["us_per_call"] / len(elements), 3)
+    return results
+
+
+async def bench_extraction(url: str) -> dict:
+    from playwright.async_api import async_playwright
+    from tools.ai_dom_navigator import extract_dom_structure
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(url + "catalog.html", wait_until="domcontentloaded")
+        tracemalloc.start()
+        with ProtocolCallCounter() as counter:
+            started = time.perf_counter()
+            dom = await extract_dom_structure(page)
+            wall_ms = (time.perf_counter() - started) * 1000
+        peak = _peak_mb()
+        tracemalloc.stop()
+        await browser.close()
+    return {
+        "wall_ms": round(wall_ms, 1),
+        "protocol_calls": counter.total,
+        "elements": len(dom["elements"]),
+        "peak_python_mb": peak,
+    }
+
+
+async def bench_flow(url: str, llm: ScriptedLLM) -> dict:
+    from run_context import RunContext
+    from tools.ai_dom_navigator import ai_guided_flow_navigator
+
+    llm.reset()
+    run_context = RunContext.create(runs_folder=os.path.join(WORK_DIR, "runs"))
+    tracemalloc.start()
+    with ProtocolCallCounter() as counter:
+        started = time.perf_counter()
+        result = await ai_guided_flow_navigator(
+            url, llm.register(), GOAL_PROMPT, har_mode="off", reuse_login=False, run_context=run_context,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+    peak = _peak_mb()
+    tracemalloc.stop()
+    with open(run_context.path("actions_log.json"), "r", encoding="utf-8") as f:
+        actions_log = json.load(f)
+    return {
+        "wall_ms": round(wall_ms, 1),
+        "protocol_calls": counter.total,
+        "prompt_bytes": llm.prompt_bytes,
+        # Last over first prompt: state carried from step to step (history) must not scale with page size
+        "prompt_growth": round(llm.call_bytes[-1] / llm.call_bytes[0], 2) if llm.call_bytes else None,
+        "llm_calls": llm.calls,
+        "peak_python_mb": peak,
+        "completed": not (isinstance(result, dict) and result.get("error")),
+        "failed_actions": sum(1 for entry in actions_log if entry.get("success") is False),
+    }
+
+
+async def run_browser_benchmarks(sizes: list, flows: bool = True) -> dict:
+    llm = ScriptedLLM()
+    results = {}
+    for nodes in sizes:
+        site = write_site(os.path.join(WORK_DIR, f"site_{nodes}"), nodes)
+        with FixtureServer(site) as server:
+            print(f"[INFO] Benchmarking {nodes}-node pages...")
+            results[f"extract:{nodes}"] = await bench_extraction(server.url)
+            if flows:
+                results[f"flow:{nodes}"] = await bench_flow(server.url + "index.html", llm)
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict) -> list:
+    regressions = []
+    for scenario, metrics in results.items():
+        reference = baseline.get("scenarios", {}).get(scenario)
+        if not reference:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            current, previous = metrics.get(metric), reference.get(metric)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            if change > tolerance:
+                regressions.append(f"{scenario} {metric}: {previous} -> {current} (+{change:.0%}, tolerance {tolerance:.0%})")
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    print(f"\n{'scenario':<36} {'wall ms':>10} {'calls':>8} {'prompt KB':>10} {'peak MB':>8}")
+    for scenario, m in results.items():
+        calls = m.get("protocol_calls")
+        prompt_kb = m["prompt_bytes"] / 1000 if m.get("prompt_bytes") is not None else None
+        print(f"{scenario:<36} {m.get('wall_ms', 0):>10.1f} {calls if calls is not None else '-':>8} "
+              f"{f'{prompt_kb:.1f}' if prompt_kb is not None else '-':>10} {m.get('peak_python_mb', '-'):>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Node counts of the synthetic pages")
+    parser.add_argument("--micro-only", action="store_true", help="Skip the browser scenarios")
+    parser.add_argument("--no-flows", action="store_true", help="Only time extraction, not full navigator flows")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    results = run_micro_benchmarks()
+    if not args.micro_only:
+        results.update(asyncio.run(run_browser_benchmarks(args.sizes, flows=not args.no_flows)))
+
+    try:
+        from importlib.metadata import version
+        playwright_version = version("playwright")
+    except Exception:
+        playwright_version = None
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "playwright": playwright_version},
+        "scenarios": results,
+    }
+    print_report(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\n[INFO] Results saved to: {result_path}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"[INFO] Baseline updated: {BASELINE_PATH}")
+        return 0
+    if not os.path.exists(BASELINE_PATH):
+        print("[INFO] No baseline yet, run with --update-baseline to create one.")
+        return 0
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        regressions = compare_with_baseline(results, json.load(f))
+    for line in regressions:
+        print(f"[WARN] Regression: {line}")
+    if not regressions:
+        print("[INFO] No regressions against the baseline.")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
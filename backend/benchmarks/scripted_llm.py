@@ -0,0 +1,64 @@
+# === benchmarks/scripted_llm.py ===
+import json
+import re
+
+from llm.llm_client import register_provider
+
+PROVIDER_NAME = "scripted"
+STEP_PATTERN = re.compile(r"Step to perform next:\s*(\d+)")
+
+GOAL_PROMPT = """1. Fill in the username "bench" and the password "bench-pass" and submit the form
+2. Click "Add to cart" on Product 0
+3. Confirm the dialog
+4. Verify the status says "Added to cart"
+"""
+
+# One scripted LLM answer per navigator step, in the format get_next_steps expects
+FLOW_SCRIPT = [
+    [
+        {"type": "fill", "selector": "#username", "value": "bench", "description": "Enter username"},
+        {"type": "fill", "selector": "#password", "value": "bench-pass", "description": "Enter password"},
+        {"type": "click", "selector": "#login", "description": "Submit the login form"},
+    ],
+    [{"type": "click", "selector": "[data-testid='add-0']", "description": "Add Product 0 to the cart"}],
+    [{"type": "click", "selector": "#confirm", "description": "Confirm the dialog"}],
+    [
+        {"type": "assert", "subtype": "text", "selector": "#status", "expected": "Added to cart",
+         "description": "Status shows the product was added"},
+        {"type": "assert", "subtype": "visibility", "selector": "#status", "expected": True,
+         "description": "Status is visible"},
+    ],
+    [{"type": "end", "action": "end", "description": "Flow completed."}],
+]
+
+
+class ScriptedLLM:
+    """
+    Local stand-in for the LLM: answers the navigator's step N with FLOW_SCRIPT[N-1]
+    and records the prompt volume the real provider would have been sent.
+    """
+
+    def __init__(self, script: list = None):
+        self.script = script or FLOW_SCRIPT
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.call_bytes = []  # prompt size of each call, in step order
+
+    async def query(self, user_prompt: str, system_prompt: str) -> str:
+        self.calls += 1
+        size = len((user_prompt or "").encode("utf-8")) + len((system_prompt or "").encode("utf-8"))
+        self.prompt_bytes += size
+        self.call_bytes.append(size)
+        match = STEP_PATTERN.search(user_prompt or "")
+        step = int(match.group(1)) if match else self.calls
+        actions = self.script[min(step, len(self.script)) - 1]
+        return "```json\n" + json.dumps(actions) + "\n```"
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.call_bytes = []
+
+    def register(self) -> str:
+        register_provider(PROVIDER_NAME, self.query)
+        return PROVIDER_NAME
@@ -0,0 +1,168 @@
+# === coordinator.py ===
+"""
+Spreads test-generation flows over worker processes through the durable job queue.
+
+    cd backend
+    python coordinator.py "Generate tests for https://... 1. Log in ..." --workers 4
+    python coordinator.py --prompts-file flows.txt --workers 4    # flows separated by a line with ---
+    python coordinator.py --stats                                 # job counts per kind and status
+
+Every flow becomes a chain of jobs, scrape -> generate -> execute, each run by whichever worker
+leases it. The flow's run workspace under RUNS_FOLDER is shared by its jobs. The coordinator only
+submits flows, watches their jobs and aggregates the results; with --workers 0 it relies on
+workers started elsewhere (python worker.py). Prompts go straight to the generation pipeline,
+without the guardrail and routing of qa_agent.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from agents.test_scripts_generator_agent import JOB_STAGES, describe_pipeline_failure
+from job_queue import FINAL_STATUSES, new_job, open_queue
+from run_context import RUNS_FOLDER, RunContext, atomic_write_json
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER")
+COORDINATOR_POLL_SECONDS = float(os.getenv("COORDINATOR_POLL_SECONDS", "2"))
+FLOW_KINDS = list(JOB_STAGES)  # scrape, generate, execute
+COORDINATOR_REPORT_FILE = "coordinator_report.json"
+
+
+class Coordinator:
+    def __init__(self, queue=None, runs_folder: str = None):
+        self.queue = queue or open_queue()
+        self.runs_folder = runs_folder or RUNS_FOLDER
+        self.published = set()
+
+    def submit(self, prompt: str, llm_provider: str) -> str:
+        """Create the flow's run workspace and queue its first job; the flow id is the run id."""
+        run_context = RunContext.create(runs_folder=self.runs_folder)
+        run_context.workspace  # writes the "running" manifest, so the run shows up right away
+        payload = {"prompt": prompt, "llm_provider": llm_provider, "runs_folder": self.runs_folder}
+        self.queue.enqueue(new_job(FLOW_KINDS[0], run_context.run_id, payload))
+        print(f"[INFO] Submitted flow {run_context.run_id}.")
+        return run_context.run_id
+
+    def flow_summary(self, flow_id: str) -> dict:
+        """Status of one flow, aggregated from its jobs: queued, running, completed or failed."""
+        jobs = {job["kind"]: job for job in self.queue.flow_jobs(flow_id)}
+        stages = {kind: {"status": jobs[kind]["status"], "attempts": jobs[kind]["attempts"],
+                         "worker_id": (jobs[kind]["result"] or {}).get("worker_id") or jobs[kind]["lease_owner"],
+                         "seconds": round(jobs[kind]["updated_at"] - jobs[kind]["created_at"], 1),
+                         "error": jobs[kind]["error"]}
+                  for kind in FLOW_KINDS if kind in jobs}
+        summary = {"flow_id": flow_id, "status": "queued", "stages": stages, "result": None}
+        outputs = {}
+        for kind in FLOW_KINDS:
+            job = jobs.get(kind)
+            if job is None:
+                break
+            if job["status"] == "dead":
+                summary.update(status="failed", result=f"[ERROR] {kind} job gave up after {job['attempts']} attempts: {job['error']}")
+                return summary
+            if job["status"] not in FINAL_STATUSES:
+                summary["status"] = "running" if job["status"] == "leased" or kind != FLOW_KINDS[0] else "queued"
+                return summary
+            result = job["result"] or {}
+            outputs.update(result.get("outputs", {}))
+            if result.get("failed"):
+                summary.update(status="failed",
+                               result=describe_pipeline_failure(result["failed"], outputs[result["failed"]]))
+                return summary
+        if "execute" in outputs:
+            summary.update(status="completed", result=f"{outputs['generate']}\n\n--\n\n{outputs['execute']}")
+        elif jobs:
+            summary["status"] = "running"  # between two jobs: the next one is queued in the same transaction
+        return summary
+
+    def publish(self, summary: dict) -> None:
+        """Record a finished flow in its run manifest, once."""
+        if summary["flow_id"] in self.published or summary["status"] not in ("completed", "failed"):
+            return
+        run_context = RunContext(run_id=summary["flow_id"], runs_folder=self.runs_folder)
+        run_context.publish(summary["status"], str(summary["result"]))
+        self.published.add(summary["flow_id"])
+
+    def wait(self, flow_ids: list, timeout: float = None, poll_seconds: float = COORDINATOR_POLL_SECONDS,
+             on_poll=None) -> list:
+        """Poll until every flow has finished (or the timeout passes); finished flows are published as they end."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            summaries = [self.flow_summary(flow_id) for flow_id in flow_ids]
+            for summary in summaries:
+                self.publish(summary)
+            if on_poll:
+                on_poll()
+            if all(s["status"] in ("completed", "failed") for s in summaries):
+                return summaries
+            if deadline and time.monotonic() > deadline:
+                print("[WARN] Timed out waiting for the flows to finish.")
+                return summaries
+            time.sleep(poll_seconds)
+
+
+def print_flow_table(summaries: list) -> None:
+    print(f"\n{'flow':<26} {'status':<10} " + " ".join(f"{kind:<22}" for kind in FLOW_KINDS))
+    for summary in summaries:
+        cells = []
+        for kind in FLOW_KINDS:
+            stage = summary["stages"].get(kind)
+            cells.append(f"{stage['status']} x{stage['attempts']} {stage['seconds']}s" if stage else "-")
+        print(f"{summary['flow_id']:<26} {summary['status']:<10} " + " ".join(f"{cell:<22}" for cell in cells))
+    counts = {}
+    for summary in summaries:
+        counts[summary["status"]] = counts.get(summary["status"], 0) + 1
+    print("\n" + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+
+
+def read_prompts(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        blocks = f.read().split("\n---\n")
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prompts", nargs="*", help="One prompt per flow")
+    parser.add_argument("--prompts-file", help="File with one prompt per flow, separated by lines with ---")
+    parser.add_argument("--provider", default=LLM_PROVIDER, help="LLM provider, defaults to LLM_PROVIDER")
+    parser.add_argument("--workers", type=int, default=0, help="Local worker processes to start for this batch")
+    parser.add_argument("--queue", default=None, help="Queue URL, defaults to JOB_QUEUE_URL")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds to wait for the flows")
+    parser.add_argument("--stats", action="store_true", help="Print job counts per kind and status and exit")
+    args = parser.parse_args()
+
+    coordinator = Coordinator(open_queue(args.queue))
+    if args.stats:
+        print(json.dumps(coordinator.queue.stats(), indent=4))
+        return 0
+    prompts = list(args.prompts) + (read_prompts(args.prompts_file) if args.prompts_file else [])
+    if not prompts:
+        parser.error("no prompts given")
+    if not args.provider:
+        parser.error("--provider is required when LLM_PROVIDER is not set")
+
+    flow_ids = [coordinator.submit(prompt, args.provider) for prompt in prompts]
+    pool = None
+    if args.workers:
+        from worker import WorkerPool
+        pool = WorkerPool(args.workers, args.queue).start()
+    try:
+        summaries = coordinator.wait(flow_ids, timeout=args.timeout, on_poll=pool.check if pool else None)
+    finally:
+        if pool:
+            pool.stop()
+
+    print_flow_table(summaries)
+    report_path = os.path.join(coordinator.runs_folder, COORDINATOR_REPORT_FILE)
+    atomic_write_json(report_path, {"finished_at": time.time(), "flows": summaries})
+    print(f"[INFO] Aggregated results saved to: {report_path}")
+    return 0 if all(s["status"] == "completed" for s in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
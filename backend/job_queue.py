@@ -0,0 +1,368 @@
+# === job_queue.py ===
+"""
+Durable job queue shared by the coordinator and the worker processes.
+
+The default backend is one SQLite file (JOB_QUEUE_URL=sqlite:///path/queue.db), which also works
+for workers on several machines that mount the same folder: keep the file on a filesystem with
+working locks and set JOB_QUEUE_SQLITE_WAL=0 there, since WAL needs shared memory on one host.
+JOB_QUEUE_URL=redis://host:6379/0 uses a Redis server instead (the `redis` package is only
+imported for that backend).
+
+Jobs are leased, not popped: a worker owns a job until its lease expires, renews it with
+heartbeats, and a job whose worker died is handed out again once the lease has run out.
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from typing import List, Optional
+
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", "sqlite:///.job_queue/queue.db")
+JOB_QUEUE_SQLITE_WAL = os.getenv("JOB_QUEUE_SQLITE_WAL", "1") != "0"
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+
+# queued -> leased -> done | (queued again for a retry) | dead once the attempts are used up
+FINAL_STATUSES = ("done", "dead")
+
+
+def new_job(kind: str, flow_id: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> dict:
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "flow_id": flow_id,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "available_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def retry_delay(attempts: int) -> float:
+    return JOB_RETRY_BACKOFF_SECONDS * (2 ** max(0, attempts - 1))
+
+
+class SQLiteJobQueue:
+    """Jobs in one SQLite table; every state change is a single IMMEDIATE transaction."""
+
+    COLUMNS = ("job_id", "kind", "flow_id", "payload", "status", "attempts", "max_attempts", "available_at",
+               "lease_owner", "lease_expires_at", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            if JOB_QUEUE_SQLITE_WAL:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, flow_id TEXT, payload TEXT,
+                    status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL, lease_owner TEXT, lease_expires_at REAL,
+                    result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, kind, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_flow ON jobs (flow_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_row(job: dict) -> tuple:
+        return tuple(json.dumps(job[c]) if c in ("payload", "result") and job[c] is not None else job[c]
+                     for c in SQLiteJobQueue.COLUMNS)
+
+    @staticmethod
+    def _from_row(row) -> dict:
+        job = dict(row)
+        for column in ("payload", "result"):
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def _insert(self, conn, job: dict) -> None:
+        conn.execute(f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                     self._to_row(job))
+
+    def _expire_leases(self, conn, now: float) -> None:
+        # Workers that stopped heartbeating: retry their jobs, or give up once the attempts are used
+        conn.execute("""UPDATE jobs SET status = 'dead', error = COALESCE(error, 'Lease expired, worker lost'),
+                        lease_owner = NULL, updated_at = ?
+                        WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= max_attempts""", (now, now))
+        conn.execute("""UPDATE jobs SET status = 'queued', error = 'Lease expired, worker lost',
+                        lease_owner = NULL, lease_expires_at = NULL, available_at = ?, updated_at = ?
+                        WHERE status = 'leased' AND lease_expires_at < ?""", (now, now, now))
+
+    def enqueue(self, job: dict) -> str:
+        with self._transaction() as conn:
+            self._insert(conn, job)
+        return job["job_id"]
+
+    def lease(self, worker_id: str, kinds: List[str] = None, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            kind_filter = f"AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ""
+            row = conn.execute(f"""SELECT job_id FROM jobs WHERE status = 'queued' AND available_at <= ? {kind_filter}
+                                   ORDER BY available_at, created_at LIMIT 1""", (now, *(kinds or []))).fetchone()
+            if row is None:
+                return None
+            conn.execute("""UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires_at = ?,
+                            attempts = attempts + 1, updated_at = ? WHERE job_id = ?""",
+                         (worker_id, now + lease_seconds, now, row["job_id"]))
+            return self._from_row(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """Extend the lease; False means the job is no longer this worker's and its work must stop."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute("""UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                                     WHERE job_id = ? AND lease_owner = ? AND status = 'leased'""",
+                                  (now + lease_seconds, now, job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result, follow_ups: List[dict] = ()) -> bool:
+        """Store the result and enqueue the follow-up jobs atomically, only if the lease is still held."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute("""UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL,
+                                     lease_expires_at = NULL, updated_at = ?
+                                     WHERE job_id = ? AND lease_owner = ? AND status = 'leased'""",
+                                  (json.dumps(result), now, job_id, worker_id))
+            if cursor.rowcount != 1:
+                return False
+            for job in follow_ups:
+                self._insert(conn, job)
+            return True
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        """Record a failed attempt; returns the new status ("queued" for a retry, "dead") or None without the lease."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND lease_owner = ? AND status = 'leased'",
+                               (job_id, worker_id)).fetchone()
+            if row is None:
+                return None
+            status = "queued" if retry and row["attempts"] < row["max_attempts"] else "dead"
+            conn.execute("""UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL,
+                            available_at = ?, updated_at = ? WHERE job_id = ?""",
+                         (status, error[:4000], now + retry_delay(row["attempts"]), now, job_id))
+            return status
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def flow_jobs(self, flow_id: str) -> List[dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE flow_id = ? ORDER BY created_at", (flow_id,)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status").fetchall()
+        stats = {}
+        for row in rows:
+            stats.setdefault(row["kind"], {})[row["status"]] = row["n"]
+        return stats
+
+
+# Lease and expiry have to be atomic on the server, so they are small Lua scripts
+_REDIS_LEASE = """
+local now = tonumber(ARGV[1])
+for i = 4, #ARGV do
+    local ready = redis.call('ZRANGEBYSCORE', KEYS[1] .. ':ready:' .. ARGV[i], '-inf', now, 'LIMIT', 0, 1)
+    if #ready > 0 then
+        local job_id = ready[1]
+        local key = KEYS[1] .. ':job:' .. job_id
+        redis.call('ZREM', KEYS[1] .. ':ready:' .. ARGV[i], job_id)
+        redis.call('ZADD', KEYS[1] .. ':leases', now + tonumber(ARGV[2]), job_id)
+        redis.call('HSET', key, 'status', 'leased', 'lease_owner', ARGV[3],
+                   'lease_expires_at', now + tonumber(ARGV[2]), 'updated_at', now)
+        redis.call('HINCRBY', key, 'attempts', 1)
+        return job_id
+    end
+end
+return false
+"""
+
+_REDIS_EXPIRE = """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1] .. ':leases', '-inf', now)
+for _, job_id in ipairs(expired) do
+    local key = KEYS[1] .. ':job:' .. job_id
+    redis.call('ZREM', KEYS[1] .. ':leases', job_id)
+    local attempts = tonumber(redis.call('HGET', key, 'attempts'))
+    local max_attempts = tonumber(redis.call('HGET', key, 'max_attempts'))
+    redis.call('HSET', key, 'lease_owner', '', 'error', 'Lease expired, worker lost', 'updated_at', now)
+    if attempts >= max_attempts then
+        redis.call('HSET', key, 'status', 'dead')
+    else
+        redis.call('HSET', key, 'status', 'queued', 'available_at', now)
+        redis.call('ZADD', KEYS[1] .. ':ready:' .. redis.call('HGET', key, 'kind'), now, job_id)
+    end
+end
+return #expired
+"""
+
+class RedisJobQueue:
+    """
+    The same queue on Redis: one hash per job, a ready set per kind scored by available_at,
+    a lease set scored by expiry and a set of job ids per flow.
+    """
+
+    def __init__(self, url: str, prefix: str = "ai_test_jobs"):
+        import redis  # only needed for this backend
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._lease = self.redis.register_script(_REDIS_LEASE)
+        self._expire = self.redis.register_script(_REDIS_EXPIRE)
+        self.kinds_key = f"{prefix}:kinds"
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    @staticmethod
+    def _encode(job: dict) -> dict:
+        return {k: json.dumps(v) if k in ("payload", "result") else ("" if v is None else v) for k, v in job.items()}
+
+    @staticmethod
+    def _decode(data: dict) -> dict:
+        job = dict(data)
+        for column in ("payload", "result"):
+            job[column] = json.loads(job[column]) if job.get(column) else None
+        for column in ("attempts", "max_attempts"):
+            job[column] = int(job.get(column) or 0)
+        for column in ("available_at", "lease_expires_at", "created_at", "updated_at"):
+            job[column] = float(job[column]) if job.get(column) else None
+        for column in ("lease_owner", "error"):
+            job[column] = job.get(column) or None
+        return job
+
+    def _queue_job(self, pipe, job: dict) -> None:
+        pipe.hset(self._key(job["job_id"]), mapping=self._encode(job))
+        pipe.zadd(f"{self.prefix}:ready:{job['kind']}", {job["job_id"]: job["available_at"]})
+        pipe.sadd(f"{self.prefix}:flow:{job['flow_id']}", job["job_id"])
+        pipe.sadd(self.kinds_key, job["kind"])
+
+    def enqueue(self, job: dict) -> str:
+        pipe = self.redis.pipeline(transaction=True)
+        self._queue_job(pipe, job)
+        pipe.execute()
+        return job["job_id"]
+
+    def lease(self, worker_id: str, kinds: List[str] = None, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        now = time.time()
+        self._expire(keys=[self.prefix], args=[now])
+        kinds = kinds or sorted(self.redis.smembers(self.kinds_key))
+        job_id = self._lease(keys=[self.prefix], args=[now, lease_seconds, worker_id, *kinds])
+        return self.get(job_id) if job_id else None
+
+    def _owned_transaction(self, job_id: str, worker_id: str, apply) -> bool:
+        """Run `apply(pipe)` in MULTI only while the worker still holds the lease (WATCH guards the check)."""
+        import redis
+        key = self._key(job_id)
+        with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.hmget(key, "status", "lease_owner") != ["leased", worker_id]:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                apply(pipe)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        now = time.time()
+
+        def apply(pipe):
+            pipe.hset(self._key(job_id), mapping={"lease_expires_at": now + lease_seconds, "updated_at": now})
+            pipe.zadd(f"{self.prefix}:leases", {job_id: now + lease_seconds})
+
+        return self._owned_transaction(job_id, worker_id, apply)
+
+    def complete(self, job_id: str, worker_id: str, result, follow_ups: List[dict] = ()) -> bool:
+        now = time.time()
+
+        def apply(pipe):
+            pipe.hset(self._key(job_id), mapping={"status": "done", "result": json.dumps(result), "error": "",
+                                                  "lease_owner": "", "lease_expires_at": "", "updated_at": now})
+            pipe.zrem(f"{self.prefix}:leases", job_id)
+            for job in follow_ups:
+                self._queue_job(pipe, job)
+
+        return self._owned_transaction(job_id, worker_id, apply)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        now = time.time()
+        job = self.get(job_id)
+        if job is None:
+            return None
+        status = "queued" if retry and job["attempts"] < job["max_attempts"] else "dead"
+        available_at = now + retry_delay(job["attempts"])
+
+        def apply(pipe):
+            pipe.hset(self._key(job_id), mapping={"status": status, "error": error[:4000], "lease_owner": "",
+                                                  "lease_expires_at": "", "available_at": available_at, "updated_at": now})
+            pipe.zrem(f"{self.prefix}:leases", job_id)
+            if status == "queued":
+                pipe.zadd(f"{self.prefix}:ready:{job['kind']}", {job_id: available_at})
+
+        return status if self._owned_transaction(job_id, worker_id, apply) else None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        data = self.redis.hgetall(self._key(job_id))
+        return self._decode(data) if data else None
+
+    def flow_jobs(self, flow_id: str) -> List[dict]:
+        jobs = [self.get(job_id) for job_id in self.redis.smembers(f"{self.prefix}:flow:{flow_id}")]
+        return sorted((job for job in jobs if job), key=lambda job: job["created_at"])
+
+    def stats(self) -> dict:
+        stats = {}
+        for key in self.redis.scan_iter(f"{self.prefix}:job:*"):
+            kind, status = self.redis.hmget(key, "kind", "status")
+            stats.setdefault(kind, {})
+            stats[kind][status] = stats[kind].get(status, 0) + 1
+        return stats
+
+
+def open_queue(url: str = None):
+    """sqlite:///relative/or/absolute.db (the default) or redis://host:port/db."""
+    url = url or JOB_QUEUE_URL
+    if url.startswith(("redis://", "rediss://")):
+        return RedisJobQueue(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job queue URL '{url}', expected sqlite:///path or redis://host:port/db")
@@ -1,18 +1,17 @@
 # === llm/llm_client.py ===
+import asyncio
 import os
-from openai import AsyncOpenAI
 
+# Provider SDKs (langchain_anthropic, langchain_google_genai, openai) are imported on first
+# use inside the client factories below: a run only talks to one provider, and importing
+# all of them dominated the CLI's cold start.
 # from langchain_community.chat_models import ChatAnthropic
-# from langchain_anthropic import ChatAnthropic
-from langchain_anthropic import ChatAnthropic
-
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # from google import genai
 # from google.genai import types
 
 from dotenv import load_dotenv
-from pydantic import SecretStr
+from tracing import span, current_span
 
 load_dotenv()
 
@@ -20,27 +19,96 @@ ClAUDE_KEY = os.getenv("ANTHROPIC_API_KEY")
 GENAI_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
+# Providers registered at runtime, e.g. the scripted stand-in used by the benchmarks
+CUSTOM_PROVIDERS = {}
+# query_llm reports some failures as text rather than raising; these prefixes mark them
+LLM_ERROR_PREFIXES = ("Gemini query failed", "GPT query failed", "Unsupported provider")
+
+def is_error_response(response) -> bool:
+    return not isinstance(response, str) or response.startswith(LLM_ERROR_PREFIXES)
+
+def register_provider(name: str, query_fn) -> None:
+    """query_fn(user_prompt, system_prompt) -> str, async."""
+    CUSTOM_PROVIDERS[name] = query_fn
+
 async def query_llm(user_prompt : str, system_prompt : str, provider : str) -> str:
-    if provider == "claude":
-        return await query_claude(user_prompt, system_prompt)
-    elif provider == "gemini":
-        return await query_gemini(user_prompt, system_prompt)
-    elif provider == "gpt":
-        return await query_gpt(user_prompt, system_prompt)
-    return "Unsupported provider."
+    with span("llm.query", provider=provider, prompt_chars=len(user_prompt or "") + len(system_prompt or "")) as llm_span:
+        if provider in CUSTOM_PROVIDERS:
+            response = await CUSTOM_PROVIDERS[provider](user_prompt, system_prompt)
+        elif provider == "claude":
+            response = await query_claude(user_prompt, system_prompt)
+        elif provider == "gemini":
+            response = await query_gemini(user_prompt, system_prompt)
+        elif provider == "gpt":
+            response = await query_gpt(user_prompt, system_prompt)
+        else:
+            response = "Unsupported provider."
+        llm_span.set(response_chars=len(response or ""))
+        return response
 
-async def query_claude(user_prompt : str, system_prompt : str) -> str:
-    #Stimulate Claude LLM call
-    print("📡 Generating response using Claude...")
+def record_token_usage(response) -> None:
+    # LangChain chat responses carry usage_metadata when the provider reports token counts
+    usage = getattr(response, "usage_metadata", None) or {}
+    current_span().set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
 
-    llm = ChatAnthropic(
+# One client per provider and event loop: the SDKs keep async HTTP connection pools,
+# which cannot be shared across the event loops of separate asyncio.run() calls
+_CLIENTS = {}
+
+def _cached_client(name: str, factory):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    cached = _CLIENTS.get(name)
+    if cached is None or cached[0] is not loop:
+        cached = (loop, factory())
+        _CLIENTS[name] = cached
+    return cached[1]
+
+def _new_claude_chat_model():
+    from langchain_anthropic import ChatAnthropic
+    from pydantic import SecretStr
+    return ChatAnthropic(
         model="claude-3-7-sonnet-20250219", 
         # model="claude-3-sonnet-20240229",
         api_key=SecretStr(ClAUDE_KEY), 
         temperature=0.2, 
         max_tokens=8000)
-    
+
+def _new_gemini_chat_model():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from pydantic import SecretStr
+    return ChatGoogleGenerativeAI(model='gemini-2.0-flash', api_key=SecretStr(GENAI_KEY))
+
+def _new_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_KEY)
+
+def claude_chat_model():
+    return _cached_client("claude", _new_claude_chat_model)
+
+def gemini_chat_model():
+    return _cached_client("gemini", _new_gemini_chat_model)
+
+def openai_client():
+    return _cached_client("gpt", _new_openai_client)
+
+def warm_client(provider: str) -> bool:
+    """Create the provider's client ahead of the first call; False for providers without one."""
+    factory = {"claude": claude_chat_model, "gemini": gemini_chat_model, "gpt": openai_client}.get(provider)
+    if factory is None:
+        return False
+    factory()
+    return True
+
+async def query_claude(user_prompt : str, system_prompt : str) -> str:
+    #Stimulate Claude LLM call
+    print("📡 Generating response using Claude...")
+
+    llm = claude_chat_model()
     response = await llm.ainvoke([{"role": "user", "content": system_prompt}, {"role": "user", "content": user_prompt}])
+    record_token_usage(response)
     return response.content.strip()
 
 
@@ -48,9 +116,10 @@ async def query_gemini(user_prompt: str, system_prompt: str) -> str:
     # Simulate Gemini LLM call
     try:
         # model used is "gemini-2.0-flash"
-        llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash', api_key=SecretStr(GENAI_KEY))
+        llm = gemini_chat_model()
         print("\n⏳ Generating response using Gemini...\n")
         response = await llm.ainvoke([{"role":"system","content":system_prompt},{"role":"user","content":user_prompt}])
+        record_token_usage(response)
         return response.content.strip()
 
     except Exception as e:
@@ -62,7 +131,7 @@ async def query_gpt(user_prompt: str, system_prompt: str) -> str:
     try:
         print("\n⏳ Generating response using GPT-3.5 ...\n")
         # openai.api_key = OPENAI_KEY
-        client = AsyncOpenAI(api_key=OPENAI_KEY)
+        client = openai_client()
         # response = await openai.ChatCompletion.acreate(            -- version changed
         response = await client.chat.completions.create(
             model="gpt-3.5-turbo",  # Free tier model
@@ -76,3 +145,52 @@ async def query_gpt(user_prompt: str, system_prompt: str) -> str:
     except Exception as e:
         print(f"GPT query failed: {e}")
         return f"GPT query failed: {e}"
+
+
+def _chunk_text(content) -> str:
+    # Streaming chunks may carry a plain string or a list of content blocks
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content or [])
+
+async def stream_llm(user_prompt: str, system_prompt: str, provider: str):
+    """
+    Stream the LLM response as text fragments while tokens arrive.
+    Registered providers have no streaming API and yield their whole response at once.
+    Failures are raised, so an error or a partial response is never mistaken for model output.
+    """
+    try:
+        if provider in CUSTOM_PROVIDERS:
+            response = await query_llm(user_prompt, system_prompt, provider)
+            if is_error_response(response):
+                raise RuntimeError(response)
+            yield response
+        elif provider not in ("claude", "gemini", "gpt"):
+            raise ValueError(f"Unsupported provider '{provider}'.")
+        elif provider == "claude":
+            print("📡 Streaming response using Claude...")
+            llm = claude_chat_model()
+            async for chunk in llm.astream([{"role": "user", "content": system_prompt}, {"role": "user", "content": user_prompt}]):
+                yield _chunk_text(chunk.content)
+        elif provider == "gemini":
+            print("\n⏳ Streaming response using Gemini...\n")
+            llm = gemini_chat_model()
+            async for chunk in llm.astream([{"role":"system","content":system_prompt},{"role":"user","content":user_prompt}]):
+                yield _chunk_text(chunk.content)
+        elif provider == "gpt":
+            print("\n⏳ Streaming response using GPT-3.5 ...\n")
+            client = openai_client()
+            stream = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"{provider} streaming query failed: {e}")
+        raise
@@ -1,8 +1,10 @@
 # === main.py ===
+import argparse
 import asyncio
 import os
 from agents.qa_agent import qa_agent
 from dotenv import load_dotenv
+from run_context import RunContext, run_status
 
 load_dotenv()
 
@@ -11,15 +13,24 @@ LLM_PROVIDER =os.getenv("LLM_PROVIDER")  # "claude" or "gemini"
 
 print(f"[DEBUG] Using LLM_PROVIDER: '{LLM_PROVIDER}'")
 
-async def main():
+async def main(resume_from=None):
     if not LLM_PROVIDER:
         raise ValueError("LLM_PROVIDER environment variable not set")
     
     prompt = input("\nEnter a QA-related prompt:\nPrompt: ")
-    output = await qa_agent.run(prompt, llm_provider=LLM_PROVIDER)
+    run_context = RunContext.create(resume_from=resume_from)
+    output = await qa_agent.run(prompt, llm_provider=LLM_PROVIDER, run_context=run_context)
+    run_context.publish(run_status(output), str(output))
     print("\nCompleted the Run ...", output)
 
     
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume-from", help="Pipeline stage to resume from: scrape, summarize, plan, generate or execute")
+    parser.add_argument("--startup-report", action="store_true", help="Print the per-module import cost of startup and exit")
+    args = parser.parse_args()
+    if args.startup_report:
+        from tools.startup_report import print_startup_report
+        raise SystemExit(print_startup_report())
+    asyncio.run(main(args.resume_from))
\ No newline at end of file
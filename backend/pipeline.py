@@ -0,0 +1,252 @@
+# === pipeline.py ===
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from tracing import span
+
+PIPELINE_CHECKPOINT_FOLDER = os.getenv("PIPELINE_CHECKPOINT_FOLDER", ".pipeline_checkpoints")
+PIPELINE_CHECKPOINTS = os.getenv("PIPELINE_CHECKPOINTS", "1") != "0"
+PIPELINE_CHECKPOINT_TTL_HOURS = float(os.getenv("PIPELINE_CHECKPOINT_TTL_HOURS", "24"))
+PIPELINE_REPORT_FILE = "pipeline_report.json"
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline. `fn` receives the outputs of all finished stages by name and
+    returns a JSON-serializable output; an "[ERROR]..." string or a dict with "error" fails the stage.
+    `inputs` are hashed together with the dependency outputs to form the checkpoint key.
+    A stage that is not `cacheable` is still checkpointed, but only restored by `resume_from`.
+    """
+    name: str
+    fn: Callable[[Dict], Awaitable]
+    deps: List[str] = field(default_factory=list)
+    inputs: Dict = field(default_factory=dict)
+    cacheable: bool = True
+    version: str = "1"
+
+
+def _is_failure(output) -> bool:
+    if isinstance(output, dict):
+        return bool(output.get("error"))
+    return isinstance(output, str) and output.startswith("[ERROR]")
+
+
+def _content_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _file_state(root: str) -> dict:
+    state = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            state[os.path.relpath(path, root)] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+
+class StageGraph:
+    """
+    Runs stages in dependency order, independent stages concurrently. Each successful
+    stage is checkpointed under its input hash together with the workspace files it wrote,
+    so a later run with the same inputs restores a cacheable stage instead of running it.
+    """
+
+    def __init__(self, stages: List[Stage], workspace: str, checkpoint_folder: str = None,
+                 use_checkpoints: bool = PIPELINE_CHECKPOINTS, ttl_hours: float = PIPELINE_CHECKPOINT_TTL_HOURS,
+                 on_event: Optional[Callable] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+        self.workspace = workspace
+        self.checkpoint_folder = checkpoint_folder or PIPELINE_CHECKPOINT_FOLDER
+        self.use_checkpoints = use_checkpoints
+        self.ttl_seconds = ttl_hours * 3600
+        self.outputs = {}
+        self.report = {}
+        self.on_event = on_event  # called as on_event("stage", stage=..., status=...) when a stage starts or ends
+
+    def _notify(self, name: str, status: str, **data) -> None:
+        if self.on_event is not None:
+            self.on_event("stage", stage=name, status=status, **data)
+
+    def order(self) -> List[str]:
+        """Topological order, stable with respect to declaration order."""
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return ordered
+
+    def downstream(self, name: str) -> set:
+        found = {name}
+        for stage_name in self.order():
+            if any(dep in found for dep in self.stages[stage_name].deps):
+                found.add(stage_name)
+        return found
+
+    def stage_key(self, stage: Stage) -> str:
+        return _content_hash({
+            "stage": stage.name,
+            "version": stage.version,
+            "inputs": stage.inputs,
+            "deps": {dep: _content_hash(self.outputs[dep]) for dep in stage.deps},
+        })
+
+    def _checkpoint_dir(self, stage: Stage, key: str) -> str:
+        return os.path.join(self.checkpoint_folder, stage.name, key[:32])
+
+    def load_checkpoint(self, stage: Stage, key: str, ignore_ttl: bool = False):
+        checkpoint_dir = self._checkpoint_dir(stage, key)
+        try:
+            with open(os.path.join(checkpoint_dir, "output.json"), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not ignore_ttl and time.time() - record.get("saved_at", 0) > self.ttl_seconds:
+            return None
+        files_dir = os.path.join(checkpoint_dir, "files")
+        for relpath in record.get("files", []):
+            target = os.path.join(self.workspace, relpath)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(files_dir, relpath), target)
+        return record
+
+    def save_checkpoint(self, stage: Stage, key: str, output, files: List[str]) -> None:
+        checkpoint_dir = self._checkpoint_dir(stage, key)
+        tmp_dir = f"{checkpoint_dir}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            for relpath in files:
+                target = os.path.join(tmp_dir, "files", relpath)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(self.workspace, relpath), target)
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, "output.json"), "w", encoding="utf-8") as f:
+                json.dump({"stage": stage.name, "saved_at": time.time(), "output": output, "files": files}, f)
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            os.makedirs(os.path.dirname(checkpoint_dir), exist_ok=True)
+            os.replace(tmp_dir, checkpoint_dir)
+        except OSError as e:
+            print(f"[WARN] Could not checkpoint stage '{stage.name}': {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    async def _run_stage(self, stage: Stage, force: bool, restore_only: bool):
+        started = time.perf_counter()
+        key = self.stage_key(stage)
+        if self.use_checkpoints and (stage.cacheable or restore_only) and not force:
+            record = self.load_checkpoint(stage, key, ignore_ttl=restore_only)
+            if record is not None:
+                print(f"[INFO] Stage '{stage.name}' restored from checkpoint.")
+                self.report[stage.name] = {"status": "restored", "key": key[:16], "seconds": round(time.perf_counter() - started, 3)}
+                self._notify(stage.name, "restored")
+                return record["output"]
+        if restore_only:
+            raise LookupError(f"No checkpoint for stage '{stage.name}' with the current inputs")
+
+        print(f"[DEBUG] Running stage '{stage.name}'...")
+        self._notify(stage.name, "running")
+        before = _file_state(self.workspace)
+        with span(f"stage.{stage.name}") as stage_span:
+            output = await stage.fn(dict(self.outputs))
+            failed = _is_failure(output)
+            stage_span.set(failed=failed)
+        if self.use_checkpoints and not failed:
+            after = _file_state(self.workspace)
+            written = sorted(path for path, state in after.items() if before.get(path) != state)
+            self.save_checkpoint(stage, key, output, written)
+        self.report[stage.name] = {
+            "status": "failed" if failed else "ran", "key": key[:16], "seconds": round(time.perf_counter() - started, 3),
+        }
+        self._notify(stage.name, self.report[stage.name]["status"], seconds=self.report[stage.name]["seconds"])
+        return output
+
+    def _check_slice(self, only: List[str], given: Dict) -> None:
+        for name in list(only) + list(given):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.order())}")
+        for name in only:
+            missing = [dep for dep in self.stages[name].deps if dep not in only and dep not in given]
+            if missing:
+                raise ValueError(f"Stage '{name}' needs the output of {missing}, which is neither given nor run")
+
+    async def run(self, resume_from: Optional[str] = None, only: Optional[List[str]] = None,
+                  given: Optional[Dict] = None) -> dict:
+        """
+        Run the graph. With `resume_from`, every stage upstream of the named one must be
+        restorable from a checkpoint, and the named stage and everything after it run again.
+        `only` runs a slice of the graph, with the outputs of the stages it depends on passed
+        in `given` (how a queue job runs its stage group); the other stages are left "deferred".
+        Returns {"outputs", "failed", "report"}.
+        """
+        if resume_from and resume_from not in self.stages:
+            raise ValueError(f"Unknown stage '{resume_from}'. Stages: {', '.join(self.order())}")
+        given = given or {}
+        if only is not None:
+            self._check_slice(only, given)
+        self.outputs.update(given)
+        for name in given:
+            self.report[name] = {"status": "given"}
+        rerun = self.downstream(resume_from) if resume_from else set()
+        pending = [name for name in self.order() if name not in given]
+        deferred = [name for name in pending if only is not None and name not in only]
+        pending = [name for name in pending if name not in deferred]
+        failed = None
+        while pending and failed is None:
+            ready = [name for name in pending if all(dep in self.outputs for dep in self.stages[name].deps)]
+            if not ready:
+                break
+            results = await asyncio.gather(*[
+                self._run_stage(self.stages[name], force=name in rerun, restore_only=bool(resume_from) and name not in rerun)
+                for name in ready
+            ], return_exceptions=True)
+            for name, output in zip(ready, results):
+                pending.remove(name)
+                if isinstance(output, Exception):
+                    print(f"[ERROR] Stage '{name}' raised: {output}")
+                    self.report[name] = {"status": "failed", "error": str(output)}
+                    self._notify(name, "failed", error=str(output))
+                    output = f"[ERROR] Stage '{name}' failed: {output}"
+                if _is_failure(output):
+                    failed = failed or name
+                self.outputs[name] = output
+        for name in pending:
+            self.report[name] = {"status": "skipped"}
+        for name in deferred:
+            self.report[name] = {"status": "deferred"}
+
+        os.makedirs(self.workspace, exist_ok=True)
+        report_path = os.path.join(self.workspace, PIPELINE_REPORT_FILE)
+        stages = dict(self.report)
+        if only is not None:
+            # Slices of one flow run one after another, each adds its stages to the flow's report
+            try:
+                with open(report_path, "r", encoding="utf-8") as f:
+                    previous = json.load(f).get("stages", {})
+                stages = {**previous, **{name: entry for name, entry in self.report.items()
+                                         if entry["status"] not in ("given", "deferred") or name not in previous}}
+            except (OSError, json.JSONDecodeError):
+                pass
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"resume_from": resume_from, "failed": failed, "stages": stages}, f, indent=4)
+        return {"outputs": self.outputs, "failed": failed, "report": self.report}
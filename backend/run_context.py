@@ -0,0 +1,166 @@
+# === run_context.py ===
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+FRAMEWORK_FOLDER = "framework_output"  # Workspace name inside a run, and the legacy shared folder
+RUNS_FOLDER = os.getenv("RUNS_FOLDER", "runs")
+RUN_RETENTION_COUNT = int(os.getenv("RUN_RETENTION_COUNT", "20"))   # Finished runs kept per host
+RUN_RETENTION_DAYS = float(os.getenv("RUN_RETENTION_DAYS", "7"))   # Finished runs older than this are removed
+RUN_MANIFEST = "run.json"
+LATEST_LINK = "latest"
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Write to a temp file next to the target and rename it, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, data, indent: int = 4) -> None:
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+@dataclass
+class RunContext:
+    """
+    One pipeline run: an isolated workspace under runs/<run_id>/ that every agent handler
+    and tool writes into, so concurrent runs never share actions_log.json, generated
+    files or allure-results.
+    """
+    run_id: str
+    runs_folder: str = RUNS_FOLDER
+    started_at: float = field(default_factory=time.time)
+    resume_from: Optional[str] = None  # pipeline stage to resume from, earlier stages come from checkpoints
+    # Process-wide resources a resident service shares across runs; None means the tools make their own
+    browser_pool: Optional[object] = field(default=None, repr=False)
+    selector_cache: Optional[object] = field(default=None, repr=False)
+    on_event: Optional[Callable] = field(default=None, repr=False)  # progress listener, e.g. a service job
+
+    @classmethod
+    def create(cls, runs_folder: str = None, resume_from: str = None, **shared) -> "RunContext":
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        return cls(run_id=run_id, runs_folder=runs_folder or RUNS_FOLDER, resume_from=resume_from, **shared)
+
+    @property
+    def root(self) -> str:
+        return os.path.join(self.runs_folder, self.run_id)
+
+    @property
+    def workspace(self) -> str:
+        path = os.path.join(self.root, FRAMEWORK_FOLDER)
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+            self._write_manifest("running")
+        return path
+
+    def path(self, *parts) -> str:
+        return os.path.join(self.workspace, *parts)
+
+    def emit(self, event_type: str, **data) -> None:
+        """Structured progress for whoever started the run; runs without a listener ignore it."""
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event_type, **data)
+        except Exception as e:
+            print(f"[WARN] Progress listener failed on '{event_type}': {e}")
+
+    def _write_manifest(self, status: str, **extra) -> None:
+        atomic_write_json(os.path.join(self.root, RUN_MANIFEST), {
+            "run_id": self.run_id,
+            "status": status,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            **extra,
+        })
+
+    def publish(self, status: str, summary: str = "") -> None:
+        """
+        Record the final status, and for completed runs atomically repoint runs/latest
+        at this workspace. Runs that never wrote anything leave no trace.
+        """
+        if not os.path.isdir(self.root):
+            return
+        self._write_manifest(status, finished_at=time.time(), summary=summary[:2000])
+        if status == "completed":
+            _swap_latest(self.runs_folder, self.run_id)
+            print(f"[INFO] Run {self.run_id} published to {os.path.join(self.runs_folder, LATEST_LINK)}")
+        cleanup_runs(self.runs_folder)
+
+
+def workspace_path(run_context: "RunContext" = None) -> str:
+    """Workspace for a tool call; direct calls without a run context use the legacy shared folder."""
+    return run_context.workspace if run_context else FRAMEWORK_FOLDER
+
+
+def emit_progress(run_context: "RunContext", event_type: str, **data) -> None:
+    if run_context is not None:
+        run_context.emit(event_type, **data)
+
+
+def run_status(result) -> str:
+    if isinstance(result, dict):
+        return "failed" if result.get("error") else "completed"
+    text = str(result or "")
+    return "failed" if text.startswith(("[ERROR]", "[Guardrail Triggered]")) else "completed"
+
+
+def _swap_latest(runs_folder: str, run_id: str) -> None:
+    link_path = os.path.join(runs_folder, LATEST_LINK)
+    tmp_link = f"{link_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        os.symlink(run_id, tmp_link, target_is_directory=True)
+        os.replace(tmp_link, link_path)
+    except OSError:
+        # No symlink support (e.g. Windows without developer mode): publish a pointer file instead
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        atomic_write_text(link_path + ".txt", run_id)
+
+
+def _read_manifest(run_dir: str) -> dict:
+    try:
+        with open(os.path.join(run_dir, RUN_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def cleanup_runs(runs_folder: str = None, keep: int = RUN_RETENTION_COUNT, max_age_days: float = RUN_RETENTION_DAYS) -> list:
+    """
+    Remove finished runs beyond the newest `keep` or older than `max_age_days`.
+    Running runs and the published latest run are never removed. Returns the removed run ids.
+    """
+    runs_folder = runs_folder or RUNS_FOLDER
+    if not os.path.isdir(runs_folder):
+        return []
+    link_path = os.path.join(runs_folder, LATEST_LINK)
+    latest = os.readlink(link_path) if os.path.islink(link_path) else None
+
+    finished = []
+    for name in os.listdir(runs_folder):
+        run_dir = os.path.join(runs_folder, name)
+        if name == latest or os.path.islink(run_dir) or not os.path.isdir(run_dir):
+            continue
+        manifest = _read_manifest(run_dir)
+        if manifest.get("status") in ("completed", "failed"):
+            finished.append((manifest.get("finished_at", 0), name))
+    finished.sort(reverse=True)
+
+    cutoff = time.time() - max_age_days * 86400
+    removed = []
+    for position, (finished_at, name) in enumerate(finished):
+        if position >= keep or finished_at < cutoff:
+            shutil.rmtree(os.path.join(runs_folder, name), ignore_errors=True)
+            removed.append(name)
+    if removed:
+        print(f"[DEBUG] Removed {len(removed)} old run(s) from {runs_folder}.")
+    return removed
@@ -0,0 +1,420 @@
+# === service.py ===
+"""
+Resident service mode: the qa_agent pipeline behind a local HTTP/JSON API.
+
+    cd backend
+    python service.py                      # http://127.0.0.1:8765
+
+    POST   /jobs                 {"prompt": "...", "llm_provider": "claude", "resume_from": null} -> 202 {"job_id": ...}
+    GET    /jobs                 all jobs, newest first
+    GET    /jobs/<id>            status, run id and (once finished) the result
+    GET    /jobs/<id>/events     progress events as JSON; ?after=<seq> returns only newer ones, ?wait=<s> long-polls
+    GET    /jobs/<id>/stream     the same events as a text/event-stream until the job finishes
+    DELETE /jobs/<id>            cancel a queued or running job
+    GET    /health               uptime, job counts and the state of the warm resources
+
+Event types: "status" (job lifecycle), "log" (lines the job printed), "stage" (pipeline stages),
+"snapshot" and "action" (navigator progress) and "test_results" (pytest outcome).
+
+All jobs run on one long-lived event loop, so the Chromium instance, the LLM clients (cached per
+loop) and the selector cache stay warm between jobs; each job still gets its own run workspace and
+browser context.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("SCRAPE_HEADLESS", "1")  # no one is watching the browser of a background job
+
+from dotenv import load_dotenv
+from agents.qa_agent import qa_agent
+from llm.llm_client import warm_client
+from run_context import RunContext, run_status
+from tools.browser_pool import BrowserPool
+from tools.selector_cache import SelectorCache
+
+load_dotenv()
+
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_MAX_CONCURRENT_JOBS = int(os.getenv("SERVICE_MAX_CONCURRENT_JOBS", "2"))
+SERVICE_JOB_HISTORY = int(os.getenv("SERVICE_JOB_HISTORY", "200"))  # finished jobs kept in memory
+SERVICE_WARM_BROWSER = os.getenv("SERVICE_WARM_BROWSER", "1") != "0"
+LLM_PROVIDER = os.getenv("LLM_PROVIDER")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+MAX_EVENT_TEXT = 2000
+
+CURRENT_JOB = contextvars.ContextVar("current_job", default=None)
+
+
+class Job:
+    """One submitted prompt, its lifecycle and the ordered progress events other threads can wait on."""
+
+    def __init__(self, prompt: str, llm_provider: str, resume_from: str = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.prompt = prompt
+        self.llm_provider = llm_provider
+        self.resume_from = resume_from
+        self.status = "queued"
+        self.run_id = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self.future = None
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def emit(self, event_type: str, **data) -> None:
+        with self._condition:
+            self.events.append({"seq": len(self.events), "time": round(time.time(), 3), "type": event_type, **data})
+            self._condition.notify_all()
+
+    def set_status(self, status: str, **data) -> None:
+        self.status = status
+        if status == "running":
+            self.started_at = time.time()
+        elif status in FINISHED_STATUSES:
+            self.finished_at = time.time()
+        self.emit("status", status=status, **data)
+
+    def events_after(self, after: int = -1, wait: float = 0) -> list:
+        """Events with seq > after; blocks up to `wait` seconds for new ones while the job is unfinished."""
+        deadline = time.monotonic() + wait
+        with self._condition:
+            while len(self.events) <= after + 1 and not self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self.events[after + 1:]
+
+    def events_of(self, event_type: str) -> list:
+        with self._condition:
+            return [event for event in self.events if event["type"] == event_type]
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "run_id": self.run_id,
+            "llm_provider": self.llm_provider,
+            "resume_from": self.resume_from,
+            "prompt": self.prompt,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "event_count": len(self.events),
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobLogTee:
+    """
+    sys.stdout replacement: everything is still written to the console, and lines printed while
+    a job's task is running (the tools log with print) also become that job's "log" events.
+    Asyncio tasks and asyncio.to_thread copy the context, so work a job fans out is attributed too.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._partial = {}
+
+    def write(self, text: str) -> int:
+        written = self.stream.write(text)
+        job = CURRENT_JOB.get()
+        if job is not None:
+            buffered = self._partial.pop(job.job_id, "") + text
+            *lines, rest = buffered.split("\n")
+            for line in lines:
+                if line.strip():
+                    job.emit("log", message=line[:MAX_EVENT_TEXT])
+            if rest:
+                self._partial[job.job_id] = rest
+        return written
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class QAService:
+    """
+    Owns the resident event loop (in a background thread), the warm resources and the jobs.
+    The HTTP handler threads only submit coroutines to the loop and read job state.
+    """
+
+    def __init__(self, max_concurrent: int = SERVICE_MAX_CONCURRENT_JOBS, warm_browser: bool = SERVICE_WARM_BROWSER,
+                 default_provider: str = LLM_PROVIDER):
+        self.max_concurrent = max_concurrent
+        self.default_provider = default_provider
+        self.browser_pool = BrowserPool(headless=True) if warm_browser else None
+        self.selector_cache = SelectorCache()
+        self.jobs = {}
+        # submit() runs on HTTP handler threads while others list jobs: mutate and snapshot under the lock
+        self._jobs_lock = threading.Lock()
+        self.started_at = None
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="qa-service-loop", daemon=True)
+        self._slots = None
+        self._warmed_providers = set()
+
+    def start(self) -> None:
+        self._thread.start()
+        if not isinstance(sys.stdout, JobLogTee):
+            sys.stdout = JobLogTee(sys.stdout)
+        asyncio.run_coroutine_threadsafe(self._warm_up(), self.loop).result()
+        self.started_at = time.time()
+
+    def list_jobs(self) -> list:
+        with self._jobs_lock:
+            return list(self.jobs.values())
+
+    def stop(self) -> None:
+        for job in self.list_jobs():
+            if not job.finished and job.future is not None:
+                job.future.cancel()
+        if self.browser_pool is not None:
+            asyncio.run_coroutine_threadsafe(self.browser_pool.close(), self.loop).result(timeout=30)
+        self.selector_cache.save()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+        if isinstance(sys.stdout, JobLogTee):
+            sys.stdout = sys.stdout.stream
+
+    async def _warm_up(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        if self.default_provider:
+            self._warm_provider(self.default_provider)
+        if self.browser_pool is not None:
+            try:
+                await self.browser_pool.browser()
+            except Exception as e:
+                # Not fatal: the pool retries the launch when the first job needs it
+                print(f"[WARN] Could not pre-launch the warm browser: {e}")
+
+    def _warm_provider(self, provider: str) -> None:
+        if provider in self._warmed_providers:
+            return
+        try:
+            if warm_client(provider):
+                self._warmed_providers.add(provider)
+                print(f"[INFO] LLM client for '{provider}' is warm.")
+        except Exception as e:
+            print(f"[WARN] Could not create the '{provider}' client ahead of time: {e}")
+
+    def submit(self, prompt: str, llm_provider: str = None, resume_from: str = None) -> Job:
+        job = Job(prompt, llm_provider or self.default_provider, resume_from)
+        with self._jobs_lock:
+            self.jobs[job.job_id] = job
+            self._forget_old_jobs()
+        job.emit("status", status="queued")
+        job.future = asyncio.run_coroutine_threadsafe(self._run_job(job), self.loop)
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        if job.finished or job.future is None:
+            return False
+        return job.future.cancel()
+
+    async def _run_job(self, job: Job) -> None:
+        CURRENT_JOB.set(job)  # task-local: this task's context is a copy
+        try:
+            async with self._slots:
+                run_context = RunContext.create(resume_from=job.resume_from, browser_pool=self.browser_pool,
+                                                selector_cache=self.selector_cache, on_event=job.emit)
+                job.run_id = run_context.run_id
+                job.set_status("running", run_id=run_context.run_id)
+                self._warm_provider(job.llm_provider)
+                try:
+                    output = await qa_agent.run(job.prompt, llm_provider=job.llm_provider, run_context=run_context)
+                except asyncio.CancelledError:
+                    run_context.publish("cancelled", "Cancelled through the service API")
+                    raise
+                run_context.publish(run_status(output), str(output))
+                job.result = output if isinstance(output, (dict, list)) else str(output)
+                job.set_status(run_status(output), run_id=run_context.run_id)
+        except asyncio.CancelledError:
+            job.set_status("cancelled")
+        except Exception as e:
+            print(f"[ERROR] Job {job.job_id} failed: {e}")
+            job.result = f"[ERROR] {e}"
+            job.set_status("failed", error=str(e))
+        finally:
+            CURRENT_JOB.set(None)
+
+    def _forget_old_jobs(self) -> None:
+        # Called with _jobs_lock held
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - SERVICE_JOB_HISTORY)]:
+            del self.jobs[job.job_id]
+
+    def health(self) -> dict:
+        counts = {}
+        for job in self.list_jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "max_concurrent_jobs": self.max_concurrent,
+            "jobs": counts,
+            "warm": {
+                "browser": self.browser_pool.status() if self.browser_pool else None,
+                "llm_clients": sorted(self._warmed_providers),
+                "selector_cache_pages": len(self.selector_cache.entries),
+            },
+        }
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "QAService/1.0"
+    service: QAService = None  # bound by make_server
+
+    def log_message(self, format, *args):
+        pass  # job progress is the interesting log, not every poll
+
+    def _send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_or_404(self, job_id: str):
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": f"Unknown job '{job_id}'"})
+        return job
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split("/") if part]
+        return parts, {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ["health"]:
+            return self._send_json(200, self.service.health())
+        if parts == ["jobs"]:
+            jobs = sorted(self.service.list_jobs(), key=lambda job: -job.created_at)
+            return self._send_json(200, {"jobs": [job.to_dict(include_result=False) for job in jobs]})
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = self._job_or_404(parts[1])
+            if job is None:
+                return
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2:] == ["events"]:
+                try:
+                    after, wait = int(query.get("after", -1)), min(float(query.get("wait", 0)), 60)
+                except ValueError:
+                    return self._send_json(400, {"error": "'after' must be an integer and 'wait' a number"})
+                events = job.events_after(after, wait)
+                return self._send_json(200, {"job_id": job.job_id, "status": job.status, "events": events})
+            if parts[2:] == ["stream"]:
+                try:
+                    after = int(query.get("after", -1))
+                except ValueError:
+                    return self._send_json(400, {"error": "'after' must be an integer"})
+                return self._stream_events(job, after)
+        self._send_json(404, {"error": "Not found"})
+
+    def _stream_events(self, job: Job, after: int) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                events = job.events_after(after, wait=15)
+                for event in events:
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                    after = event["seq"]
+                if not events:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                if job.finished and len(job.events) <= after + 1:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away, the job keeps running
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send_json(400, {"error": "Body must be JSON"})
+        prompt = (payload.get("prompt") or "").strip() if isinstance(payload, dict) else ""
+        if not prompt:
+            return self._send_json(400, {"error": "'prompt' is required"})
+        llm_provider = payload.get("llm_provider") or self.service.default_provider
+        if not llm_provider:
+            return self._send_json(400, {"error": "'llm_provider' is required when LLM_PROVIDER is not set"})
+        job = self.service.submit(prompt, llm_provider, payload.get("resume_from"))
+        self._send_json(202, {"job_id": job.job_id, "status": job.status,
+                              "links": {"self": f"/jobs/{job.job_id}", "events": f"/jobs/{job.job_id}/events",
+                                        "stream": f"/jobs/{job.job_id}/stream"}})
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Not found"})
+        job = self._job_or_404(parts[1])
+        if job is None:
+            return
+        if not self.service.cancel(job):
+            return self._send_json(409, {"error": f"Job is already {job.status}", "status": job.status})
+        self._send_json(202, {"job_id": job.job_id, "status": "cancelling"})
+
+
+def make_server(service: QAService, host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> ThreadingHTTPServer:
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, max_concurrent: int = SERVICE_MAX_CONCURRENT_JOBS,
+          warm_browser: bool = SERVICE_WARM_BROWSER) -> None:
+    service = QAService(max_concurrent=max_concurrent, warm_browser=warm_browser)
+    service.start()
+    server = make_server(service, host, port)
+    print(f"[INFO] QA service listening on http://{host}:{server.server_address[1]} "
+          f"(max {max_concurrent} concurrent jobs, default provider '{service.default_provider}')")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Shutting down the QA service...")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--max-concurrent", type=int, default=SERVICE_MAX_CONCURRENT_JOBS)
+    parser.add_argument("--no-warm-browser", action="store_true", help="Let every flow launch its own browser")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.max_concurrent, warm_browser=not args.no_warm_browser)
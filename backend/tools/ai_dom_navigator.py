@@ -1,15 +1,28 @@
 # === tools/ai_dom_navigator.py ===
-from playwright.async_api import async_playwright
 import json
 import os
 import re
 from llm.llm_client import query_llm
 import asyncio
-from tools.assertion_utils import handle_assertion
+import time
+from tools.assertion_utils import handle_assertion, handle_assertions_batch
+from tools.selector_cache import SelectorCache, find_element_for_selector, MIN_HIT_RATE
+from tools.network_profiles import RequestRouter
+from tools.har_replay import resolve_har_mode, har_context_options, apply_har_replay
+from tools.snapshot_store import SnapshotStore, SNAPSHOT_FILE
+from tools.browser_pool import flow_browser
+from tracing import span, traced, current_span
+from run_context import workspace_path, atomic_write_json, emit_progress
+from tools.auth_state import AUTH_STATE_ENABLED, AuthStateCache, split_login_steps, login_form_visible
+from tools.dom_fingerprint import page_fingerprint, element_set_hash, fingerprints_match
+from tools.dom_relevance import prune_dom, remaining_steps_query, selector_rank, summarize_recall
+from tools.step_profile import StepTimer, flow_profile_entry
 
-FRAMEWORK_FOLDER = "framework_output"
 DEFAULT_TIMEOUT = 10000
 MAX_STEPS = 50
+MAX_STAGNANT_STEPS = 3
+SCRAPE_HEADLESS = os.getenv("SCRAPE_HEADLESS", "0") == "1"
+STEP_SETTLE_SECONDS = float(os.getenv("NAVIGATOR_STEP_DELAY", "1.5"))  # Pause before reading the page each step
 
 def parse_llm_response(raw_response):
     try:
@@ -90,6 +103,84 @@ def enhance_with_smart_locator(el : dict) -> dict:
     el["preferred_locators"] = candidates
     return el
 
+def dedupe_by_text(elements: list) -> list:
+    """Filter duplicates: keep the deepest element for the same text (elements without text are dropped)."""
+    text_to_elements = {}
+    for el in elements:
+        text = el.get('text')
+        if text:
+            if text not in text_to_elements or el['depth'] > text_to_elements[text]['depth']:
+                text_to_elements[text] = el
+    return list(text_to_elements.values())
+
+# Counts the matches of every candidate locator in one in-page call.
+# Playwright's :has-text() is emulated with a case-insensitive textContent filter.
+COUNT_LOCATORS_JS = """
+(queries) => queries.map(({css, text, xpath}) => {
+    try {
+        if (xpath) {
+            return document.evaluate(`count(${xpath})`, document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+        }
+        const elements = Array.from(document.querySelectorAll(css || '*'));
+        if (text == null) return elements.length;
+        const needle = text.replace(/\\s+/g, ' ').trim().toLowerCase();
+        return elements.filter(el => (el.textContent || '').replace(/\\s+/g, ' ').toLowerCase().includes(needle)).length;
+    } catch (e) {
+        return null;
+    }
+})
+"""
+HAS_TEXT_SELECTOR = re.compile(r"^(?P<css>.*?):has-text\('(?P<text>.*)'\)$")
+# Lower is more stable: test ids and ids survive redesigns, text and XPath do not
+LOCATOR_STABILITY = [
+    ("[data-testid=", 0), ("#", 1), ("[name=", 2), ("[aria-label=", 3), ("//", 6),
+]
+
+
+def locator_stability(selector: str) -> int:
+    for prefix, rank in LOCATOR_STABILITY:
+        if selector.startswith(prefix):
+            return rank
+    return 4 if "[type=" in selector else 5
+
+
+def _locator_query(selector: str) -> dict:
+    if selector.startswith("//"):
+        return {"xpath": selector}
+    match = HAS_TEXT_SELECTOR.match(selector)
+    if match:
+        return {"css": match.group("css") or "*", "text": match.group("text").replace("\\'", "'")}
+    return {"css": selector}
+
+
+async def score_locator_uniqueness(page, elements: list) -> list:
+    """
+    Compute match counts for all candidate locators of all elements in one batch and
+    rank each element's preferred_locators: unique first, then by stability.
+    Counts are kept on the element as `locator_match_counts`.
+    """
+    selectors = list(dict.fromkeys(loc for el in elements for loc in el.get("preferred_locators", [])))
+    if not selectors:
+        return elements
+    try:
+        counts = await page.evaluate(COUNT_LOCATORS_JS, [_locator_query(sel) for sel in selectors])
+    except Exception as e:
+        print(f"[WARN] Locator uniqueness scoring failed: {e}")
+        return elements
+    count_by_selector = dict(zip(selectors, counts))
+
+    def rank(selector):
+        count = count_by_selector.get(selector)
+        uniqueness = 2 if count is None else (0 if count == 1 else (1 if count > 1 else 3))
+        return (uniqueness, locator_stability(selector))
+
+    for el in elements:
+        locators = el.get("preferred_locators", [])
+        el["preferred_locators"] = sorted(locators, key=rank)
+        el["locator_match_counts"] = {loc: count_by_selector.get(loc) for loc in el["preferred_locators"]}
+    return elements
+
+
 def clean_json_response(text: str) -> str:
     """
     Remove markdown code fences (```json ... ```) or ``` ... ``` from LLM output.
@@ -98,10 +189,12 @@ def clean_json_response(text: str) -> str:
     cleaned = re.sub(r"```[\w]*\n(.+?)\n```", r"\1", cleaned, flags=re.DOTALL)
     return cleaned.strip()
         
-async def get_next_steps(prompt: str, llm_provider: str) -> dict:
+async def get_next_steps(prompt: str, llm_provider: str, step_timer: StepTimer = None) -> dict:
     """
     Generate next steps for DOM navigation using an LLM.
+    With a `step_timer`, the LLM round-trip and the parse are recorded as separate phases.
     """
+    step_timer = step_timer or StepTimer()
     system_prompt= """
     You are an expert in web UI automation and DOM navigation.
     Your job is to analyze the current page's DOM structure and suggest the next best action in a multi-step user flow.
@@ -112,6 +205,7 @@ async def get_next_steps(prompt: str, llm_provider: str) -> dict:
     - Follow the user-defined steps in the exact sequence provided in the goal prompt.
     - DO NOT click or interact with fields/buttons meant for later steps, even if they appear in the DOM now.
     - Each DOM element includes a list of `preferred_locators`. You must use one of these locators — DO NOT invent or hallucinate new selectors.
+    - `preferred_locators` are ranked best first; `locator_match_counts` shows how many elements each locator matches on the page. Prefer locators with a count of 1, and provide an `index` when the count is greater than 1.
     - Prioritize robust selectors in this order: `data-testid`, `id`, `name`, `aria-label`, `class`, then text-based selectors (e.g., `:has-text()` or XPath with `contains(text())`).
     - If an action fails (e.g., element not found), suggest an alternative selector or recovery action (e.g., wait, refresh, or check for error messages).
     - DO NOT skip steps or assume a step is complete unless the DOM clearly indicates the action was successful (e.g., a login form is no longer present after submission).
@@ -163,14 +257,16 @@ async def get_next_steps(prompt: str, llm_provider: str) -> dict:
         "description": "Flow completed or no further actions required."
     }
     """
-    response = await query_llm(
-        user_prompt=prompt,
-        system_prompt=system_prompt,
-        provider=llm_provider
-    )
+    with step_timer.phase("llm_ms"):
+        response = await query_llm(
+            user_prompt=prompt,
+            system_prompt=system_prompt,
+            provider=llm_provider
+        )
     print("[DEBUG] Raw LLM response:", response)
     
-    parsed_response = parse_llm_response(response)
+    with step_timer.phase("parse_ms"):
+        parsed_response = parse_llm_response(response)
     if not parsed_response:
             print("[WARN] Could not parse LLM response, skipping step.")
             return [{"type": "end", "action": "end", "description": "Invalid LLM response"}]
@@ -178,9 +274,11 @@ async def get_next_steps(prompt: str, llm_provider: str) -> dict:
     return parsed_response if isinstance(parsed_response, list) else [parsed_response]
     
 
-async def extract_dom_structure(page) -> dict:
+@traced("dom.extract")
+async def extract_dom_structure(page, selector_cache: SelectorCache = None, step_timer: StepTimer = None) -> dict:
     
-    await page.wait_for_load_state("networkidle", timeout=60000)  # Wait for dynamic content
+    with (step_timer or StepTimer()).phase("ready_ms"):
+        await page.wait_for_load_state("networkidle", timeout=60000)  # Wait for dynamic content
     elements = []
     
     async def traverse_element(handle, depth = 0, parent_text=""):
@@ -220,11 +318,15 @@ async def extract_dom_structure(page) -> dict:
                
             full_text = (await handle.evaluate("el => el.innerText || el.textContent || ''")).strip()
                 
-            # Check if element is potentially clickable
-            is_clickable = await handle.evaluate("""
+            # Check if element is potentially clickable, and whether it is in the viewport
+            flags = await handle.evaluate("""
                 el => {
                     const style = window.getComputedStyle(el);
-                    return (
+                    const rect = el.getBoundingClientRect();
+                    const inViewport = rect.width > 0 && rect.height > 0 &&
+                        rect.bottom > 0 && rect.right > 0 &&
+                        rect.top < window.innerHeight && rect.left < window.innerWidth;
+                    const clickable = (
                         style.cursor === 'pointer' ||
                         el.onclick !== null ||
                         el.getAttribute('role') === 'button' ||
@@ -236,8 +338,10 @@ async def extract_dom_structure(page) -> dict:
                         el.classList.contains('card') ||
                         el.classList.contains('Card')
                     );
+                    return {clickable: clickable, in_viewport: inViewport};
                 }
             """)
+            is_clickable = flags["clickable"]
 
             # Decide whether to include this element
             should_include = False
@@ -282,6 +386,7 @@ async def extract_dom_structure(page) -> dict:
                     'text': text_to_use,
                     'attrs': attrs,
                     'clickable': is_clickable,
+                    'in_viewport': flags["in_viewport"],
                     'depth': depth,
                     'parent_text': parent_text # for debugging
                 }
@@ -311,154 +416,374 @@ async def extract_dom_structure(page) -> dict:
             print("Warning: No body element found")
             elements = []
 
-        # Filter duplicates: Keep element with deepest depth for same text
-        text_to_elements = {}
-        for el in elements:
-            text = el.get('text')
-            if text:
-                if text not in text_to_elements or el['depth'] > text_to_elements[text]['depth']:
-                    text_to_elements[text] = el
-        elements = list(text_to_elements.values())
+        elements = dedupe_by_text(elements)
 
+        # Rank candidates by how many elements they actually match
+        elements = await score_locator_uniqueness(page, elements)
+
+        # Selectors that worked in earlier runs go first
+        if selector_cache is not None:
+            for el in elements:
+                selector_cache.rank_locators(page.url, el)
+
+        current_span().set(url=page.url, element_count=len(elements))
         return {"url": page.url, "elements": elements}
     
     except Exception as e:
         print(f"Error in extract_dom_structure: {e}")
         return {"url": page.url, "elements": []}
 
-async def execute_action(page, action, retries=3, timeout=10000):
+# Resolves, disambiguates by index and checks interactability in a single in-page call
+RESOLVE_TARGET_JS = """
+(elements, index) => {
+    const chosen = (index != null && index >= 0 && index < elements.length) ? index : 0;
+    const el = elements[chosen];
+    if (!el) return {count: 0, index: null, state: 'missing'};
+    const rect = el.getBoundingClientRect();
+    const visible = rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    const state = !visible ? 'hidden' : (el.disabled ? 'disabled' : 'ready');
+    return {count: elements.length, index: chosen, state: state};
+}
+"""
+BACKOFF_INITIAL_MS = 50
+BACKOFF_MAX_MS = 1000
+RETRY_BACKOFF_INITIAL_MS = 250
+RETRY_BACKOFF_MAX_MS = 2000
+INTERACTIVE_ACTIONS = {"click", "input", "fill", "select", "enter", "press"}
+
+
+async def resolve_target(page, selector, index, require_ready, timeout, timing):
     """
-    Executes a single action on the page. Always returns a dict with 'success' and 'message'.
+    Resolve the target element for an action, waiting adaptively for it to become ready:
+    missing elements wait for attachment, hidden ones for visibility, disabled ones are
+    polled with exponential backoff. Returns the locator for the chosen element.
     """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout / 1000
+    delay_ms = BACKOFF_INITIAL_MS
+    locator = page.locator(selector)
+
+    while True:
+        started = time.perf_counter()
+        target = await locator.evaluate_all(RESOLVE_TARGET_JS, index)
+        timing["resolve_ms"] += (time.perf_counter() - started) * 1000
+        timing["resolve_calls"] += 1
+
+        state = target["state"]
+        if state == "ready" or (state != "missing" and not require_ready):
+            if target["count"] > 1:
+                if index is not None and index == target["index"]:
+                    print(f"[INFO] Using element at index {index} for selector '{selector}' ({target['count']} matches)")
+                else:
+                    print(f"[WARN] Selector '{selector}' matched {target['count']} elements, no valid index provided — using first match.")
+                return locator.nth(target["index"])
+            return locator
+
+        remaining_ms = (deadline - loop.time()) * 1000
+        if remaining_ms <= 0:
+            if state == "missing":
+                raise Exception(f"No elements found for selector: {selector}")
+            raise Exception(f"Element {selector} is not interactable ({state})")
+
+        started = time.perf_counter()
+        try:
+            if state == "missing":
+                await locator.first.wait_for(state="attached", timeout=remaining_ms)
+            elif state == "hidden":
+                await locator.nth(target["index"]).wait_for(state="visible", timeout=remaining_ms)
+            else:
+                await asyncio.sleep(min(delay_ms, remaining_ms) / 1000)
+                delay_ms = min(delay_ms * 2, BACKOFF_MAX_MS)
+        except Exception:
+            pass  # deadline reached, the next resolve reports the final state
+        timing["wait_ms"] += (time.perf_counter() - started) * 1000
+
+
+def trace_timing(result: dict) -> dict:
+    """Span attributes from an execute_action timing breakdown."""
+    timing = result.get("timing") or {}
+    attempts = timing.get("attempts", 0)
+    return {"attempts": attempts, "retries": max(0, attempts - 1), "resolve_calls": timing.get("resolve_calls"),
+            "wait_ms": timing.get("wait_ms"), "action_ms": timing.get("action_ms"), "backoff_ms": timing.get("backoff_ms"),
+            "fallbacks_tried": timing.get("fallbacks_tried", 0)}
+
+
+async def execute_action(page, action, retries=3, timeout=10000, fallback_selectors=None):
+    """
+    Executes a single action on the page. Always returns a dict with 'success' and 'message',
+    plus a 'timing' breakdown of where the time went.
+    If the action fails, each of `fallback_selectors` is tried once before giving up.
+    """
+    if fallback_selectors:
+        result = await execute_action(page, action, retries, timeout)
+        if result.get("success"):
+            return result
+        # The reported timing stays the first selector's, plus what the fallbacks cost on top
+        backoff_ms = result["timing"].get("backoff_ms", 0.0)
+        for tried, fallback in enumerate(fallback_selectors, start=1):
+            print(f"[INFO] Retrying {action.get('type')} with cached selector '{fallback}'")
+            healed = await execute_action(page, {**action, "selector": fallback, "index": None}, retries=1, timeout=min(timeout, 3000))
+            healed["timing"]["fallbacks_tried"] = result["timing"]["fallbacks_tried"] = tried
+            healed["timing"]["backoff_ms"] = result["timing"]["backoff_ms"] = backoff_ms
+            if healed.get("success"):
+                healed["selector_used"] = fallback
+                return healed
+        return result
+
     selector = action.get('selector')
     index = action.get("index")
     action_subtype = action.get("subtype")
     action_type = action.get("type")
     result = {"success": False, "message": ""}
+    timing = {"resolve_ms": 0.0, "wait_ms": 0.0, "action_ms": 0.0, "backoff_ms": 0.0, "resolve_calls": 0, "attempts": 0}
+    result["timing"] = timing
+    action_started = time.perf_counter()
+    retry_delay_ms = RETRY_BACKOFF_INITIAL_MS
+
+    def finish(res: dict) -> dict:
+        res["timing"] = timing
+        timing["total_ms"] = round((time.perf_counter() - action_started) * 1000, 1)
+        for key in ("resolve_ms", "wait_ms", "action_ms", "backoff_ms"):
+            timing[key] = round(timing[key], 1)
+        return res
 
     for attempt in range(retries):
+        timing["attempts"] = attempt + 1
         try:
             if not selector and action_type not in ["navigate"] and action_subtype not in ["title", "url"]:
                 result["message"] = "No selector provided for action."
-                return result
+                return finish(result)
             if selector:
-                await page.wait_for_selector(selector, state="visible", timeout=timeout)
-                locator = page.locator(selector)
-                count = await locator.count()
-                if count == 0:
-                    raise Exception(f"No elements found for selector: {selector}")
-                elif count > 1:
-                    print(f"[WARN] Selector '{selector}' matched {count} elements, Attempting matches based on index specified in user prompt.")
-                    if index is not None and 0 <= index < count:
-                        print(f"[INFO] Using element at index {index} for selector '{selector}'")
-                        locator = locator.nth(index)
-                    else:
-                        print(f"[INFO] No index provided — using first match.")
-                        locator = locator.nth(0)
-                # Check if element is interactable
-                is_enabled = await locator.evaluate("el => !el.disabled && el.offsetParent !== null")
-                if not is_enabled:
-                    raise Exception(f"Element {selector} is not interactable (disabled or hidden)")
+                locator = await resolve_target(
+                    page, selector, index, action_type in INTERACTIVE_ACTIONS, timeout, timing
+                )
             else:
                 locator = None
             # Execute the action
-            match action_type:
-                case 'click':
-                    await locator.click(timeout=timeout)
-                    result["success"] = True
-                    result["message"] = "Click action performed successfully."
-                case 'input' | 'fill':
-                    await locator.fill(action.get('value', ""), timeout=timeout)
-                    result["success"] = True
-                    result["message"] = "Fill action performed successfully."
-                case 'select':
-                    await locator.select_option(action.get('value', ""), timeout=timeout)
-                    result["success"] = True
-                    result["message"] = "Select action performed successfully."
-                case 'navigate':
-                    if page.url == action.get('url', ""):
-                        print(f"[INFO] Already at URL: {page.url}, skipping navigation.")
+            started = time.perf_counter()
+            try:
+                match action_type:
+                    case 'click':
+                        await locator.click(timeout=timeout)
                         result["success"] = True
-                        result["message"] = "Already at target URL."
-                        return result
-                    await page.goto(action.get('url', ""), wait_until="domcontentloaded", timeout=60000)
-                    result["success"] = True
-                    result["message"] = "Navigation performed successfully."
-                case 'enter' | 'press':
-                    await locator.press(action.get('key', "Enter"), timeout=timeout)
-                    result["success"] = True
-                    result["message"] = "Key press performed successfully."
-                case 'submit':
-                    await locator.evaluate("(form) => form.submit()", timeout=timeout)
-                    result["success"] = True
-                    result["message"] = "Form submitted successfully."
-                case 'assert' | 'verify':
-                    assertion_result = await handle_assertion(page, action, locator)
-                    print(f"[ASSERT RESULT] {assertion_result['message']}")
-                    return assertion_result
-                case _:
-                    result["message"] = f"Unknown action type: {action_type}"
-            return result
+                        result["message"] = "Click action performed successfully."
+                    case 'input' | 'fill':
+                        await locator.fill(action.get('value', ""), timeout=timeout)
+                        result["success"] = True
+                        result["message"] = "Fill action performed successfully."
+                    case 'select':
+                        await locator.select_option(action.get('value', ""), timeout=timeout)
+                        result["success"] = True
+                        result["message"] = "Select action performed successfully."
+                    case 'navigate':
+                        if page.url == action.get('url', ""):
+                            print(f"[INFO] Already at URL: {page.url}, skipping navigation.")
+                            result["success"] = True
+                            result["message"] = "Already at target URL."
+                            return finish(result)
+                        await page.goto(action.get('url', ""), wait_until="domcontentloaded", timeout=60000)
+                        result["success"] = True
+                        result["message"] = "Navigation performed successfully."
+                    case 'enter' | 'press':
+                        await locator.press(action.get('key', "Enter"), timeout=timeout)
+                        result["success"] = True
+                        result["message"] = "Key press performed successfully."
+                    case 'submit':
+                        await locator.evaluate("(form) => form.submit()", timeout=timeout)
+                        result["success"] = True
+                        result["message"] = "Form submitted successfully."
+                    case 'assert' | 'verify':
+                        assertion_result = await handle_assertion(page, action, locator)
+                        print(f"[ASSERT RESULT] {assertion_result['message']}")
+                        return finish(assertion_result)
+                    case _:
+                        result["message"] = f"Unknown action type: {action_type}"
+            finally:
+                timing["action_ms"] += (time.perf_counter() - started) * 1000
+            return finish(result)
         except Exception as e:
             print(f"[WARN] Attempt {attempt + 1} failed for action {action_type} on {selector}: {e}")
             result["message"] = str(e)
             if attempt == retries - 1:
                 print(f"[ERROR] Action failed after {retries} attempts: {action}")
-                return result
-            await page.wait_for_timeout(2000)  # Wait before retrying
-    return result
-
-async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
+                return finish(result)
+            # Back off adaptively instead of a fixed 2s sleep before retrying
+            started = time.perf_counter()
+            await page.wait_for_timeout(retry_delay_ms)
+            timing["backoff_ms"] += (time.perf_counter() - started) * 1000
+            retry_delay_ms = min(retry_delay_ms * 2, RETRY_BACKOFF_MAX_MS)
+    return finish(result)
+
+async def ai_guided_flow_navigator( url, llm_provider, goal_prompt, routing_profile=None, har_mode=None, reuse_login=AUTH_STATE_ENABLED,
+                                  run_context=None) -> dict:
     """
     AI-guided DOM navigation tool that iteratively performs actions based on LLM guidance.
     """
-    async with async_playwright() as p:
-        steps_count = len(re.findall(r'^\s*\d+\.\s*', goal_prompt, re.MULTILINE))
-
+    workspace = workspace_path(run_context)
+    # A resident service hands in a warm browser; otherwise this flow launches and closes its own
+    async with flow_browser(getattr(run_context, "browser_pool", None), headless=SCRAPE_HEADLESS) as browser:
         print("[DEBUG] Starting AI-guided DOM navigation...")
-        browser = await p.chromium.launch(headless=False, # Set headless=True later
-                                        #   slow_mo=50,  # remove or adjust for production
-                                          args=["--start-fullscreen"]) 
-        context = await browser.new_context(permissions=["geolocation"], locale="en-US")  # Add geolocation permission if needed
-        page = await context.new_page()
-
-        print(f"[DEBUG] Navigating to: {url}")
-        await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+        # capture: record a HAR for this flow, replay: serve every request from it
+        try:
+            har_mode, har_path = resolve_har_mode(url, goal_prompt, har_mode)
+        except FileNotFoundError as e:
+            return f"[ERROR] {e}"
+        # Skip images, fonts, ads... that do not matter for locator extraction.
+        # Nothing to save when replaying, so only the statistics listener is attached.
+        request_router = RequestRouter.from_env("full" if har_mode == "replay" else routing_profile)
+
+        async def open_flow_page(start_url, storage_state=None):
+            context = await browser.new_context(permissions=["geolocation"], locale="en-US",  # Add geolocation permission if needed
+                                                storage_state=storage_state,
+                                                **har_context_options(har_mode, har_path))
+            await apply_har_replay(context, har_mode, har_path)
+            await request_router.attach(context)
+            page = await context.new_page()
+            print(f"[DEBUG] Navigating to: {start_url}")
+            await page.goto(start_url, wait_until='domcontentloaded', timeout=60000)
+            return context, page
+
+        # Leading "log in" steps can be replaced by a saved session for the same site and credentials
+        login_steps, flow_prompt = split_login_steps(goal_prompt) if reuse_login else ([], goal_prompt)
+        auth_cache = AuthStateCache(url, login_steps) if login_steps else None
+        auth_meta = auth_cache.load() if auth_cache else None
+        actions_log = []
+        if auth_meta:
+            context, page = await open_flow_page(auth_meta.get("landing_url") or url, auth_cache.state_path)
+            if await login_form_visible(page):
+                print("[INFO] Saved login state was rejected by the site, logging in again.")
+                auth_cache.invalidate()
+                auth_meta = None
+                await context.close()
+        if auth_meta:
+            print(f"[INFO] Reusing saved login state, skipping {len(login_steps)} login step(s).")
+            goal_prompt = flow_prompt
+            # The generated tests still start from a fresh browser, so they need the login actions
+            actions_log.extend(auth_cache.replay_actions(auth_meta))
+            auth_cache = None
+        else:
+            context, page = await open_flow_page(url)
+        login_form_seen = False
+        steps_count = len(re.findall(r'^\s*\d+\.\s*', goal_prompt, re.MULTILINE))
         print("[DEBUG] Page loaded successfully.")
 
+        selector_cache = getattr(run_context, "selector_cache", None) or SelectorCache()
+        relevance_diagnostics = []
         history = []
-        history_dom = []  # <-- Collect DOM snapshots for each step
-        prev_dom_elements = set()
-        prev_element_count = 0
-        prev_html = ""
-        actions_log = []
+        # Snapshots are streamed to disk as they are taken instead of held for the whole flow
+        snapshot_store = SnapshotStore(os.path.join(workspace, SNAPSHOT_FILE))
+        prev_fingerprint = {}
+        prev_element_set = None
+        prev_attempted = 0
+        stagnant_steps = 0
+        actions_reported = 0
+
+        def report_actions():
+            # Live progress for a UI or service job: the log entries added since the last report
+            nonlocal actions_reported
+            for entry in actions_log[actions_reported:]:
+                emit_progress(run_context, "action", action=entry)
+            actions_reported = len(actions_log)
+
+        flow_started = time.perf_counter()
+        step_timings = []
+
+        def attempted_actions() -> int:
+            # Distinct actions tried so far, failed ones included: a new pick on an unchanged page is progress,
+            # repeating the same one is not
+            return len({(entry.get("action_type"), entry.get("selector"), entry.get("index"), str(entry.get("value")))
+                        for entry in actions_log if not entry.get("from_auth_cache")})
+
+        async def stop_incomplete(error: str) -> dict:
+            report_actions()
+            actions_log.append(flow_profile_entry(step_timings, flow_started))
+            await context.close()  # flushes the HAR recording in capture mode
+            selector_cache.save()
+            return {
+                "error": error,
+                "completed_steps": len(history),
+                "expected_steps": steps_count,
+                "actions_log": actions_log
+            }
+
+        def close_step(step_timer, first_entry):
+            # The breakdown rides on the step's first log entry; the flow profile counts every step
+            timing = step_timer.as_dict()
+            step_timings.append(timing)
+            if len(actions_log) > first_entry:
+                actions_log[first_entry]["step_timing"] = timing
 
         for step in range(50):
-            await asyncio.sleep(1.5)  
-            dom = await extract_dom_structure(page)
-            history_dom.append(dom)  # Store current DOM snapshot
+            report_actions()
+            step_timer = StepTimer()
+            step_first_entry = len(actions_log)
+            with step_timer.phase("ready_ms"):
+                await asyncio.sleep(STEP_SETTLE_SECONDS)
+            if auth_cache:
+                # Login is done once the password field has gone away after the form was filled
+                form_visible = await login_form_visible(page)
+                login_form_seen = login_form_seen or form_visible
+                filled = any(entry.get("success") and entry.get("action_type") in ("fill", "input") for entry in actions_log)
+                if login_form_seen and filled and not form_visible:
+                    await auth_cache.save(context, page.url, [entry for entry in actions_log if entry.get("success")])
+                    auth_cache = None
+            # A cheap in-page fingerprint decides whether the page needs re-extracting at all
+            with step_timer.phase("fingerprint_ms"):
+                curr_fingerprint = await page_fingerprint(page)
+            page_unchanged = step > 0 and fingerprints_match(prev_fingerprint, curr_fingerprint)
+            if page_unchanged:
+                print("[DEBUG] Page fingerprint unchanged, reusing previous DOM snapshot.")
+            else:
+                with span("dom.snapshot", step=step + 1), step_timer.phase("extract_ms"):
+                    dom = await extract_dom_structure(page, selector_cache, step_timer)
+                    snapshot_store.append(dom, step + 1)
+                emit_progress(run_context, "snapshot", step=step + 1, url=dom["url"], elements=len(dom["elements"]),
+                              snapshots=snapshot_store.snapshot_count)
+            curr_element_set = element_set_hash(dom)
 
             # Stagnation check
-            curr_html = await page.content()
-            curr_dom_elements = set(
-                el.get('id') or el.get('name') or el.get('text') for el in dom['elements']
-            )
-
-            if (
-                curr_html == prev_html and
-                prev_dom_elements == curr_dom_elements and
-                len(dom["elements"]) == prev_element_count and
-                step > 0
-            ):
-                print("[WARN] DOM unchanged . Attempting to continue with next action.")
-                # break
+            if step > 0 and (page_unchanged or (curr_element_set == prev_element_set and dom["url"] == prev_fingerprint.get("url"))):
+                if attempted_actions() == prev_attempted:
+                    # Same page and nothing new tried means the same prompt: another LLM call is unlikely to help
+                    stagnant_steps += 1
+                    print(f"[WARN] DOM unchanged and no progress for {stagnant_steps} step(s).")
+                    if stagnant_steps >= MAX_STAGNANT_STEPS:
+                        print("[ERROR] Flow is stuck, stopping instead of repeating the same LLM call.")
+                        actions_log.append({
+                            "step": step + 1,
+                            "action_type": "end",
+                            "description": f"Stopped: page unchanged for {stagnant_steps} steps without progress.",
+                            "url": page.url,
+                        })
+                        close_step(step_timer, step_first_entry)
+                        if step + 1 < steps_count:
+                            return await stop_incomplete(
+                                f"Flow stuck: page unchanged for {stagnant_steps} steps without progress. "
+                                f"Expected {steps_count} steps, but got {len(history)}."
+                            )
+                        break
+                else:
+                    stagnant_steps = 0
+                    print("[WARN] DOM unchanged . Attempting to continue with next action.")
+            else:
+                stagnant_steps = 0
 
             # Update for next step
-            prev_dom_elements = curr_dom_elements
-            prev_element_count = len(dom["elements"])
-            prev_html = curr_html
+            prev_fingerprint = curr_fingerprint
+            prev_element_set = curr_element_set
+            prev_attempted = attempted_actions()
 
             
+            prompt_started = time.perf_counter()
+            # Only the elements relevant to the current step go into the prompt
+            # The loop counter is not the goal step: a turn can finish several steps, or none
+            progressed_turns = len({entry["step"] for entry in actions_log
+                                    if entry.get("success") and not entry.get("from_auth_cache")})
+            query_text, focus_text = remaining_steps_query(goal_prompt, progressed_turns)
+            prompt_dom, relevance_ranking = prune_dom(dom, query_text, focus_text=focus_text)
+            if prompt_dom is not dom:
+                print(f"[DEBUG] Pruned DOM snapshot to {len(prompt_dom['elements'])} of {len(dom['elements'])} elements.")
+
             # Prompt to LLM
             title = await page.title()
             prompt = f"""
@@ -470,20 +795,37 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
             {json.dumps(history, indent=2)}
             Current page title: {title}
             Current page URL: {page.url}
-            Current DOM snapshot:
-            {json.dumps(dom, indent=2)}
+            Current DOM snapshot (most relevant elements for this step):
+            {json.dumps(prompt_dom, indent=2)}
             Step to perform next:{step + 1}
             Only suggest actions that are relevant to the current step to move closer to the goal.
             Respond with a single valid JSON object in the format specified.
             """
+            step_timer.add("prompt_ms", (time.perf_counter() - prompt_started) * 1000)
 
             try:
-                actions = await get_next_steps(prompt, llm_provider)
+                with span("llm.next_steps", step=step + 1, element_count=len(prompt_dom.get("elements", [])),
+                          prompt_chars=len(prompt)) as llm_span:
+                    actions = await get_next_steps(prompt, llm_provider, step_timer)
+                    llm_span.set(actions=len(actions) if isinstance(actions, list) else 1)
                 print(f"[DEBUG] Executing action: {json.dumps(actions, indent=2)}")
             except Exception as e:
                 print(f"[ERROR] LLM response could not be parsed: {e}")
+                close_step(step_timer, step_first_entry)
                 continue  
 
+            # Recall diagnostics: where did the element the LLM picked rank?
+            pruned_locators = {loc for el in prompt_dom["elements"] for loc in el.get("preferred_locators", [])}
+            for action in actions:
+                if action.get("selector"):
+                    relevance_diagnostics.append({
+                        "step": step + 1,
+                        "selector": action["selector"],
+                        "rank": selector_rank(dom, relevance_ranking, action["selector"]),
+                        "in_pruned": action["selector"] in pruned_locators,
+                        "element_count": len(dom["elements"]),
+                    })
+
             # Check for 'end' action before executing actions
             if any(action.get("type") == "end" for action in actions):
                 # Log the 'end' step
@@ -495,21 +837,39 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                 })
                 if step + 1 < steps_count:
                     print("[ERROR] Flow ended prematurely, not all steps completed.")
-                    return {
-                        "error": f"LLM returned 'end' action before completing all steps. Expected {steps_count}, but got {len(history)}.",
-                        "completed_steps": len(history),
-                        "expected_steps": steps_count,
-                        "actions_log": actions_log
-                    }
+                    close_step(step_timer, step_first_entry)
+                    return await stop_incomplete(
+                        f"LLM returned 'end' action before completing all steps. Expected {steps_count}, but got {len(history)}."
+                    )
                 print(f"[INFO] Reached end of flow: {actions[0].get('description')}")
+                close_step(step_timer, step_first_entry)
                 break
 
-            for action in actions:
+            batched_results = {}
+            for action_index, action in enumerate(actions):
                 action_type = action.get("type")
 
                 # Handle assert/verify
                 if action_type in ["assert", "verify"]:
-                    result = await execute_action(page, action)
+                    if action_index not in batched_results:
+                        # Evaluate a run of consecutive assertions in one in-page call
+                        run_end = action_index
+                        while run_end < len(actions) and actions[run_end].get("type") in ["assert", "verify"]:
+                            run_end += 1
+                        if run_end - action_index > 1:
+                            with span("browser.assert_batch", step=step + 1, assertions=run_end - action_index), \
+                                    step_timer.phase("action_ms"):
+                                batch = await handle_assertions_batch(page, actions[action_index:run_end])
+                            batched_results.update(zip(range(action_index, run_end), batch))
+                    result = batched_results.pop(action_index, None)
+                    if result is None:
+                        with span("browser.action", step=step + 1, type=action_type, selector=action.get("selector")) as action_span, \
+                                step_timer.phase("action_ms"):
+                            result = await execute_action(page, action)
+                            action_span.set(success=result.get("success", False), **trace_timing(result))
+                        step_timer.add_action(result)
+                    else:
+                        print(f"[ASSERT RESULT] {result['message']}")
                     actions_log.append({
                         "step": step + 1,
                         "action_type": action.get("type"),
@@ -518,14 +878,16 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                         "message": result.get("message", "No message"),
                         "description": action.get("description", ""),
                         "url": page.url,
-                        "success": result.get("success", False)
+                        "success": result.get("success", False),
+                        "timing": result.get("timing")
                     })
-                    # Add to history so LLM knows this step is done
+                    # Add to history so LLM knows this step is done. History only carries what was done:
+                    # the current page is already in the prompt, earlier snapshots would grow it every step
                     history.append({
                         "step": step + 1,
                         "url": page.url,
                         "action": action,
-                        "dom_snippet": dom
+                        "result": result.get("message", "")
                     })
                     if not result.get("success", False):
                         print(f"[ERROR] Assertion failed: {result.get('message', '')}")
@@ -539,7 +901,7 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                         "step": step + 1,
                         "url": page.url,
                         "action": action,
-                        "dom_snippet": dom
+                        "result": "Already at target URL."
                     })
                     continue
                 # Skip speculative close actions
@@ -551,7 +913,28 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                     continue
 
                 print(f"[Step {step + 1}] Performing : {action.get('description', action)}")
-                result = await execute_action(page, action)
+                # Try selectors with a proven track record before spending an LLM call on recovery
+                element = None
+                fallbacks = []
+                if action.get("selector") and action.get("index") is None:
+                    element = find_element_for_selector(dom, action["selector"])
+                if element is not None:
+                    fallbacks = [loc for loc in selector_cache.best_selectors(dom["url"], element) if loc != action["selector"]]
+                    rate = selector_cache.selector_hit_rate(dom["url"], element, action["selector"])
+                    if fallbacks and rate is not None and rate < MIN_HIT_RATE:
+                        # The LLM's pick has a poor history: lead with the cached best instead
+                        fallbacks.append(action["selector"])
+                        action = {**action, "selector": fallbacks.pop(0)}
+                with span("browser.action", step=step + 1, type=action_type, selector=action.get("selector"),
+                          fallbacks=len(fallbacks)) as action_span, step_timer.phase("action_ms"):
+                    result = await execute_action(page, action, retries=1 if fallbacks else 3, fallback_selectors=fallbacks)
+                    action_span.set(success=result.get("success", False), healed=bool(result.get("selector_used")), **trace_timing(result))
+                step_timer.add_action(result)
+                if element is not None:
+                    selector_cache.record(dom["url"], element, action["selector"], result.get("success", False) and not result.get("selector_used"))
+                    if result.get("selector_used"):
+                        selector_cache.record(dom["url"], element, result["selector_used"], True)
+                        action = {**action, "selector": result["selector_used"]}
                 if not result.get("success", False):
                     print(f"[WARN] Skipping failed action: {action}")
                     actions_log.append({
@@ -560,7 +943,8 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                         "selector": action.get("selector"),
                         "message": result.get("message", "No message"),
                         "url": page.url,
-                        "success": False
+                        "success": False,
+                        "timing": result.get("timing")
                     })
                     continue
 
@@ -572,48 +956,63 @@ async def ai_guided_flow_navigator( url, llm_provider, goal_prompt) -> dict:
                     "value": action.get("value"),
                     "description": action.get("description", ""),
                     "url": page.url,
-                    "success": True
+                    "success": True,
+                    "timing": result.get("timing")
                 })
 
                 history.append({
                     "step": step + 1,
                     "url": page.url,
                     "action": action,
-                    "dom_snippet": dom
+                    "result": result.get("message", "")
                 })
 
+            close_step(step_timer, step_first_entry)
               
+        report_actions()
+        actions_log.append(flow_profile_entry(step_timings, flow_started))
         # Save the final DOM structure
         final_dom = await extract_dom_structure(page)
-        history_dom.append(final_dom)  # Store final DOM snapshot
+        snapshot_store.append(final_dom)  # Store final DOM snapshot
+        emit_progress(run_context, "snapshot", step=None, url=final_dom["url"], elements=len(final_dom["elements"]),
+                      snapshots=snapshot_store.snapshot_count)
 
-        await browser.close()
+        await context.close()  # flushes the HAR recording in capture mode
+        selector_cache.save()
+        if har_mode == "capture":
+            print(f"[INFO] Network recording saved to: {har_path}")
 
-        # Save the final DOM structure
-        output_dir = os.path.join(FRAMEWORK_FOLDER)
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, "dom_flow_output.json")
-        total_pages_scraped = len(history_dom)
+        output_path = snapshot_store.path
+        total_pages_scraped = snapshot_store.snapshot_count
 
         # Optionally save or print the actions log
-        actions_log_path = os.path.join(FRAMEWORK_FOLDER, "actions_log.json")
+        actions_log_path = os.path.join(workspace, "actions_log.json")
         try:
-            with open(actions_log_path, "w", encoding="utf-8") as f:
-                json.dump(actions_log, f, indent=4)
+            atomic_write_json(actions_log_path, actions_log)
             print(f"[INFO] Actions log saved to: {actions_log_path}")
         except Exception as e:
             print(f"[ERROR] Failed to save actions log: {e}")
 
-        print(f"\n[DEBUG] Scraped {total_pages_scraped} DOM snapshots (pages)")
-        print(f"[INFO] Attempting to write to: {output_path}")
-
+        diagnostics_path = os.path.join(workspace, "relevance_diagnostics.json")
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(history_dom, f, indent=4)
-            print(f"\n --> All DOM data saved to: {output_path}")
-            print(f"\n --> All Action log data saved to: {actions_log_path}")
-            return f"Scraped {len(history_dom)} pages. Output saved to {output_path}."
+            with open(diagnostics_path, "w", encoding="utf-8") as f:
+                json.dump({"summary": summarize_recall(relevance_diagnostics), "actions": relevance_diagnostics}, f, indent=4)
+        except Exception as e:
+            print(f"[WARN] Failed to save relevance diagnostics: {e}")
 
+        network_report = {**request_router.report(), "har_mode": har_mode, "har_path": har_path}
+        print(f"[INFO] Network: blocked {network_report['blocked_requests']} requests "
+              f"(~{network_report['estimated_bytes_saved'] / 1_000_000:.1f} MB saved), "
+              f"loaded {network_report['loaded_requests']} requests ({network_report['loaded_bytes'] / 1_000_000:.1f} MB).")
+        try:
+            with open(os.path.join(workspace, "network_report.json"), "w", encoding="utf-8") as f:
+                json.dump(network_report, f, indent=4)
         except Exception as e:
-            print(f"❌ Failed to write to {output_path}: {str(e)}")
-            return f"❌ Failed to write output: {str(e)}"
\ No newline at end of file
+            print(f"[WARN] Failed to save network report: {e}")
+
+        store_stats = snapshot_store.stats()
+        print(f"\n[DEBUG] Scraped {total_pages_scraped} DOM snapshots (pages), "
+              f"{store_stats['unique_elements']} unique of {store_stats['elements']} elements, {store_stats['bytes'] / 1_000:.0f} KB on disk")
+        print(f"\n --> All DOM data saved to: {output_path}")
+        print(f"\n --> All Action log data saved to: {actions_log_path}")
+        return f"Scraped {total_pages_scraped} pages. Output saved to {output_path}."
\ No newline at end of file
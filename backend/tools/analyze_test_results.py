@@ -1,9 +1,209 @@
 # === tools/analyze_test_results.py ===
+import asyncio
+import hashlib
+import json
+import os
+import re
 from llm.llm_client import query_llm
 
+ANALYSIS_CACHE_FOLDER = os.getenv("ANALYSIS_CACHE_FOLDER", ".analysis_cache")
+SINGLE_PROMPT_CHAR_LIMIT = 20000   # Logs up to this size are analyzed in one prompt
+CHUNK_CHAR_LIMIT = 12000           # Target size of a single map chunk
+MAX_CONCURRENT_CHUNKS = 4          # Cap on concurrent LLM calls during the map phase
+REDUCE_BATCH_SIZE = 8              # Chunk summaries merged per reduce call
+MAP_PROMPT_VERSION = "1"           # Bump to invalidate cached chunk summaries
+
+# Lines that start a new test record in pytest / unittest style output
+TEST_BOUNDARY_PATTERN = re.compile(
+    r"^(?:"
+    r"\S+\.py::\S+"                   # tests/test_login.py::test_valid_login PASSED
+    r"|_{3,}\s.+\s_{3,}$"             # ____ test_valid_login ____ (failure sections)
+    r"|={3,}\s.+\s={3,}$"             # ==== FAILURES ==== / short test summary
+    r"|(?:PASSED|FAILED|ERROR|SKIPPED|XFAIL|XPASS)\s+\S+"  # -rA summary lines
+    r"|test\w*\s+\([\w\.]+\)"         # test_login (tests.test_auth.LoginTest) ... ok
+    r")"
+)
+
+LLM_FAILURE_PREFIXES = ("[ERROR]", "Gemini query failed", "GPT query failed", "Unsupported provider")
+
+
+def split_into_test_records(test_log: str) -> list:
+    """
+    Split a raw test log into records, each starting at a test boundary line.
+    """
+    records = []
+    current = []
+    for line in test_log.splitlines():
+        if TEST_BOUNDARY_PATTERN.match(line.strip()) and current:
+            records.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        records.append("\n".join(current))
+    return records
+
+
+def chunk_test_log(test_log: str, chunk_limit: int = CHUNK_CHAR_LIMIT) -> list:
+    """
+    Pack test records greedily into chunks of at most `chunk_limit` characters.
+    Packing is done front to back, so appending new runs to a log leaves the
+    earlier chunks byte-identical and their cached summaries reusable.
+    """
+    chunks = []
+    current = ""
+    for record in split_into_test_records(test_log):
+        # A single oversized record (e.g. a huge traceback) is split by lines
+        pieces = [record]
+        if len(record) > chunk_limit:
+            pieces, piece = [], ""
+            for line in record.splitlines():
+                if piece and len(piece) + len(line) + 1 > chunk_limit:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                pieces.append(piece)
+
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > chunk_limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _chunk_cache_path(chunk: str, llm_provider: str) -> str:
+    key = hashlib.sha256(f"{MAP_PROMPT_VERSION}|{llm_provider}|{chunk}".encode("utf-8")).hexdigest()
+    return os.path.join(ANALYSIS_CACHE_FOLDER, f"{key}.json")
+
+
+def load_cached_chunk_summary(chunk: str, llm_provider: str):
+    cache_path = _chunk_cache_path(chunk, llm_provider)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("summary")
+    except (IOError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable analysis cache entry {cache_path}: {e}")
+        return None
+
+
+def save_cached_chunk_summary(chunk: str, llm_provider: str, summary: str) -> None:
+    cache_path = _chunk_cache_path(chunk, llm_provider)
+    os.makedirs(ANALYSIS_CACHE_FOLDER, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary}, f)
+        os.replace(tmp_path, cache_path)  # atomic, safe against concurrent analyses
+    except IOError as e:
+        print(f"[WARN] Failed to cache chunk summary: {e}")
+
+
+def _is_llm_failure(response: str) -> bool:
+    return not isinstance(response, str) or response.startswith(LLM_FAILURE_PREFIXES)
+
+
+async def _query_or_error(user_prompt: str, system_prompt: str, llm_provider: str, what: str) -> str:
+    # Providers either return an error string or raise (Claude); both end up as one "[ERROR] ..." string
+    try:
+        response = await query_llm(user_prompt, system_prompt, llm_provider)
+    except Exception as e:
+        response = str(e) or type(e).__name__
+        print(f"[ERROR] {what} failed: {response}")
+        return f"[ERROR] {what} failed: {response}"
+    if _is_llm_failure(response):
+        return response if str(response).startswith("[ERROR]") else f"[ERROR] {what} failed: {response}"
+    return response
+
+
+async def summarize_chunk(chunk: str, index: int, total: int, llm_provider: str, semaphore: asyncio.Semaphore,
+                          cached: str = None) -> str:
+    """
+    Map step: summarize one chunk of the log. `cached` is its summary from the on-disk cache, if any.
+    """
+    if cached is not None:
+        return cached
+
+    system_prompt = f"""
+    You are a QA Automation Engineer. You are given part {index + 1} of {total} of a large test result log.
+    Summarize only this part. List:
+    - the number of passed, failed, skipped and errored tests you can see
+    - every failed or errored test with its name and a one-line failure reason
+    - recurring error patterns (same exception, same locator, same timeout)
+    Be terse. Do not speculate about parts of the log you have not seen.
+    """
+    async with semaphore:
+        print(f"[DEBUG] Summarizing log chunk {index + 1}/{total} ({len(chunk)} chars)...")
+        summary = await _query_or_error(chunk, system_prompt, llm_provider, f"Summarizing log chunk {index + 1}/{total}")
+
+    if not _is_llm_failure(summary):
+        save_cached_chunk_summary(chunk, llm_provider, summary)
+    return summary
+
+
+async def reduce_summaries(summaries: list, llm_provider: str, semaphore: asyncio.Semaphore) -> str:
+    """
+    Reduce step: merge chunk summaries into one report, in batches if there are many.
+    """
+    system_prompt = """
+    You are a QA Automation Engineer. You are given partial summaries of one large test run, in log order.
+    Merge them into a single concise report with overall pass/fail/skip counts and rates,
+    the list of failed tests with their reasons, and the most common failure patterns.
+    """
+
+    async def reduce_batch(batch: list) -> str:
+        joined = "\n\n".join(f"--- Part {i + 1} ---\n{summary}" for i, summary in enumerate(batch))
+        async with semaphore:
+            return await _query_or_error(joined, system_prompt, llm_provider, "Merging log summaries")
+
+    while len(summaries) > REDUCE_BATCH_SIZE:
+        batches = [summaries[i:i + REDUCE_BATCH_SIZE] for i in range(0, len(summaries), REDUCE_BATCH_SIZE)]
+        print(f"[DEBUG] Reducing {len(summaries)} summaries in {len(batches)} batches...")
+        summaries = await asyncio.gather(*(reduce_batch(batch) for batch in batches))
+        # A failed merge must not be passed on as if it were a summary of its parts
+        failed = next((summary for summary in summaries if _is_llm_failure(summary)), None)
+        if failed is not None:
+            return failed
+    return await reduce_batch(summaries)
+
+
+async def analyze_results_chunked(test_log: str, llm_provider: str, max_concurrency: int = MAX_CONCURRENT_CHUNKS) -> str:
+    """
+    Map-reduce analysis for logs too large for a single prompt.
+    """
+    chunks = chunk_test_log(test_log)
+    cached = [load_cached_chunk_summary(chunk, llm_provider) for chunk in chunks]
+    print(f"[DEBUG] Analyzing test log in {len(chunks)} chunks ({sum(1 for c in cached if c is not None)} cached)...")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    summaries = await asyncio.gather(
+        *(summarize_chunk(chunk, i, len(chunks), llm_provider, semaphore, cached[i]) for i, chunk in enumerate(chunks))
+    )
+    failed = [i + 1 for i, summary in enumerate(summaries) if _is_llm_failure(summary)]
+    if len(failed) == len(summaries):
+        return summaries[0]
+    if not failed:
+        return await reduce_summaries(list(summaries), llm_provider, semaphore)
+
+    # Failed chunks are left out of the merge, and the report says which parts it is missing
+    print(f"[WARN] {len(failed)} of {len(chunks)} log chunks could not be summarized, reducing the rest.")
+    report = await reduce_summaries([summary for summary in summaries if not _is_llm_failure(summary)], llm_provider, semaphore)
+    if _is_llm_failure(report):
+        return report
+    return (f"{report}\n\nNote: {len(failed)} of {len(chunks)} log parts could not be analyzed and are not covered "
+            f"by this report (parts {', '.join(map(str, failed))}).")
+
+
 async def analyze_results(test_summary: str, llm_provider: str) -> str:
+    if len(test_summary) > SINGLE_PROMPT_CHAR_LIMIT:
+        return await analyze_results_chunked(test_summary, llm_provider)
+
     system_prompt = f"""
-    You are a QA Automation Engineer.  Your job is to analyze test results and provide a concise summary of the key findings,  
+    You are a QA Automation Engineer.  Your job is to analyze test results and provide a concise summary of the key findings,
     including pass rates, failure rates, and specific failed tests, using the following data: {test_summary}
     """
     response = await query_llm(test_summary,system_prompt, llm_provider)
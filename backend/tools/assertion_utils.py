@@ -130,3 +130,184 @@ async def handle_assertion(page, action, locator=None, timeout=10000) -> dict:
         result["success"] = False
 
     return result
+
+
+# Evaluates every assertion spec in one in-page call. Specs whose selector the
+# browser cannot resolve natively (Playwright-only engines such as :has-text or
+# text=) are marked as fallback and evaluated per element with handle_assertion.
+BATCH_ASSERT_JS = """
+(specs) => {
+    const resolve = (selector) => {
+        if (/^(xpath=|\\/\\/|\\(\\/\\/)/.test(selector)) {
+            const snapshot = document.evaluate(selector.replace(/^xpath=/, ''), document, null,
+                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+            return nodes;
+        }
+        return Array.from(document.querySelectorAll(selector));
+    };
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    return specs.map(({subtype, selector, index, expected, attribute}) => {
+        const out = {success: false, actual: null, count: null, fallback: false, error: null};
+        if (subtype === 'url') {
+            out.actual = location.href;
+            out.success = expected != null && location.href.includes(String(expected));
+            return out;
+        }
+        if (subtype === 'title') {
+            out.actual = document.title;
+            out.success = expected != null && document.title.toLowerCase().includes(String(expected).toLowerCase());
+            return out;
+        }
+        if (!selector) { out.error = 'missing_selector'; return out; }
+        let elements;
+        try { elements = resolve(selector); } catch (e) { out.fallback = true; return out; }
+        out.count = elements.length;
+        if (subtype === 'count') {
+            out.actual = elements.length;
+            out.success = elements.length === Number(expected);
+            return out;
+        }
+        const el = (index != null && index >= 0 && index < elements.length) ? elements[index] : elements[0];
+        if (!el) {
+            if (subtype === 'visibility') { out.actual = false; out.success = !expected; }
+            else if (subtype === 'not_visible') { out.actual = true; out.success = true; }
+            else { out.error = 'not_found'; }
+            return out;
+        }
+        switch (subtype) {
+            case 'not_visible':
+                out.actual = el.offsetParent === null; out.success = out.actual; break;
+            case 'visibility':
+                out.actual = isVisible(el); out.success = Boolean(expected) === out.actual; break;
+            case 'text':
+                out.actual = el.innerText || el.textContent || '';
+                out.success = out.actual.toLowerCase().includes(String(expected ?? '').trim().toLowerCase()); break;
+            case 'assert_value':
+                out.actual = el.value ?? null; out.success = out.actual === expected; break;
+            case 'attribute':
+                out.actual = attribute ? el.getAttribute(attribute) : null;
+                out.success = Boolean(attribute) && out.actual === expected; break;
+            case 'assert_enabled':
+                out.actual = !(el.disabled || el.getAttribute('aria-disabled') === 'true');
+                out.success = out.actual === expected; break;
+            case 'assert_selected':
+                out.actual = ('checked' in el) ? el.checked
+                    : ('selected' in el) ? el.selected : el.getAttribute('aria-checked') === 'true';
+                out.success = out.actual === expected; break;
+            default:
+                out.error = 'unknown_subtype';
+        }
+        return out;
+    });
+}
+"""
+
+# Resolves as soon as every natively evaluable spec passes, polling inside the page
+BATCH_ASSERT_WAIT_JS = f"""
+(specs) => {{
+    const results = ({BATCH_ASSERT_JS})(specs);
+    return results.every(r => r.success || r.fallback || (r.error && r.error !== 'not_found')) ? results : false;
+}}
+"""
+
+
+def _batch_message(subtype, expected, attribute, raw: dict) -> str:
+    actual = raw["actual"]
+    success = raw["success"]
+    match subtype:
+        case "not_visible":
+            return "Element is not visible as expected " if success else "Element is still visible "
+        case "text":
+            return f"Element text contains '{expected}' " if success else f"Element text '{actual}' does not contain '{expected}'"
+        case "assert_value":
+            return f"Input value: expected '{expected}', got '{actual}'"
+        case "attribute":
+            if not attribute:
+                return "Missing selector or attribute for attribute check "
+            return f"Attribute '{attribute}': expected '{expected}', got '{actual}'"
+        case "count":
+            return f"Found {actual} elements as expected " if success else f"Expected {expected} elements, but found {actual} "
+        case "url":
+            if expected is None:
+                return "No expected URL provided for assertion."
+            return f"URL contains '{expected}' " if success else f"URL '{actual}' does not contain '{expected}' "
+        case "title":
+            return f"Title contains '{expected}' " if success else f"Title '{actual}' does not contain '{expected}' "
+        case "assert_enabled":
+            return f"Enabled state: expected {expected}, got {actual}"
+        case "assert_selected":
+            return f"Selected state: expected {expected}, got {actual}"
+        case "visibility":
+            return f"Visibility expected: {expected}, actual: {actual}"
+    return f"Unknown assertion subtype: {subtype} "
+
+
+async def handle_assertions_batch(page, actions: list, timeout=10000) -> list:
+    """
+    Evaluate a list of assertion actions in a single in-page call.
+    Returns one result dict per action, in order, with the same shape as handle_assertion.
+    """
+    specs = []
+    for action in actions:
+        subtype = action.get("subtype")
+        expected = action.get("expected")
+        if subtype == "url" and expected is None:
+            expected = action.get("url")
+        specs.append({
+            "subtype": subtype,
+            "selector": action.get("selector"),
+            "index": action.get("index"),
+            "expected": expected,
+            "attribute": action.get("attribute"),
+        })
+
+    try:
+        # One round-trip that keeps polling in the page until the assertions hold
+        handle = await page.wait_for_function(BATCH_ASSERT_WAIT_JS, arg=specs, timeout=timeout)
+        raw_results = await handle.json_value()
+    except Exception:
+        # Timed out with failing assertions (or the page navigated): take a final reading
+        try:
+            raw_results = await page.evaluate(BATCH_ASSERT_JS, specs)
+        except Exception as e:
+            raw_results = [{"success": False, "actual": None, "count": None, "fallback": True, "error": str(e)} for _ in specs]
+
+    results = []
+    for action, spec, raw in zip(actions, specs, raw_results):
+        if raw.get("fallback"):
+            # The browser cannot resolve this selector natively, evaluate it through Playwright
+            locator = None
+            if spec["selector"]:
+                locator = page.locator(spec["selector"])
+                if spec["index"] is not None:
+                    locator = locator.nth(spec["index"])
+            results.append(await handle_assertion(page, action, locator, timeout=timeout))
+            continue
+
+        subtype = spec["subtype"]
+        result = {
+            "type": "assert",
+            "subtype": subtype,
+            "selector": spec["selector"],
+            "expected": action.get("expected"),
+            "actual": None,
+            "description": action.get("description", f"Assertion of type '{subtype}'"),
+            "success": bool(raw.get("success")),
+            "message": "",
+        }
+        if raw.get("error") == "missing_selector":
+            result["message"] = "No selector provided for assertion "
+        elif raw.get("error") == "not_found":
+            result["message"] = f"Assertion execution failed: No elements found for selector: {spec['selector']} "
+        elif raw.get("error") == "unknown_subtype":
+            result["message"] = f"Unknown assertion subtype: {subtype} "
+        else:
+            result["actual_value"] = raw.get("actual")
+            result["message"] = _batch_message(subtype, spec["expected"], spec["attribute"], raw)
+        results.append(result)
+    return results
@@ -0,0 +1,151 @@
+# === tools/auth_state.py ===
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+AUTH_STATE_FOLDER = os.getenv("AUTH_STATE_FOLDER", ".auth_state")
+AUTH_STATE_TTL_HOURS = float(os.getenv("AUTH_STATE_TTL_HOURS", "12"))
+AUTH_STATE_ENABLED = os.getenv("AUTH_STATE_CACHE", "1") != "0"
+
+STEP_LINE = re.compile(r"^\s*(\d+)\.\s*(.+)$", re.MULTILINE)
+QUOTED_VALUE = re.compile(r"\"([^\"]*)\"|'([^']*)'")
+LOGIN_STEP = re.compile(r"\b(log\s?-?in|sign\s?-?in|username|user name|password|credentials|authenticate)\b", re.IGNORECASE)
+
+# Visible password field: the login form is (still) on screen
+LOGIN_FORM_VISIBLE_JS = """
+() => Array.from(document.querySelectorAll('input[type="password"]')).some(el => {
+    const rect = el.getBoundingClientRect();
+    const style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+})
+"""
+
+
+def split_login_steps(goal_prompt: str) -> tuple:
+    """
+    Split the leading login steps off a numbered goal prompt.
+    Returns (login_steps, remaining_prompt) with the remaining steps renumbered from 1; any text
+    before the first or after the last numbered step (site context, notes) is kept as it was.
+    """
+    matches = list(STEP_LINE.finditer(goal_prompt or ""))
+    login_steps = []
+    for match in matches:
+        if not LOGIN_STEP.search(match.group(2)):
+            break
+        login_steps.append(match.group(2).strip())
+    if not login_steps or len(login_steps) == len(matches):
+        return [], goal_prompt
+    remaining = [match.group(2).strip() for match in matches[len(login_steps):]]
+    preamble = goal_prompt[:matches[0].start()].strip()
+    trailer = goal_prompt[matches[-1].end():].strip()
+    steps = "\n".join(f"{i}. {text}" for i, text in enumerate(remaining, start=1))
+    return login_steps, "\n".join(part for part in (preamble, steps, trailer) if part)
+
+
+def _step_values(login_steps: list) -> list:
+    """Candidate fill values in the login steps: quoted strings first, then the bare words."""
+    text = "\n".join(login_steps)
+    values = [double or single for double, single in QUOTED_VALUE.findall(text)]
+    return values + [word.strip(".,;:()\"'") for word in text.split()]
+
+
+async def login_form_visible(page) -> bool:
+    try:
+        return await page.evaluate(LOGIN_FORM_VISIBLE_JS)
+    except Exception:
+        return False
+
+
+class AuthStateCache:
+    """
+    Saved browser storage state (cookies + localStorage) for one site and credentials identity.
+    The identity is a hash of the login steps, which carry the credentials. The credentials never
+    appear in file names or in the metadata: fill values are stored as a position in the login
+    steps and only restored from the prompt of the run that replays them.
+    """
+
+    def __init__(self, url: str, login_steps: list, folder: str = None, ttl_hours: float = AUTH_STATE_TTL_HOURS):
+        self.host = urlsplit(url).netloc.lower()
+        # Case is kept: the steps carry the credentials, and passwords are case-sensitive
+        identity = " ".join(" ".join(login_steps).split())
+        digest = hashlib.sha256(f"{self.host}\n{identity}".encode("utf-8")).hexdigest()[:16]
+        base = os.path.join(folder or AUTH_STATE_FOLDER, f"{self.host.replace(':', '_')}_{digest}")
+        self.state_path = base + ".state.json"
+        self.meta_path = base + ".meta.json"
+        self.login_steps = login_steps
+        self.ttl_seconds = ttl_hours * 3600
+
+    def load(self):
+        """Return the cache metadata if a usable state exists, else None (expired states are removed)."""
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        now = time.time()
+        if now - meta.get("saved_at", 0) > self.ttl_seconds:
+            print("[INFO] Saved login state is older than the TTL, logging in again.")
+            self.invalidate()
+            return None
+        # Persistent cookies carry an expiry; session cookies use -1
+        if any(0 < cookie.get("expires", -1) < now for cookie in state.get("cookies", [])):
+            print("[INFO] Saved login cookies have expired, logging in again.")
+            self.invalidate()
+            return None
+        return meta
+
+    async def save(self, context, landing_url: str, login_actions: list) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        await context.storage_state(path=tmp_path)
+        os.replace(tmp_path, self.state_path)
+        meta = {
+            "host": self.host,
+            "saved_at": time.time(),
+            "landing_url": landing_url,
+            "login_steps_sha256": hashlib.sha256("\n".join(self.login_steps).encode("utf-8")).hexdigest(),
+            "login_actions": [self._redact(action) for action in login_actions],
+        }
+        with open(self.meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+        print(f"[INFO] Login state saved to: {self.state_path}")
+
+    def _redact(self, action: dict) -> dict:
+        entry = {key: value for key, value in action.items() if key != "value"}
+        value = action.get("value")
+        if value not in (None, ""):
+            values = _step_values(self.login_steps)
+            if value in values:
+                entry["value_ref"] = values.index(value)
+            else:
+                entry["value_redacted"] = True  # not taken from the prompt, so it cannot be restored
+        return entry
+
+    def replay_actions(self, meta: dict) -> list:
+        """
+        The saved login actions for this run's log, with fill values restored from the login steps.
+        They are numbered step 0 (the original number is kept as login_step), so they never collide
+        with the renumbered remaining steps.
+        """
+        values = _step_values(self.login_steps)
+        actions = []
+        for entry in meta.get("login_actions", []):
+            entry = dict(entry)
+            ref = entry.pop("value_ref", None)
+            if ref is not None and ref < len(values):
+                entry["value"] = values[ref]
+            actions.append({**entry, "step": 0, "login_step": entry.get("step"), "from_auth_cache": True})
+        return actions
+
+    def invalidate(self) -> None:
+        for path in (self.state_path, self.meta_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,111 @@
+# === tools/browser_pool.py ===
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+SCRAPE_HEADLESS = os.getenv("SCRAPE_HEADLESS", "0") == "1"
+
+
+async def _launch_chromium(playwright, headless: bool):
+    return await playwright.chromium.launch(headless=headless,
+                                            args=[] if headless else ["--start-fullscreen"])
+
+
+class BrowserPool:
+    """
+    One Playwright driver and Chromium process kept alive for every flow of a long-running
+    process. Flows only open their own browser context on it, which is the isolation unit
+    (cookies, storage, HAR), so the driver and browser start-up is paid once.
+    """
+
+    def __init__(self, headless: bool = SCRAPE_HEADLESS):
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._lock = None
+        self.launches = 0
+        self.leases = 0
+        self.started_at = None
+
+    async def browser(self):
+        """The shared browser, launched on first use and relaunched if it crashed or was closed."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await _launch_chromium(self._playwright, self.headless)
+                self.launches += 1
+                self.started_at = time.time()
+                print(f"[INFO] Warm browser launched (launch #{self.launches}, headless={self.headless}).")
+            self.leases += 1
+            return self._browser
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"[WARN] Closing the warm browser failed: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def status(self) -> dict:
+        return {
+            "running": self._browser is not None and self._browser.is_connected(),
+            "headless": self.headless,
+            "launches": self.launches,
+            "leases": self.leases,
+            "started_at": self.started_at,
+        }
+
+
+class _BrowserLease:
+    """The shared browser as one flow sees it: contexts it opens are closed when the flow ends, even on errors."""
+
+    def __init__(self, browser):
+        self._browser = browser
+        self._contexts = []
+
+    async def new_context(self, **kwargs):
+        context = await self._browser.new_context(**kwargs)
+        self._contexts.append(context)
+        return context
+
+    async def release(self) -> None:
+        for context in self._contexts:
+            try:
+                await context.close()  # no-op for contexts the flow already closed
+            except Exception as e:
+                print(f"[WARN] Closing a leftover browser context failed: {e}")
+        self._contexts = []
+
+    def __getattr__(self, name):
+        return getattr(self._browser, name)
+
+
+@asynccontextmanager
+async def flow_browser(pool: BrowserPool = None, headless: bool = SCRAPE_HEADLESS):
+    """
+    Browser for one flow: the pool's warm browser when one is given (left running on exit),
+    otherwise a private driver and browser that are shut down with the flow.
+    """
+    if pool is not None:
+        lease = _BrowserLease(await pool.browser())
+        try:
+            yield lease
+        finally:
+            await lease.release()
+        return
+    from playwright.async_api import async_playwright  # loaded on first scrape, not with the agent graph
+    async with async_playwright() as p:
+        browser = await _launch_chromium(p, headless)
+        try:
+            yield browser
+        finally:
+            await browser.close()
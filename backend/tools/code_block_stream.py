@@ -0,0 +1,81 @@
+# === tools/code_block_stream.py ===
+import re
+
+# Same conventions as the regex in extract_and_save_code_blocks:
+# a "# relative/path.py" comment right above the fence, or as the first line inside it.
+PATH_LINE_PATTERN = re.compile(r"^\s*#\s*([\w\-/\.]+)\s*$")
+FENCE_OPEN = "```python"
+FENCE = "```"
+
+
+class StreamingCodeBlockParser:
+    """
+    Incremental parser for LLM framework responses.
+
+    Feed it text fragments as they arrive; it returns every (filepath, code)
+    block as soon as its closing fence has been seen, so files can be written
+    while the rest of the response is still being generated.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_block = False
+        self._pending_path = None   # path comment seen above an upcoming fence
+        self._block_path = None
+        self._block_lines = []
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        completed = []
+        # Only complete lines are parsed; the tail waits for more tokens
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            block = self._consume_line(line)
+            if block:
+                completed.append(block)
+        return completed
+
+    def close(self) -> list:
+        """Flush the trailing partial line at the end of the stream."""
+        completed = []
+        if self._buffer:
+            block = self._consume_line(self._buffer)
+            self._buffer = ""
+            if block:
+                completed.append(block)
+        if self._in_block:
+            print(f"[WARN] Response ended inside an unterminated code block ({self._block_path or 'no path'}), skipping it.")
+            self._in_block = False
+        return completed
+
+    def _consume_line(self, line: str):
+        stripped = line.strip()
+
+        if not self._in_block:
+            if stripped.startswith(FENCE_OPEN):
+                self._in_block = True
+                self._block_path = self._pending_path
+                self._block_lines = []
+                self._pending_path = None
+                return None
+            match = PATH_LINE_PATTERN.match(line)
+            if match:
+                self._pending_path = match.group(1)
+            elif stripped:
+                self._pending_path = None
+            return None
+
+        if stripped.startswith(FENCE):
+            self._in_block = False
+            path, code = self._block_path, "\n".join(self._block_lines).strip()
+            self._block_path, self._block_lines = None, []
+            return (path, code) if path else None
+
+        # Fallback to a path comment on the first non-empty line inside the block
+        if not any(l.strip() for l in self._block_lines):
+            match = PATH_LINE_PATTERN.match(line)
+            if match:
+                self._block_path = self._block_path or match.group(1)
+                return None
+        self._block_lines.append(line)
+        return None
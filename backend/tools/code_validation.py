@@ -0,0 +1,227 @@
+# === tools/code_validation.py ===
+import ast
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+VALIDATION_REPORT_FILE = "validation_report.json"
+PARALLEL_THRESHOLD = 8   # Below this many files a process pool costs more than it saves
+SKIP_DIRS = {"allure-results", "__pycache__", ".pytest_cache", ".venv", "venv"}
+
+
+def _load_black():
+    try:
+        import black
+        return black
+    except ImportError:
+        return None
+
+
+def format_files(paths: list, quiet: bool = False) -> dict:
+    """
+    Format all Python files in one in-process pass using black's API.
+    Falls back to a single batched `black` CLI call when the package is not importable.
+    Returns {path: status} where status is "formatted", "unchanged", "failed: ..." or "skipped".
+    `quiet` drops the summary line, for callers that format one file at a time and report in bulk.
+    """
+    paths = [path for path in paths if path.endswith(".py")]
+    statuses = {}
+    black = _load_black()
+
+    if black is None:
+        black_cli = shutil.which("black")
+        if not black_cli or not paths:
+            if paths:
+                print("[WARN] black is not installed, skipping formatting.")
+            return {path: "skipped" for path in paths}
+        result = subprocess.run([black_cli, "--quiet", *paths], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        status = "formatted" if result.returncode == 0 else f"failed: {result.stderr.strip()}"
+        return {path: status for path in paths}
+
+    mode = black.Mode()
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                source = f.read()
+            formatted = black.format_str(source, mode=mode)
+            if formatted == source:
+                statuses[path] = "unchanged"
+                continue
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(formatted)
+            statuses[path] = "formatted"
+        except Exception as e:  # black.InvalidInput on syntax errors, IOError otherwise
+            statuses[path] = f"failed: {e}"
+            print(f"[WARN] Failed to format {path}: {e}")
+    formatted_count = sum(1 for status in statuses.values() if status == "formatted")
+    if not quiet:
+        print(f"[INFO] Formatted {formatted_count}/{len(paths)} files with black (in-process).")
+    return statuses
+
+
+def _assigned_names(target: ast.AST) -> list:
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [name for element in target.elts for name in _assigned_names(element)]
+    return []
+
+
+def _top_level_names(body: list) -> list:
+    """
+    Names a module defines, including those bound under module-level if/try/with blocks,
+    e.g. `try: from x import y` / `except ImportError: y = None`.
+    """
+    names = []
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.append(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.extend(name for target in targets for name in _assigned_names(target))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.extend((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.If):
+            names.extend(_top_level_names(node.body + node.orelse))
+        elif isinstance(node, (ast.Try, getattr(ast, "TryStar", ast.Try))):
+            handlers = [statement for handler in node.handlers for statement in handler.body]
+            names.extend(_top_level_names(node.body + handlers + node.orelse + node.finalbody))
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            names.extend(name for item in node.items if item.optional_vars is not None
+                         for name in _assigned_names(item.optional_vars))
+            names.extend(_top_level_names(node.body))
+    return names
+
+
+def validate_source(path: str) -> dict:
+    """
+    Parse and compile one file. Runs in a worker process, so it only returns plain data.
+    """
+    result = {"path": path, "syntax_ok": False, "error": None, "imports": [], "names": []}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        tree = ast.parse(source, filename=path)
+        compile(tree, path, "exec")
+    except SyntaxError as e:
+        result["error"] = f"line {e.lineno}: {e.msg}"
+        return result
+    except (IOError, UnicodeDecodeError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    result["syntax_ok"] = True
+    result["names"] = _top_level_names(tree.body)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            result["imports"].extend({"module": alias.name, "names": [], "level": 0} for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            result["imports"].append({
+                "module": node.module or "",
+                "names": [alias.name for alias in node.names if alias.name != "*"],
+                "level": node.level,
+            })
+    return result
+
+
+def _module_path(base_path: str, module: str):
+    """Return the file backing a local module, or None if it does not exist."""
+    candidate = os.path.join(base_path, *module.split("."))
+    if os.path.isfile(candidate + ".py"):
+        return candidate + ".py"
+    if os.path.isdir(candidate):
+        init_path = os.path.join(candidate, "__init__.py")
+        return init_path if os.path.isfile(init_path) else candidate
+    return None
+
+
+def _unresolved_imports(file_result: dict, base_path: str, local_roots: set, names_by_path: dict) -> list:
+    unresolved = []
+    file_dir = os.path.dirname(file_result["path"])
+    for imp in file_result["imports"]:
+        if imp["level"]:
+            # Relative import: resolve against the importing file's package
+            package_dir = file_dir
+            for _ in range(imp["level"] - 1):
+                package_dir = os.path.dirname(package_dir)
+            module_root, module = package_dir, imp["module"]
+        else:
+            if imp["module"].split(".")[0] not in local_roots:
+                continue  # third-party or stdlib, not our concern
+            module_root, module = base_path, imp["module"]
+
+        target = _module_path(module_root, module) if module else (module_root if os.path.isdir(module_root) else None)
+        if target is None:
+            unresolved.append(f"module '{'.' * imp['level']}{module}' not found")
+            continue
+        for name in imp["names"]:
+            if os.path.isdir(target) or target.endswith("__init__.py"):
+                # `from pages import login_page` may name a submodule
+                package_dir = target if os.path.isdir(target) else os.path.dirname(target)
+                if _module_path(package_dir, name):
+                    continue
+            if name not in names_by_path.get(os.path.abspath(target), [name]):
+                unresolved.append(f"name '{name}' not defined in '{'.' * imp['level']}{module}'")
+    return unresolved
+
+
+def collect_python_files(base_path: str) -> list:
+    paths = []
+    for root, dirs, files in os.walk(base_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        paths.extend(os.path.join(root, name) for name in files if name.endswith(".py"))
+    return sorted(paths)
+
+
+def validate_framework(base_path: str, paths: list = None, max_workers: int = None) -> dict:
+    """
+    Parse and compile every generated file (in parallel for larger frameworks) and
+    check that imports between framework modules resolve. The report is written
+    to validation_report.json; report["ok"] is False if anything would fail to import.
+    """
+    paths = paths if paths is not None else collect_python_files(base_path)
+    if len(paths) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(validate_source, paths))
+    else:
+        results = [validate_source(path) for path in paths]
+
+    local_roots = {
+        os.path.splitext(name)[0] for name in os.listdir(base_path)
+        if name.endswith(".py") or os.path.isdir(os.path.join(base_path, name))
+    } if os.path.isdir(base_path) else set()
+    names_by_path = {os.path.abspath(r["path"]): r["names"] for r in results if r["syntax_ok"]}
+
+    files = []
+    for result in results:
+        unresolved = _unresolved_imports(result, base_path, local_roots, names_by_path) if result["syntax_ok"] else []
+        files.append({
+            "path": os.path.relpath(result["path"], base_path),
+            "syntax_ok": result["syntax_ok"],
+            "error": result["error"],
+            "unresolved_imports": unresolved,
+            "ok": result["syntax_ok"] and not unresolved,
+        })
+
+    report = {"ok": all(f["ok"] for f in files), "file_count": len(files), "files": files}
+    report_path = os.path.join(base_path, VALIDATION_REPORT_FILE)
+    try:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    except IOError as e:
+        print(f"[WARN] Failed to write validation report: {e}")
+
+    for f in files:
+        if not f["ok"]:
+            print(f"[ERROR] {f['path']}: {f['error'] or '; '.join(f['unresolved_imports'])}")
+    print(f"[INFO] Validated {len(files)} files, {sum(1 for f in files if not f['ok'])} with errors.")
+    return report
+
+
+def describe_failures(report: dict) -> str:
+    return "\n".join(
+        f"- {f['path']}: {f['error'] or '; '.join(f['unresolved_imports'])}"
+        for f in report["files"] if not f["ok"]
+    )
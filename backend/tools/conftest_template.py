@@ -0,0 +1,163 @@
+# === tools/conftest_template.py ===
+import ast
+import os
+
+# Maintained, performance-tuned conftest shipped with every generated framework.
+# One browser per session, a fresh context + page per test, headless by default.
+CONFTEST_TEMPLATE = '''# conftest.py
+# Generated from the maintained template in tools/conftest_template.py - do not edit by hand.
+import os
+
+import pytest
+from playwright.sync_api import sync_playwright
+
+BASE_URL = os.getenv("BASE_URL", "__BASE_URL__")
+HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "1") != "0"
+BROWSER_NAME = os.getenv("PLAYWRIGHT_BROWSER", "chromium")
+STORAGE_STATE = os.getenv("PLAYWRIGHT_STORAGE_STATE")
+DEFAULT_TIMEOUT = int(os.getenv("PLAYWRIGHT_TIMEOUT", "10000"))
+
+
+@pytest.fixture(scope="session")
+def playwright_instance():
+    playwright = sync_playwright().start()
+    yield playwright
+    playwright.stop()
+
+
+@pytest.fixture(scope="session")
+def browser(playwright_instance):
+    browser = getattr(playwright_instance, BROWSER_NAME).launch(headless=HEADLESS)
+    yield browser
+    browser.close()
+
+
+@pytest.fixture(scope="session")
+def base_url():
+    return BASE_URL
+
+
+@pytest.fixture
+def context(browser):
+    options = {"locale": "en-US"}
+    # Reuse an authenticated session when a storage state file is provided
+    if STORAGE_STATE and os.path.exists(STORAGE_STATE):
+        options["storage_state"] = STORAGE_STATE
+    context = browser.new_context(**options)
+    context.set_default_timeout(DEFAULT_TIMEOUT)
+    yield context
+    context.close()
+
+
+@pytest.fixture
+def page(context):
+    page = context.new_page()
+    yield page
+    page.close()
+'''
+
+# Scopes that make a fixture run more than once per session
+PER_TEST_SCOPES = {"function", "class"}
+BROWSER_LAUNCH_ATTRS = {"launch", "launch_persistent_context", "connect"}
+BROWSER_TYPES = {"chromium", "firefox", "webkit"}
+PLAYWRIGHT_ENTRYPOINTS = {"sync_playwright", "async_playwright"}
+
+
+def render_conftest(base_url: str) -> str:
+    return CONFTEST_TEMPLATE.replace("__BASE_URL__", base_url or "")
+
+
+def write_conftest_template(base_path: str, base_url: str) -> str:
+    conftest_path = os.path.join(base_path, "conftest.py")
+    if os.path.exists(conftest_path):
+        print("[INFO] Replacing generated conftest.py with the maintained template.")
+    with open(conftest_path, "w", encoding="utf-8") as f:
+        f.write(render_conftest(base_url))
+    print(f"File saved: {conftest_path}")
+    return conftest_path
+
+
+def _fixture_scope(func: ast.FunctionDef):
+    """Return the fixture scope of `func`, or None if it is not a pytest fixture."""
+    for decorator in func.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", None)
+        if name != "fixture":
+            continue
+        if isinstance(decorator, ast.Call):
+            for keyword in decorator.keywords:
+                if keyword.arg == "scope" and isinstance(keyword.value, ast.Constant):
+                    return str(keyword.value.value)
+        return "function"
+    return None
+
+
+def _is_browser_type(node: ast.AST, browser_type_names: set) -> bool:
+    """`<playwright>.chromium`, `getattr(<playwright>, name)` or a local bound to one of them."""
+    if isinstance(node, ast.Attribute):
+        return node.attr in BROWSER_TYPES
+    if isinstance(node, ast.Call):
+        return isinstance(node.func, ast.Name) and node.func.id == "getattr"
+    return isinstance(node, ast.Name) and node.id in browser_type_names
+
+
+def _launches_browser(func: ast.FunctionDef) -> bool:
+    # Only launches on a Playwright browser type count: sqlite3.connect() or socket.connect() are fine
+    browser_type_names = {
+        target.id
+        for node in ast.walk(func) if isinstance(node, ast.Assign) and _is_browser_type(node.value, set())
+        for target in node.targets if isinstance(target, ast.Name)
+    }
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Call):
+            continue
+        if isinstance(node.func, ast.Attribute):
+            if node.func.attr == "connect_over_cdp":
+                return True
+            if node.func.attr in BROWSER_LAUNCH_ATTRS and _is_browser_type(node.func.value, browser_type_names):
+                return True
+        if isinstance(node.func, ast.Name) and node.func.id in PLAYWRIGHT_ENTRYPOINTS:
+            return True
+    return False
+
+
+def find_per_test_browser_launches(source: str, filename: str = "<generated>") -> list:
+    """
+    Find fixtures (or tests) that start Playwright or launch a browser for every test.
+    Returns human readable violation strings; an empty list means the file is compliant.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except SyntaxError:
+        return []  # syntax problems are reported by the validation stage
+
+    violations = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        scope = _fixture_scope(node)
+        is_test = scope is None and node.name.startswith("test")
+        if (scope in PER_TEST_SCOPES or is_test) and _launches_browser(node):
+            kind = "test" if is_test else f"fixture (scope={scope})"
+            violations.append(f"{filename}:{node.lineno} {kind} '{node.name}' launches a browser per test")
+    return violations
+
+
+def check_fixture_contract(base_path: str) -> list:
+    """
+    Scan every generated Python file for per-test browser launches.
+    """
+    violations = []
+    for root, _, files in os.walk(base_path):
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    source = f.read()
+            except (IOError, UnicodeDecodeError) as e:
+                print(f"[WARN] Could not read {path} for fixture check: {e}")
+                continue
+            violations.extend(find_per_test_browser_launches(source, os.path.relpath(path, base_path)))
+    return violations
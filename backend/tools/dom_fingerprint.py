@@ -0,0 +1,70 @@
+# === tools/dom_fingerprint.py ===
+import hashlib
+
+# Rolling FNV-1a hash over the page structure, computed in the page so only a few
+# bytes cross the protocol instead of the full page.content() HTML.
+# Scripts, styles and SVG internals are skipped; form state (value, checked) and the
+# attributes that usually toggle visibility (class, style, hidden, aria-*) are included.
+PAGE_FINGERPRINT_JS = """
+() => {
+    const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'svg', 'SVG', 'LINK', 'META']);
+    const ATTRS = ['id', 'name', 'type', 'class', 'style', 'hidden', 'disabled', 'href',
+                   'aria-expanded', 'aria-hidden', 'aria-selected', 'aria-checked', 'open'];
+    let hash = 0x811c9dc5;
+    const mix = (value) => {
+        const str = String(value);
+        for (let i = 0; i < str.length; i++) {
+            hash ^= str.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193) >>> 0;
+        }
+        hash ^= 0x1f;  // field separator
+    };
+    const root = document.body;
+    if (!root) return {hash: null, nodes: 0, url: location.href};
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+        acceptNode: (node) => (node.nodeType === Node.ELEMENT_NODE && SKIP.has(node.tagName))
+            ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    });
+    let nodes = 0;
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        nodes++;
+        if (node.nodeType === Node.TEXT_NODE) {
+            const text = node.nodeValue.trim();
+            if (text) mix(text);
+            continue;
+        }
+        mix(node.tagName);
+        for (const attr of ATTRS) {
+            const value = node.getAttribute(attr);
+            if (value !== null) { mix(attr); mix(value); }
+        }
+        if ('value' in node && typeof node.value === 'string') mix(node.value);
+        if ('checked' in node) mix(node.checked);
+    }
+    return {hash: hash.toString(16), nodes: nodes, url: location.href};
+}
+"""
+
+
+async def page_fingerprint(page) -> dict:
+    try:
+        return await page.evaluate(PAGE_FINGERPRINT_JS)
+    except Exception as e:
+        # Navigation in progress or a crashed frame: treat as changed
+        print(f"[WARN] Page fingerprint failed: {e}")
+        return {"hash": None, "nodes": 0, "url": page.url}
+
+
+def element_set_hash(dom: dict) -> str:
+    """Hash of the extracted element set, using the same identity keys as the old stagnation check."""
+    keys = sorted(str(el.get("id") or el.get("name") or el.get("text")) for el in dom.get("elements", []))
+    digest = hashlib.sha1("\x1f".join(keys).encode("utf-8")).hexdigest()[:16]
+    return f"{digest}:{len(keys)}"
+
+
+def fingerprints_match(previous: dict, current: dict) -> bool:
+    return bool(
+        previous and current and current.get("hash") is not None
+        and previous.get("hash") == current.get("hash")
+        and previous.get("url") == current.get("url")
+    )
@@ -0,0 +1,161 @@
+# === tools/dom_relevance.py ===
+import math
+import os
+import re
+
+DOM_TOP_K = int(os.getenv("DOM_TOP_K", "60"))                   # 0 disables pruning
+DOM_CONTEXT_BUDGET = int(os.getenv("DOM_CONTEXT_BUDGET", "15"))  # Extra structural elements kept
+INTERACTIVE_TAGS = {"input", "button", "a", "select", "textarea", "form"}
+HEADING_TAGS = {"h1", "h2", "h3"}
+INTERACTIVE_WEIGHT = 0.3
+VIEWPORT_WEIGHT = 0.2
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "of", "on", "in", "for", "with", "is", "it", "as", "at", "by",
+    "be", "that", "this", "then", "from", "into", "page", "click", "enter", "verify", "should",
+}
+STEP_LINE = re.compile(r"^\s*(\d+)\.\s*(.+)$", re.MULTILINE)
+
+
+def tokenize(text) -> list:
+    # Split camelCase and snake/kebab-case identifiers so "loginButton" matches "login"
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text or ""))
+    return [tok for tok in re.findall(r"[a-z0-9]+", text.lower()) if tok not in STOPWORDS]
+
+
+def element_tokens(el: dict) -> list:
+    attrs = el.get("attrs") or {}
+    fields = [
+        el.get("text"), el.get("placeholder"), el.get("name"), el.get("id"), el.get("type"), el.get("tag"),
+        attrs.get("aria-label"), attrs.get("data-testid"), attrs.get("title"), attrs.get("alt"), attrs.get("role"),
+        attrs.get("value"),
+    ]
+    return tokenize(" ".join(str(field) for field in fields if field))
+
+
+def goal_steps(goal_prompt: str) -> dict:
+    return {int(number): text.strip() for number, text in STEP_LINE.findall(goal_prompt or "")}
+
+
+def remaining_steps_query(goal_prompt: str, progressed_turns: int) -> tuple:
+    """
+    (query, focus) for pruning. The navigator does not know exactly which goal step it is on: one LLM
+    turn can finish several steps, part of one, or none. `progressed_turns` (turns with a successful
+    action) is only a rough position, so the query covers every step from the last progressed one to
+    the end, and `focus` is the step after it, whose matching elements are always kept.
+    """
+    steps = goal_steps(goal_prompt)
+    if not steps:
+        return goal_prompt or "", ""
+    first = max(1, min(progressed_turns, max(steps)))
+    remaining = [text for number, text in sorted(steps.items()) if number >= first]
+    focus = steps.get(progressed_turns + 1) or steps.get(first, "")
+    return " ".join(remaining) or goal_prompt, focus
+
+
+class BM25:
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = documents
+        self.avg_len = (sum(len(doc) for doc in documents) / len(documents)) if documents else 0
+        doc_freq = {}
+        for doc in documents:
+            for token in set(doc):
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        n = len(documents)
+        self.idf = {token: math.log(1 + (n - df + 0.5) / (df + 0.5)) for token, df in doc_freq.items()}
+
+    def score(self, query: list) -> list:
+        scores = []
+        for doc in self.documents:
+            score = 0.0
+            length_norm = 1 - self.b + self.b * (len(doc) / self.avg_len if self.avg_len else 0)
+            for token in set(query):
+                tf = doc.count(token)
+                if tf:
+                    score += self.idf.get(token, 0) * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            scores.append(score)
+        return scores
+
+
+def rank_elements(elements: list, query_text: str) -> list:
+    """
+    Rank element indexes by BM25 relevance to the step text, boosted for interactive
+    and in-viewport elements. Returns (score, index) pairs, best first.
+    """
+    if not elements:
+        return []
+    relevance = BM25([element_tokens(el) for el in elements]).score(tokenize(query_text))
+    top = max(relevance) or 1.0
+    ranked = []
+    for i, el in enumerate(elements):
+        score = relevance[i] / top
+        if el.get("tag") in INTERACTIVE_TAGS or el.get("clickable"):
+            score += INTERACTIVE_WEIGHT
+        if el.get("in_viewport"):
+            score += VIEWPORT_WEIGHT
+        ranked.append((round(score, 4), i))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return ranked
+
+
+def prune_dom(dom: dict, query_text: str, top_k: int = DOM_TOP_K, context_budget: int = DOM_CONTEXT_BUDGET,
+              focus_text: str = "") -> tuple:
+    """
+    Keep the top-K relevant elements plus structural context (page headings and the
+    document-order neighbours of kept elements) within the budget, in document order.
+    Elements matching `focus_text` (the next unfinished step) are kept on top of the top-K, up to K more.
+    Returns (pruned_dom, ranking).
+    """
+    elements = dom.get("elements", [])
+    ranking = rank_elements(elements, query_text)
+    if not top_k or len(elements) <= top_k:
+        return dom, ranking
+
+    kept = {i for _, i in ranking[:top_k]}
+    focus = tokenize(focus_text)
+    if focus:
+        focus_scores = BM25([element_tokens(el) for el in elements]).score(focus)
+        matching = sorted((i for i, score in enumerate(focus_scores) if score > 0 and i not in kept),
+                          key=lambda i: -focus_scores[i])
+        kept.update(matching[:top_k])
+    context = [i for i, el in enumerate(elements) if el.get("tag") in HEADING_TAGS and i not in kept]
+    for i in sorted(kept):
+        context.extend(n for n in (i - 1, i + 1) if 0 <= n < len(elements) and n not in kept)
+    kept.update(list(dict.fromkeys(context))[:context_budget])
+
+    pruned = {**dom, "elements": [el for i, el in enumerate(elements) if i in kept]}
+    pruned["pruned_from"] = len(elements)
+    return pruned, ranking
+
+
+def selector_rank(dom: dict, ranking: list, selector: str):
+    """1-based relevance rank of the element that owns `selector`, or None if it is not in the snapshot."""
+    elements = dom.get("elements", [])
+    for position, (_, i) in enumerate(ranking, start=1):
+        if selector in (elements[i].get("preferred_locators") or []):
+            return position
+    return None
+
+
+def summarize_recall(diagnostics: list, top_k: int = DOM_TOP_K) -> dict:
+    """
+    Recall summary for tuning K: how often the element the LLM acted on was inside
+    the pruned set, and how close to the cut-off its rank was.
+    """
+    ranks = sorted(d["rank"] for d in diagnostics if d.get("rank"))
+    total = len(diagnostics)
+
+    def percentile(p):
+        return ranks[min(len(ranks) - 1, int(p / 100 * len(ranks)))] if ranks else None
+
+    return {
+        "top_k": top_k,
+        "actions": total,
+        "in_pruned_set": sum(1 for d in diagnostics if d.get("in_pruned")),
+        "recall": round(sum(1 for d in diagnostics if d.get("in_pruned")) / total, 3) if total else None,
+        "rank_p50": percentile(50),
+        "rank_p90": percentile(90),
+        "rank_max": ranks[-1] if ranks else None,
+        "not_in_snapshot": sum(1 for d in diagnostics if d.get("rank") is None),
+    }
@@ -0,0 +1,329 @@
+# === tools/framework_orchestrator.py ===
+import asyncio
+import json
+import os
+import re
+from urllib.parse import urlsplit
+from llm.llm_client import query_llm, is_error_response
+from tools.code_validation import format_files, validate_framework, describe_failures
+from tools.conftest_template import write_conftest_template, check_fixture_contract
+from tools.generate_test_scripts import (
+    FRAMEWORK_FOLDER, prepare_framework_dirs, save_code_block, save_readme, write_default_pytest_ini,
+)
+from tools.locator_validator import validate_page_locators, load_dom_snapshots
+from tools.snapshot_store import SNAPSHOT_FILE
+from tracing import traced
+
+MAX_CONCURRENT_GENERATIONS = 4
+FANOUT_MIN_PAGES = 2              # Flows touching fewer pages use the single-call generator
+MAX_CONTEXT_ELEMENTS = 40         # DOM elements per page object prompt
+LOCATOR_REGENERATION_ROUNDS = 1
+MODULE_GENERATION_ATTEMPTS = 2    # A module whose LLM call fails is retried once before the fan-out gives up
+ACTION_VERBS = {
+    "click": "click", "fill": "fill", "input": "fill", "select": "select", "press": "press",
+    "enter": "press", "submit": "submit", "navigate": "open", "assert": "verify", "verify": "verify",
+}
+REQUIREMENTS_TXT = "pytest\npytest-playwright\nplaywright\nallure-pytest\n"
+
+
+def normalize_page_url(url: str) -> str:
+    parts = urlsplit(url or "")
+    return f"{parts.scheme}://{parts.netloc}{parts.path.rstrip('/') or '/'}"
+
+
+def _slug(text: str, fallback: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", (text or "").lower()).strip("_")
+    slug = re.sub(r"^\d+_?", "", slug)
+    return slug[:40].strip("_") or fallback
+
+
+def _page_slug(url: str) -> str:
+    path = urlsplit(url).path
+    segments = [s for s in path.split("/") if s]
+    return _slug(os.path.splitext(segments[-1])[0] if segments else "", "home")
+
+
+def build_module_plan(action_log: list) -> dict:
+    """
+    Stage 1: derive the framework module plan from the action log.
+    One page object per distinct URL, with a method per recorded action,
+    and one end-to-end test module that walks the flow through those methods.
+    """
+    pages = {}
+    steps = []
+    used_slugs = set()
+    for entry in action_log:
+        if entry.get("success") is False or entry.get("action_type") in (None, "end"):
+            continue
+        page_key = normalize_page_url(entry.get("url", ""))
+        page = pages.get(page_key)
+        if page is None:
+            slug = _page_slug(page_key)
+            while slug in used_slugs:
+                slug = f"{slug}_{len(used_slugs)}"
+            used_slugs.add(slug)
+            page = {
+                "url": entry.get("url"),
+                "url_key": page_key,
+                "module": f"pages/{slug}_page.py",
+                "class_name": "".join(part.capitalize() for part in slug.split("_")) + "Page",
+                "methods": [],
+            }
+            pages[page_key] = page
+
+        action_type = entry.get("action_type")
+        verb = ACTION_VERBS.get(action_type, action_type)
+        target = _slug(entry.get("description") or entry.get("selector") or "", "element")
+        target = re.sub(rf"^{verb}_", "", target)
+        name = f"{verb}_{target}"
+        existing = {m["name"] for m in page["methods"]}
+        if name in existing:
+            # Same action repeated with the same target reuses the method
+            if not any(m["name"] == name and m["selector"] == entry.get("selector") for m in page["methods"]):
+                name = f"{name}_{len(existing)}"
+        if name not in existing:
+            page["methods"].append({
+                "name": name,
+                "action": action_type,
+                "selector": entry.get("selector"),
+                "index": entry.get("index"),
+                "takes_value": action_type in ("fill", "input", "select"),
+                "description": entry.get("description", ""),
+            })
+        steps.append({
+            "step": entry.get("step"),
+            "page_class": page["class_name"],
+            "method": name,
+            "value": entry.get("value"),
+            "expected": entry.get("expected"),
+            "description": entry.get("description", ""),
+        })
+
+    return {
+        "pages": list(pages.values()),
+        "tests": [{"module": "tests/test_user_flow.py", "steps": steps}],
+    }
+
+
+def page_dom_slice(page: dict, snapshots: list, limit: int = MAX_CONTEXT_ELEMENTS) -> list:
+    """
+    The DOM context for one page object: elements from that page's snapshots,
+    the ones targeted by recorded actions first, then other interactive elements.
+    """
+    targeted = {m["selector"] for m in page["methods"] if m.get("selector")}
+    chosen, rest, seen = [], [], set()
+    for snapshot in snapshots:
+        if normalize_page_url(snapshot.get("url", "")) != page["url_key"]:
+            continue
+        for el in snapshot.get("elements", []):
+            locators = el.get("preferred_locators") or []
+            key = locators[0] if locators else json.dumps(el.get("attrs", {}), sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            compact = {
+                "tag": el.get("tag"), "text": el.get("text"), "type": el.get("type"),
+                "preferred_locators": locators,
+            }
+            (chosen if targeted.intersection(locators) else rest).append(compact)
+    interactive = [el for el in rest if el["tag"] in ("input", "button", "a", "select", "textarea")]
+    return (chosen + interactive)[:limit]
+
+
+def _method_signature(method: dict) -> str:
+    return f"def {method['name']}(self{', value' if method['takes_value'] else ''}) -> None"
+
+
+def _page_interface(page: dict) -> str:
+    lines = [f"# {page['module']}", f"class {page['class_name']}:", "    def __init__(self, page): ..."]
+    lines += [f"    {_method_signature(m)}: ...  # {m['description']}" for m in page["methods"]]
+    return "\n".join(lines)
+
+
+def _extract_single_block(response: str) -> str:
+    match = re.search(r"```python\s*(.*?)```", response, re.DOTALL)
+    code = match.group(1) if match else response
+    # Drop a leading path comment, the orchestrator decides where the file goes
+    return re.sub(r"^\s*#\s*[\w\-/\.]+\s*\n", "", code, count=1).strip()
+
+
+def _page_system_prompt(page: dict, dom_slice: list, feedback: str = "") -> str:
+    methods = "\n".join(
+        f"        - {_method_signature(m)}: {m['action']} on selector {m['selector']!r}"
+        + (f" (index {m['index']})" if m.get("index") is not None else "")
+        + f" - {m['description']}"
+        for m in page["methods"]
+    )
+    return f"""
+        You are a QA Automation Engineer. Generate ONE Python Playwright (sync API) page object file: {page['module']}.
+
+        Requirements:
+        - Define exactly one class `{page['class_name']}` with `__init__(self, page)` storing the Playwright page.
+        - Define exactly these methods with these signatures (other files call them):
+{methods}
+        - Keep the locators as class-level constants and use the recorded selectors above.
+        - Use `self.page.wait_for_selector(selector)` before each click/fill, and `.nth(index)` when an index is given.
+        - Do NOT launch browsers, do NOT use `asyncio`, `async def` or `async_playwright`.
+        {feedback}
+        Elements recorded on this page (from an actual scrape):
+        {json.dumps(dom_slice, indent=2)}
+
+        Respond with a single ```python code block and nothing else.
+    """
+
+
+def _test_system_prompt(test: dict, plan: dict) -> str:
+    interfaces = "\n\n".join(_page_interface(page) for page in plan["pages"])
+    steps = "\n".join(
+        f"        {i + 1}. {s['page_class']}.{s['method']}({repr(s['value']) if s.get('value') is not None else ''})"
+        f"  # {s['description']}"
+        for i, s in enumerate(test["steps"])
+    )
+    return f"""
+        You are a QA Automation Engineer. Generate ONE pytest test module: {test['module']}.
+
+        Requirements:
+        - Use the `page` and `base_url` fixtures from the provided conftest.py. Never launch a browser.
+        - Import page objects from their modules, e.g. `from pages.login_page import LoginPage`.
+        - Only call the page object methods listed below, with exactly these signatures:
+{interfaces}
+        - Reproduce the recorded flow in this order:
+{steps}
+        - Add allure steps and the `@pytest.mark.nondestructive` decorator to every test. No skipped tests.
+        - Do NOT use `asyncio`, `async def` or `async_playwright`.
+
+        Respond with a single ```python code block and nothing else.
+    """
+
+
+def _readme(plan: dict) -> str:
+    pages = "\n".join(f"- `{p['module']}`: `{p['class_name']}` for {p['url']}" for p in plan["pages"])
+    tests = "\n".join(f"- `{t['module']}`: {len(t['steps'])} recorded steps" for t in plan["tests"])
+    return (
+        "Generated in parallel from the recorded user flow: one page object per visited page "
+        "and an end-to-end test that replays the flow.\n\n"
+        f"## Page objects\n{pages}\n\n## Tests\n{tests}\n\n"
+        "## Running\n```\npip install -r requirements.txt\nplaywright install\npytest --alluredir=allure-results\n```\n"
+    )
+
+
+async def _generate_module(user_story: str, system_prompt: str, llm_provider: str, semaphore: asyncio.Semaphore, module: str) -> tuple:
+    """
+    Returns (module, code, error). A failed LLM call - raised or returned as an error string -
+    gives code None and the reason, so one module never aborts the others or ends up in a file.
+    """
+    error = None
+    for attempt in range(MODULE_GENERATION_ATTEMPTS):
+        try:
+            async with semaphore:
+                print(f"[DEBUG] Generating {module}..." + (f" (attempt {attempt + 1})" if attempt else ""))
+                response = await query_llm(user_story, system_prompt, llm_provider)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            if is_error_response(response):
+                error = str(response)
+            else:
+                code = _extract_single_block(response)
+                if code:
+                    return module, code, None
+                error = "empty response"
+        print(f"[WARN] Generating {module} failed: {error}")
+    return module, None, error
+
+
+def _describe_module_failures(failed: list) -> str:
+    return "\n".join(f"- {module}: {error}" for module, _, error in failed)
+
+
+async def regenerate_unresolved_pages(user_story: str, llm_provider: str, plan: dict, snapshots: list,
+                                      unresolved: dict, base_path: str, semaphore: asyncio.Semaphore) -> list:
+    """
+    Targeted regeneration: only page objects with locators that do not exist in the recorded DOM.
+    """
+    pages_by_module = {page["module"]: page for page in plan["pages"]}
+    jobs = []
+    for module, selectors in unresolved.items():
+        page = pages_by_module.get(module.replace(os.sep, "/"))
+        if page is None:
+            continue
+        feedback = (
+            "- These locators from your previous attempt do NOT exist on the page, replace them with "
+            f"`preferred_locators` of the recorded elements: {selectors}"
+        )
+        prompt = _page_system_prompt(page, page_dom_slice(page, snapshots), feedback)
+        jobs.append(_generate_module(user_story, prompt, llm_provider, semaphore, page["module"]))
+    paths = []
+    for module, code, error in await asyncio.gather(*jobs):
+        if code is None:
+            print(f"[WARN] Keeping the previous {module}, regeneration failed: {error}")
+            continue
+        full_path = save_code_block(module, code, base_path, set())
+        if full_path:
+            paths.append(full_path)
+    return paths
+
+
+@traced("generate.fanout")
+async def generate_framework_fanout(user_story: str, llm_provider: str, action_log: list,
+                                    snapshots_path: str = None, base_path: str = FRAMEWORK_FOLDER) -> str:
+    """
+    Generation orchestrator: plan modules, generate page objects and tests concurrently,
+    then merge and validate the result.
+    """
+    snapshots = load_dom_snapshots(snapshots_path or os.path.join(base_path, SNAPSHOT_FILE))
+
+    # Stage 1: module plan
+    plan = build_module_plan(action_log)
+    if not plan["pages"]:
+        return "[ERROR] No successful actions recorded. Cannot plan the test framework."
+    print(f"[DEBUG] Module plan: {len(plan['pages'])} page objects, {len(plan['tests'])} test modules.")
+
+    # Stage 2: concurrent generation, each module with its own slice of DOM context
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+    jobs = [
+        _generate_module(user_story, _page_system_prompt(page, page_dom_slice(page, snapshots)), llm_provider, semaphore, page["module"])
+        for page in plan["pages"]
+    ] + [
+        _generate_module(user_story, _test_system_prompt(test, plan), llm_provider, semaphore, test["module"])
+        for test in plan["tests"]
+    ]
+    generated = await asyncio.gather(*jobs)
+    failed = [result for result in generated if result[1] is None]
+    if failed:
+        return (f"[ERROR] Generation failed for {len(failed)} of {len(generated)} modules:\n"
+                + _describe_module_failures(failed))
+
+    # Stage 3: merge and validate
+    prepare_framework_dirs(base_path)
+    used_files = set()
+    saved_paths = [path for path in (save_code_block(module, code, base_path, used_files) for module, code, _ in generated) if path]
+    saved_paths.append(save_code_block("requirements.txt", REQUIREMENTS_TXT, base_path, used_files))
+    with open(os.path.join(base_path, "module_plan.json"), "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=4)
+    save_readme(_readme(plan), base_path)
+    write_conftest_template(base_path, urlsplit(plan["pages"][0]["url"] or "")._replace(path="", query="", fragment="").geturl())
+    write_default_pytest_ini(base_path, force_overwrite=True)
+    format_files(saved_paths)
+
+    locator_report = validate_page_locators(base_path, snapshots)
+    for _ in range(LOCATOR_REGENERATION_ROUNDS):
+        if locator_report["ok"] or not snapshots:
+            break
+        print(f"[INFO] Regenerating {len(locator_report['unresolved'])} page objects with unresolved locators...")
+        format_files(await regenerate_unresolved_pages(
+            user_story, llm_provider, plan, snapshots, locator_report["unresolved"], base_path, semaphore
+        ))
+        locator_report = validate_page_locators(base_path, snapshots)
+
+    violations = check_fixture_contract(base_path)
+    if violations:
+        return "[ERROR] Generated framework rejected by the fixture performance contract:\n" + "\n".join(violations)
+    report = await asyncio.to_thread(validate_framework, base_path)
+    if not report["ok"]:
+        return "[ERROR] Generated framework failed validation:\n" + describe_failures(report)
+
+    locator_note = "" if locator_report["ok"] else (
+        f" {locator_report['unresolved_count']} locators still unresolved, see locator_report.json."
+    )
+    return f"Framework files saved in: {base_path}. Generated {len(generated)} modules in parallel.{locator_note}"
@@ -1,10 +1,19 @@
 # === tools/generate_test_script.py ===
+import asyncio
 import os
 import re
-from llm.llm_client import query_llm
-import subprocess
+import time
+from urllib.parse import urlsplit
+from llm.llm_client import query_llm, stream_llm
+from tools.code_block_stream import StreamingCodeBlockParser
+from tools.conftest_template import write_conftest_template, check_fixture_contract
+from tools.code_validation import format_files, validate_source, validate_framework, describe_failures
+from tools.locator_validator import validate_page_locators, load_dom_snapshots
+from tools.snapshot_store import SNAPSHOT_FILE
+from run_context import FRAMEWORK_FOLDER, workspace_path
+from tracing import span, traced
 
-FRAMEWORK_FOLDER = "framework_output"
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "1") != "0"
 
 def write_default_pytest_ini(base_path: str, force_overwrite: bool = False) -> None:
     pytest_ini_path = os.path.join(base_path, "pytest.ini")
@@ -42,18 +51,11 @@ def write_default_pytest_ini(base_path: str, force_overwrite: bool = False) -> N
         print(f"Error writing pytest.ini: {e}")
         raise RuntimeError(f"Failed to write pytest.ini at {pytest_ini_path}")
 
-# To ensure the code is formatted correctly, we can use the `black` formatter.
-def format_with_black(filepath: str):
-    if not filepath.endswith(".py"):
-        return  # Skip formatting non-Python files
-    try:
-        subprocess.run(["black", filepath], check=True)
-        print(f"Formatted {filepath} with black.")
-    except subprocess.CalledProcessError as e:
-        print(f"[WARN] Failed to format {filepath}: {e}")
+CODE_BLOCK_PATTERN = r"(?:#\s*([\w\-/\.]+)\s*)?```python\s*(#\s*[\w\-/\.]+\s*)?(.*?)```"
+README_SPLIT_PATTERN = r"#\s*[\w\-/\.]+\s*```python.*?```"
 
 
-def extract_and_save_code_blocks(response: str, base_path: str) -> str:
+def prepare_framework_dirs(base_path: str) -> None:
     os.makedirs(base_path, exist_ok=True)
     subfolders = ["tests", "pages", "utils"]
     for subfolder in subfolders:
@@ -61,9 +63,51 @@ def extract_and_save_code_blocks(response: str, base_path: str) -> str:
         init_path = os.path.join(base_path, subfolder, '__init__.py')
         open(init_path, 'a').close() 
 
+
+def normalize_block_path(filepath: str) -> str:
+    filepath = filepath.strip().lstrip("#").strip()
+    # Ensure conftest.py is at the root
+    if os.path.basename(filepath) == "conftest.py" and "/" in filepath:
+        print(f"[WARN] conftest.py should be in root. Moving from {filepath} to conftest.py")
+        filepath = "conftest.py"
+    # Normalize to forward slashes and remove leading slashes
+    return filepath.replace("\\", "/").lstrip("/")
+
+
+def save_code_block(filepath: str, code: str, base_path: str, used_files: set):
+    """
+    Write one extracted code block to disk. Returns the written path, or None for duplicates.
+    """
+    cleaned_path = normalize_block_path(filepath)
+
+    # Avoid duplicates
+    if cleaned_path in used_files:
+        print(f"Duplicate file skipped: {cleaned_path}")
+        return None
+    used_files.add(cleaned_path)
+
+    # Determine target directory
+    full_path = os.path.join(base_path, cleaned_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    # Write the file
+    with open(full_path, "w", encoding="utf-8") as f:
+        f.write(code.strip() + "\n")
+    print(f"File saved: {full_path}")
+    return full_path
+
+
+def extract_readme_text(response: str) -> str:
+    # Extract README by removing all code blocks
+    readme_parts = re.split(README_SPLIT_PATTERN, response, flags=re.DOTALL)
+    return "\n\n".join([part.strip() for part in readme_parts if part.strip()])
+
+
+def extract_and_save_code_blocks(response: str, base_path: str) -> str:
+    prepare_framework_dirs(base_path)
+
     # Extract code blocks
-    pattern = r"(?:#\s*([\w\-/\.]+)\s*)?```python\s*(#\s*[\w\-/\.]+\s*)?(.*?)```"
-    matches = re.findall(pattern, response, re.DOTALL)
+    matches = re.findall(CODE_BLOCK_PATTERN, response, re.DOTALL)
     
     file_blocks = []
     for path_above, path_inside, code in matches:
@@ -72,46 +116,87 @@ def extract_and_save_code_blocks(response: str, base_path: str) -> str:
         if filepath:
             file_blocks.append((filepath, code.strip()))
 
+    used_files = set()
+    saved_paths = []
+    for filepath, code in file_blocks:
+        full_path = save_code_block(filepath, code, base_path, used_files)
+        if full_path:
+            saved_paths.append(full_path)
 
-    # Ensure conftest.py is at the root
-    for i, (filepath, code) in enumerate(file_blocks):
-        filename = os.path.basename(filepath)
-        if filename == "conftest.py" and "/" in filepath:
-            print(f"[WARN] conftest.py should be in root. Moving from {filepath} to conftest.py")
-            file_blocks[i] = ("conftest.py", code)
-        
-   
+    # Format all files in one in-process pass
+    format_files(saved_paths)
+
+    return extract_readme_text(response)
+
+
+def post_process_file(filepath: str) -> dict:
+    """
+    Formatting and validation stage for a single generated file.
+    """
+    result = {"path": filepath, "valid": True, "error": None, "format": None}
+    if not filepath.endswith(".py"):
+        return result
+    result["format"] = format_files([filepath], quiet=True).get(filepath)
+    validation = validate_source(filepath)
+    if not validation["syntax_ok"]:
+        result["valid"] = False
+        result["error"] = validation["error"]
+        print(f"[WARN] Syntax error in {filepath}: {result['error']}")
+    return result
+
+
+async def stream_and_save_code_blocks(user_story: str, system_prompt: str, llm_provider: str, base_path: str) -> dict:
+    """
+    Streaming generation path: files are written and handed to the formatting and
+    validation stage as soon as their code block is complete, while the LLM keeps generating.
+    """
+    prepare_framework_dirs(base_path)
+    parser = StreamingCodeBlockParser()
     used_files = set()
+    fragments = []
+    pending = []
+    start = time.perf_counter()
+    first_file_seconds = None
 
-    for filepath, code in file_blocks:
-        cleaned_path = filepath.strip()
-        code = code.strip()
-
-        # Normalize to forward slashes and remove leading slashes
-        cleaned_path = cleaned_path.replace("\\", "/").lstrip("/")
-
-        # Avoid duplicates
-        if cleaned_path in used_files:
-            print(f"Duplicate file skipped: {cleaned_path}")
-            continue
-        used_files.add(cleaned_path)
-
-        # Determine target directory
-        full_path = os.path.join(base_path, cleaned_path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-
-        # Write the file
-        with open(full_path, "w", encoding="utf-8") as f:
-            code = code.strip() + "\n"
-            f.write(code)
-        print(f"File saved: {full_path}")
-        # Format the file with black
-        format_with_black(full_path)
-        
-    # Extract README by removing all code blocks
-    readme_parts = re.split(r"#\s*[\w\-/\.]+\s*```python.*?```", response, flags=re.DOTALL)
-    readme_text = "\n\n".join([part.strip() for part in readme_parts if part.strip()])
-    return readme_text
+    async def process(full_path: str) -> dict:
+        nonlocal first_file_seconds
+        result = await asyncio.to_thread(post_process_file, full_path)
+        if result["valid"] and first_file_seconds is None:
+            first_file_seconds = time.perf_counter() - start
+            print(f"[INFO] First usable file ready after {first_file_seconds:.2f}s: {full_path}")
+        return result
+
+    def flush(blocks: list) -> None:
+        for filepath, code in blocks:
+            full_path = save_code_block(filepath, code, base_path, used_files)
+            if full_path:
+                pending.append(asyncio.create_task(process(full_path)))
+
+    error = None
+    with span("llm.stream", provider=llm_provider) as stream_span:
+        try:
+            async for fragment in stream_llm(user_story, system_prompt, llm_provider):
+                fragments.append(fragment)
+                flush(parser.feed(fragment))
+            flush(parser.close())
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        stream_span.set(response_chars=sum(len(f) for f in fragments), files=len(pending), failed=error is not None)
+    generation_seconds = time.perf_counter() - start
+
+    with span("generate.post_process", files=len(pending)):
+        file_results = await asyncio.gather(*pending)
+    formatted = sum(1 for result in file_results if result["format"] == "formatted")
+    python_files = sum(1 for result in file_results if result["format"] is not None)
+    print(f"[INFO] Generation streamed in {generation_seconds:.2f}s, {len(file_results)} files written, "
+          f"{formatted}/{python_files} formatted with black.")
+    return {
+        "error": error,
+        "readme_text": extract_readme_text("".join(fragments)),
+        "files": list(file_results),
+        "first_file_seconds": first_file_seconds,
+        "generation_seconds": generation_seconds,
+    }
             
 
 def save_readme(readme_text: str, base_path: str) -> None:
@@ -122,7 +207,19 @@ def save_readme(readme_text: str, base_path: str) -> None:
     print(f"README saved: {readme_path}")
 
 
-async def generate_test_scripts(user_story: str, llm_provider: str, dom_context: str) -> str:
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>|]+")
+
+def extract_base_url(dom_context: str) -> str:
+    """Scheme and host of the first URL in the flow summary, the BASE_URL of the generated conftest."""
+    match = URL_PATTERN.search(dom_context or "")
+    if not match:
+        return ""
+    return urlsplit(match.group(0))._replace(path="", query="", fragment="").geturl()
+
+
+@traced("generate.scripts")
+async def generate_test_scripts(user_story: str, llm_provider: str, dom_context: str, stream: bool = STREAM_GENERATION,
+                                run_context=None) -> str:
 # async def generate_test_scripts(user_story: str, llm_provider: str) -> str:
     system_prompt = f"""
         You are a QA Automation Engineer. Generate a Python Playwright automation framework using pytest and Page Object Model (POM).
@@ -140,10 +237,12 @@ async def generate_test_scripts(user_story: str, llm_provider: str, dom_context:
         - Directory structure as markdown
         - Explanations for design decisions
         - Do NOT use `asyncio`, `async def`, or `async_playwright`. 
-        - Ensure conftest.py uses sync_playwright().start() and stops it explicitly to avoid fixture issues.
         - Do NOT include @pytest.mark.skip or skipped tests. All generated tests must be active and runnable.
-        - conftest.py must define fixtures for browser(), page(), and base_url(), and be fully functional with Playwright.
-        - The `base_url` fixture in conftest.py must use `scope="session"` to avoid scope mismatches with plugins or session-scoped tests.
+        - Do NOT generate conftest.py. The framework ships a maintained conftest.py that provides these fixtures:
+            - `browser` (scope="session"): one browser for the whole run
+            - `context` and `page` (per test): a fresh browser context and page for every test
+            - `base_url` (scope="session"): the application base URL
+        - Tests must use the `page` and `base_url` fixtures. Never launch a browser or call sync_playwright() in tests, page objects or fixtures.
         
         Use this DOM reference (from an actual scrape) to guide your locator choices:
         {dom_context}
@@ -157,17 +256,46 @@ async def generate_test_scripts(user_story: str, llm_provider: str, dom_context:
         Format all code blocks with triple backticks and python language specifier.
     """
         
+    base_path = workspace_path(run_context)
     print("\n Starting framework generation...\n\n")
-    response = await query_llm(user_story, system_prompt, llm_provider)
-    # print("\nGenerate Response---------->\n", response)
+    first_file_note = ""
+    if stream:
+        streamed = await stream_and_save_code_blocks(user_story, system_prompt, llm_provider, base_path)
+        if streamed["error"]:
+            return f"[ERROR] Framework generation failed while streaming from {llm_provider}: {streamed['error']}"
+        readme_text = streamed["readme_text"]
+        if streamed["first_file_seconds"] is not None:
+            first_file_note = f" First usable file after {streamed['first_file_seconds']:.2f}s."
+    else:
+        response = await query_llm(user_story, system_prompt, llm_provider)
+        # print("\nGenerate Response---------->\n", response)
+
+        # Extract and save code files
+        print("\n\n Saving files...\n")
+        readme_text = extract_and_save_code_blocks(response, base_path)
+    save_readme(readme_text, base_path)
+
+    # Replace the LLM's conftest with the maintained, session-scoped template
+    write_conftest_template(base_path, extract_base_url(dom_context))
+    violations = check_fixture_contract(base_path)
+    if violations:
+        print("[ERROR] Generated framework launches a browser per test:\n" + "\n".join(violations))
+        return "[ERROR] Generated framework rejected by the fixture performance contract:\n" + "\n".join(violations)
+
+    # Parse, compile and resolve imports before anything tries to run pytest
+    with span("generate.validate"):
+        report = await asyncio.to_thread(validate_framework, base_path)
+    if not report["ok"]:
+        return "[ERROR] Generated framework failed validation:\n" + describe_failures(report)
 
-    # Extract and save code files
-    print("\n\n Saving files...\n")
-    readme_text = extract_and_save_code_blocks(response, FRAMEWORK_FOLDER)
-    save_readme(readme_text, FRAMEWORK_FOLDER)
+    # Flag page object locators that do not exist in the recorded DOM snapshots
+    snapshots = load_dom_snapshots(os.path.join(base_path, SNAPSHOT_FILE))
+    locator_report = validate_page_locators(base_path, snapshots)
+    if not locator_report["ok"]:
+        first_file_note += f" {locator_report['unresolved_count']} locators not found in the recorded DOM, see locator_report.json."
 
     # Write pytest.ini, force overwrite if previous runs caused issues
-    write_default_pytest_ini(FRAMEWORK_FOLDER, force_overwrite=True)  # Set to True to ensure fresh file
+    write_default_pytest_ini(base_path, force_overwrite=True)  # Set to True to ensure fresh file
 
     print("\n\n All files saved. Exiting...\n")
-    return f"Framework files saved in: {FRAMEWORK_FOLDER}"
+    return f"Framework files saved in: {base_path}.{first_file_note}"
@@ -0,0 +1,52 @@
+# === tools/har_replay.py ===
+import hashlib
+import os
+from urllib.parse import urlsplit
+
+SCRAPE_HAR_MODE = os.getenv("SCRAPE_HAR_MODE", "off")           # off | capture | replay | auto
+SCRAPE_HAR_FOLDER = os.getenv("SCRAPE_HAR_FOLDER", "har_recordings")
+SCRAPE_HAR_STRICT = os.getenv("SCRAPE_HAR_STRICT", "1") != "0"  # abort requests missing from the recording
+HAR_MODES = {"off", "capture", "replay", "auto"}
+
+
+def flow_har_path(url: str, goal_prompt: str, folder: str = None) -> str:
+    """One recording per flow: same start URL and goal prompt, same HAR file."""
+    host = urlsplit(url).netloc.replace(":", "_") or "site"
+    digest = hashlib.sha1(f"{url}\n{goal_prompt}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(folder or SCRAPE_HAR_FOLDER, f"{host}_{digest}.har.zip")
+
+
+def resolve_har_mode(url: str, goal_prompt: str, mode: str = None) -> tuple:
+    """
+    Returns (mode, har_path). "auto" replays an existing recording and captures otherwise.
+    Raises FileNotFoundError when replay is requested but nothing was recorded.
+    """
+    mode = (mode or SCRAPE_HAR_MODE).lower()
+    if mode not in HAR_MODES:
+        print(f"[WARN] Unknown HAR mode '{mode}', recording disabled.")
+        mode = "off"
+    if mode == "off":
+        return "off", None
+    har_path = flow_har_path(url, goal_prompt)
+    if mode == "auto":
+        mode = "replay" if os.path.exists(har_path) else "capture"
+    if mode == "replay" and not os.path.exists(har_path):
+        raise FileNotFoundError(f"No HAR recording for this flow at {har_path}. Run once with SCRAPE_HAR_MODE=capture.")
+    if mode == "capture":
+        os.makedirs(os.path.dirname(har_path), exist_ok=True)
+    return mode, har_path
+
+
+def har_context_options(mode: str, har_path: str) -> dict:
+    """Extra browser.new_context() options for capture mode (the HAR is written on context.close())."""
+    if mode != "capture":
+        return {}
+    return {"record_har_path": har_path, "record_har_mode": "full", "record_har_content": "attach"}
+
+
+async def apply_har_replay(context, mode: str, har_path: str, strict: bool = SCRAPE_HAR_STRICT) -> None:
+    """Serve every request from the recording in replay mode."""
+    if mode != "replay":
+        return
+    await context.route_from_har(har_path, not_found="abort" if strict else "fallback")
+    print(f"[DEBUG] Replaying network from {har_path}{' (strict)' if strict else ''}.")
@@ -0,0 +1,252 @@
+# === tools/locator_validator.py ===
+import ast
+import json
+import os
+import re
+
+from tools.snapshot_store import SnapshotReader
+
+LOCATOR_REPORT_FILE = "locator_report.json"
+
+# Page methods whose first argument is a selector string
+SELECTOR_METHODS = {
+    "locator", "wait_for_selector", "query_selector", "query_selector_all", "click", "dblclick",
+    "check", "uncheck", "hover", "is_visible", "is_enabled", "inner_text", "text_content", "input_value",
+}
+# page.fill(selector, value) vs locator.fill(value): only a selector when a second argument follows
+SELECTOR_VALUE_METHODS = {"fill", "type", "press", "select_option", "get_attribute"}
+# Playwright get_by_* helpers mapped to the index they are checked against
+GET_BY_METHODS = {
+    "get_by_test_id": "data-testid",
+    "get_by_label": "label",
+    "get_by_placeholder": "placeholder",
+    "get_by_text": "text",
+    "get_by_role": "role",
+}
+
+ATTR_SELECTOR = re.compile(r"""\[\s*([\w\-:]+)\s*(\*=|\^=|\$=|~=|=)\s*['"]?(.*?)['"]?\s*\]""")
+HAS_TEXT = re.compile(r""":has-text\(\s*['"](.*?)['"]\s*\)""")
+XPATH_TEXT = re.compile(r"""contains\((?:normalize-space\()?(?:text\(\)|\.)\)?\s*,\s*['"](.*?)['"]\)""")
+SIMPLE_CSS = re.compile(r"^(?P<tag>[a-zA-Z][\w\-]*)?(?P<id>#[\w\-]+)?(?P<classes>(?:\.[\w\-]+)*)(?P<attrs>(?:\[[^\]]+\])*)(?P<text>:has-text\(.*\))?$")
+
+
+def _norm(text) -> str:
+    return re.sub(r"\s+", " ", str(text or "")).strip().lower()
+
+
+class DomLocatorIndex:
+    """
+    Offline index of everything a locator can hit in the recorded DOM snapshots:
+    ids, names, data-testids, aria-labels, placeholders, classes and visible text.
+    """
+
+    def __init__(self, snapshots):
+        self.elements = []
+        self.by_attr = {}
+        self.texts = set()
+        if hasattr(snapshots, "unique_elements"):
+            elements = snapshots.unique_elements()  # deduplicated store: each element once
+        else:
+            elements = (el for snapshot in snapshots for el in snapshot.get("elements", []))
+        for el in elements:
+            self.add_element(el)
+
+    def add_element(self, el: dict) -> None:
+        attrs = dict(el.get("attrs") or {})
+        for key in ("id", "name", "type", "placeholder"):
+            if el.get(key) and key not in attrs:
+                attrs[key] = el[key]
+        entry = {"tag": (el.get("tag") or "").lower(), "attrs": attrs, "text": _norm(el.get("text"))}
+        self.elements.append(entry)
+        for key, value in attrs.items():
+            self.by_attr.setdefault(key, {}).setdefault(str(value), []).append(entry)
+        if entry["text"]:
+            self.texts.add(entry["text"])
+
+    def has_attr(self, key: str, value: str) -> bool:
+        return str(value) in self.by_attr.get(key, {})
+
+    def has_text(self, text: str, tag: str = None) -> bool:
+        needle = _norm(text)
+        if not needle:
+            return False
+        if tag is None and needle in self.texts:
+            return True
+        return any(
+            needle in el["text"] and (tag is None or el["tag"] == tag)
+            for el in self.elements
+        )
+
+    def _matches_css(self, el: dict, tag, element_id, classes, attr_conditions) -> bool:
+        if tag and el["tag"] != tag.lower():
+            return False
+        if element_id and el["attrs"].get("id") != element_id:
+            return False
+        class_tokens = str(el["attrs"].get("class", "")).split()
+        if any(cls not in class_tokens for cls in classes):
+            return False
+        for key, op, value in attr_conditions:
+            actual = el["attrs"].get(key)
+            if actual is None:
+                return False
+            actual = str(actual)
+            if (op == "=" and actual != value) or (op == "*=" and value not in actual) \
+                    or (op == "^=" and not actual.startswith(value)) or (op == "$=" and not actual.endswith(value)) \
+                    or (op == "~=" and value not in actual.split()):
+                return False
+        return True
+
+    def check_selector(self, selector: str) -> str:
+        """Return 'resolved', 'unresolved' or 'unchecked' (selector syntax not checkable offline)."""
+        selector = selector.strip()
+        if selector.startswith("text="):
+            return "resolved" if self.has_text(selector[5:].strip("'\"")) else "unresolved"
+        if selector.startswith("//") or selector.startswith("xpath="):
+            match = XPATH_TEXT.search(selector)
+            if not match:
+                return "unchecked"
+            tag_match = re.match(r"(?:xpath=)?//([a-zA-Z][\w\-]*)", selector)
+            return "resolved" if self.has_text(match.group(1), tag_match.group(1) if tag_match else None) else "unresolved"
+
+        match = SIMPLE_CSS.match(selector)
+        if not match:
+            return "unchecked"  # combinators, pseudo classes, nth-match... resolved at runtime only
+        tag = match.group("tag")
+        element_id = match.group("id")[1:] if match.group("id") else None
+        classes = [cls for cls in match.group("classes").split(".") if cls]
+        attr_conditions = [(k, op, v) for k, op, v in ATTR_SELECTOR.findall(match.group("attrs") or "")]
+        text_match = HAS_TEXT.search(match.group("text") or "")
+        text = text_match.group(1).replace("\\'", "'") if text_match else None
+        if match.group("text") and not text_match:
+            return "unchecked"
+
+        for el in self.elements:
+            if self._matches_css(el, tag, element_id, classes, attr_conditions) and (text is None or _norm(text) in el["text"]):
+                return "resolved"
+        return "unresolved"
+
+    def check_get_by(self, method: str, value: str) -> str:
+        kind = GET_BY_METHODS[method]
+        if kind == "data-testid":
+            return "resolved" if self.has_attr("data-testid", value) else "unresolved"
+        if kind == "placeholder":
+            return "resolved" if self.has_attr("placeholder", value) else "unresolved"
+        if kind == "label":
+            return "resolved" if self.has_attr("aria-label", value) or self.has_text(value) else "unresolved"
+        if kind == "text":
+            return "resolved" if self.has_text(value) else "unresolved"
+        return "unchecked"  # get_by_role is checked through its name= keyword below
+
+
+def load_dom_snapshots(path: str):
+    """A lazy SnapshotReader for snapshot stores, or the list from a legacy dom_flow_output.json."""
+    if not os.path.exists(path):
+        return []
+    if path.endswith(".jsonl.gz"):
+        return SnapshotReader(path)
+    with open(path, "r", encoding="utf-8") as f:
+        snapshots = json.load(f)
+    return snapshots if isinstance(snapshots, list) else []
+
+
+def _string_constants(tree: ast.Module) -> dict:
+    """Map names and self attributes assigned a string constant to that string."""
+    constants = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+                elif isinstance(target, ast.Attribute):
+                    constants[target.attr] = node.value.value
+    return constants
+
+
+def _resolve_string(node, constants: dict):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    if isinstance(node, ast.Attribute):
+        return constants.get(node.attr)
+    return None
+
+
+def extract_locators(source: str, filename: str = "<page>") -> list:
+    """
+    Extract (selector, method, line) triples from a page object source file.
+    Selectors passed through module constants or self attributes are resolved.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except SyntaxError:
+        return []
+    constants = _string_constants(tree)
+    locators = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Attribute):
+            continue
+        method = node.func.attr
+        if method == "get_by_role":
+            for keyword in node.keywords:
+                if keyword.arg == "name":
+                    value = _resolve_string(keyword.value, constants)
+                    if value:
+                        locators.append((value, "get_by_text", node.lineno))
+            continue
+        if method in SELECTOR_VALUE_METHODS:
+            if len(node.args) < 2:
+                continue
+        elif method not in SELECTOR_METHODS and method not in GET_BY_METHODS:
+            continue
+        if not node.args:
+            continue
+        value = _resolve_string(node.args[0], constants)
+        if value:
+            locators.append((value, method, node.lineno))
+    return locators
+
+
+def validate_page_locators(base_path: str, snapshots: list, page_files: list = None) -> dict:
+    """
+    Check every locator in the generated pages/*.py against the recorded DOM snapshots.
+    Returns a report with per-locator status and the unresolved locators grouped by file.
+    """
+    index = DomLocatorIndex(snapshots)
+    pages_dir = os.path.join(base_path, "pages")
+    if page_files is None:
+        page_files = sorted(
+            os.path.join(pages_dir, name) for name in os.listdir(pages_dir)
+            if name.endswith(".py") and name != "__init__.py"
+        ) if os.path.isdir(pages_dir) else []
+
+    locators = []
+    unresolved = {}
+    for path in page_files:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        rel_path = os.path.relpath(path, base_path)
+        for selector, method, line in extract_locators(source, rel_path):
+            if method in GET_BY_METHODS:
+                status = index.check_get_by(method, selector)
+            else:
+                status = index.check_selector(selector)
+            locators.append({"file": rel_path, "line": line, "method": method, "selector": selector, "status": status})
+            if status == "unresolved":
+                unresolved.setdefault(rel_path, []).append(selector)
+
+    report = {
+        "ok": not unresolved,
+        "checked": len(locators),
+        "unresolved_count": sum(len(v) for v in unresolved.values()),
+        "unresolved": unresolved,
+        "locators": locators,
+    }
+    try:
+        with open(os.path.join(base_path, LOCATOR_REPORT_FILE), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    except IOError as e:
+        print(f"[WARN] Failed to write locator report: {e}")
+    for path, selectors in unresolved.items():
+        print(f"[WARN] {path}: {len(selectors)} locator(s) not found in recorded DOM: {selectors}")
+    return report
@@ -0,0 +1,122 @@
+# === tools/network_profiles.py ===
+import os
+
+SCRAPE_ROUTING_PROFILE = os.getenv("SCRAPE_ROUTING_PROFILE", "no-media")
+
+# Stylesheets are never blocked: extraction relies on computed styles
+# (cursor: pointer, visibility) to decide what is clickable and visible.
+ROUTING_PROFILES = {
+    "full": {"block_types": set(), "block_trackers": False},
+    "no-media": {"block_types": {"image", "media", "font"}, "block_trackers": False},
+    "structure-only": {
+        "block_types": {"image", "media", "font", "texttrack", "eventsource", "websocket", "manifest", "beacon", "ping"},
+        "block_trackers": True,
+    },
+}
+
+# Ads and analytics that never matter for locator extraction
+TRACKER_HOSTS = {
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com", "segment.io",
+    "segment.com", "mixpanel.com", "amplitude.com", "clarity.ms", "fullstory.com", "nr-data.net",
+    "scorecardresearch.com", "taboola.com", "outbrain.com", "criteo.com", "adsrvr.org",
+}
+
+# Typical transfer sizes, used to estimate what blocked requests would have cost
+ESTIMATED_BYTES_BY_TYPE = {
+    "image": 60_000, "media": 500_000, "font": 40_000, "script": 40_000, "stylesheet": 20_000,
+    "xhr": 5_000, "fetch": 5_000, "websocket": 1_000, "eventsource": 1_000, "other": 5_000,
+}
+
+
+def _host_matches(host: str, domains: set) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def _env_list(name: str) -> set:
+    return {item.strip().lower() for item in os.getenv(name, "").split(",") if item.strip()}
+
+
+class RequestRouter:
+    """
+    Blocks requests according to a routing profile and per-host deny lists, and keeps
+    per-flow statistics of what was blocked and loaded. Allow lists act as a safety
+    switch for sites that break without certain assets.
+    """
+
+    def __init__(self, profile: str = None, deny_hosts: set = None, allow_hosts: set = None, allow_types: set = None):
+        profile = profile or SCRAPE_ROUTING_PROFILE
+        if profile not in ROUTING_PROFILES:
+            print(f"[WARN] Unknown routing profile '{profile}', falling back to 'full'.")
+            profile = "full"
+        config = ROUTING_PROFILES[profile]
+        self.profile = profile
+        self.block_types = set(config["block_types"]) - set(allow_types or ())
+        self.deny_hosts = set(deny_hosts or ()) | (TRACKER_HOSTS if config["block_trackers"] else set())
+        self.allow_hosts = set(allow_hosts or ())
+        self.stats = {
+            "profile": profile,
+            "blocked_requests": 0,
+            "blocked_by_type": {},
+            "blocked_by_host": {},
+            "estimated_bytes_saved": 0,
+            "loaded_requests": 0,
+            "loaded_bytes": 0,
+        }
+
+    @classmethod
+    def from_env(cls, profile: str = None) -> "RequestRouter":
+        return cls(
+            profile=profile,
+            deny_hosts=_env_list("SCRAPE_DENY_HOSTS"),
+            allow_hosts=_env_list("SCRAPE_ALLOW_HOSTS"),
+            allow_types=_env_list("SCRAPE_ALLOW_RESOURCE_TYPES"),
+        )
+
+    @property
+    def active(self) -> bool:
+        return bool(self.block_types or self.deny_hosts)
+
+    def should_block(self, resource_type: str, url: str) -> str:
+        """Return the reason to block a request, or an empty string to let it through."""
+        if resource_type == "document":
+            return ""  # never block navigations
+        host = url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0].lower()
+        if _host_matches(host, self.allow_hosts):
+            return ""
+        if _host_matches(host, self.deny_hosts):
+            return host
+        if resource_type in self.block_types:
+            return resource_type
+        return ""
+
+    async def handle_route(self, route) -> None:
+        request = route.request
+        reason = self.should_block(request.resource_type, request.url)
+        if not reason:
+            await route.fallback()
+            return
+        self.stats["blocked_requests"] += 1
+        by_type = self.stats["blocked_by_type"]
+        by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+        if reason != request.resource_type:
+            self.stats["blocked_by_host"][reason] = self.stats["blocked_by_host"].get(reason, 0) + 1
+        self.stats["estimated_bytes_saved"] += ESTIMATED_BYTES_BY_TYPE.get(request.resource_type, 5_000)
+        await route.abort("blockedbyclient")
+
+    def on_response(self, response) -> None:
+        self.stats["loaded_requests"] += 1
+        try:
+            self.stats["loaded_bytes"] += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    async def attach(self, context) -> None:
+        context.on("response", self.on_response)
+        if self.active:
+            await context.route("**/*", self.handle_route)
+            print(f"[DEBUG] Routing profile '{self.profile}' active "
+                  f"(blocking types: {sorted(self.block_types) or 'none'}, {len(self.deny_hosts)} denied hosts).")
+
+    def report(self) -> dict:
+        return dict(self.stats)
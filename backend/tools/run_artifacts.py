@@ -0,0 +1,140 @@
+# === tools/run_artifacts.py ===
+import json
+import os
+import time
+
+from run_context import RUN_MANIFEST, RUNS_FOLDER, LATEST_LINK, atomic_write_json
+from tools.snapshot_store import SNAPSHOT_FILE, iter_snapshots
+
+RUN_INDEX_FILE = "index.json"
+# Folders that hold tool state rather than artifacts worth browsing one by one
+SKIPPED_FOLDERS = {"__pycache__", ".pytest_cache", "allure-results", "allure-report", "node_modules"}
+TEXT_KINDS = {".py": "python", ".json": "json", ".log": "text", ".txt": "text", ".md": "markdown",
+              ".ini": "ini", ".cfg": "ini", ".toml": "toml", ".html": "html", ".folded": "text", ".yaml": "yaml"}
+
+
+def _manifest_mtime(run_dir: str) -> float:
+    try:
+        return os.stat(os.path.join(run_dir, RUN_MANIFEST)).st_mtime
+    except OSError:
+        return os.stat(run_dir).st_mtime  # sessions from before run manifests
+
+
+def runs_signature(runs_folder: str = None) -> tuple:
+    """Cheap fingerprint of the runs folder: one stat per run, changes whenever a run starts, ends or goes away."""
+    runs_folder = runs_folder or RUNS_FOLDER
+    if not os.path.isdir(runs_folder):
+        return ()
+    signature = []
+    for entry in os.scandir(runs_folder):
+        if entry.is_dir(follow_symlinks=False) and entry.name != LATEST_LINK:
+            signature.append((entry.name, _manifest_mtime(entry.path)))
+    return tuple(sorted(signature))
+
+
+def _index_entry(runs_folder: str, name: str, mtime: float) -> dict:
+    run_dir = os.path.join(runs_folder, name)
+    try:
+        with open(os.path.join(run_dir, RUN_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = {"status": "unknown", "started_at": mtime}
+    summary = (manifest.get("summary") or "").strip()
+    return {
+        "run_id": name,
+        "status": manifest.get("status", "unknown"),
+        "started_at": manifest.get("started_at"),
+        "finished_at": manifest.get("finished_at"),
+        "summary": summary.splitlines()[0][:200] if summary else "",
+        "mtime": mtime,
+    }
+
+
+def run_index(runs_folder: str = None) -> list:
+    """
+    All runs, newest first. Kept in runs/index.json and only refreshed for runs whose manifest
+    changed, so opening the history does not re-read every old run.
+    """
+    runs_folder = runs_folder or RUNS_FOLDER
+    index_path = os.path.join(runs_folder, RUN_INDEX_FILE)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            known = {entry["run_id"]: entry for entry in json.load(f).get("runs", [])}
+    except (OSError, json.JSONDecodeError, KeyError):
+        known = {}
+    entries, changed = [], False
+    signature = runs_signature(runs_folder)
+    for name, mtime in signature:
+        entry = known.get(name)
+        if entry is None or entry.get("mtime") != mtime:
+            entry = _index_entry(runs_folder, name, mtime)
+            changed = True
+        entries.append(entry)
+    changed = changed or len(entries) != len(known)
+    entries.sort(key=lambda entry: entry.get("started_at") or entry["mtime"], reverse=True)
+    if changed and signature:
+        try:
+            atomic_write_json(index_path, {"updated_at": time.time(), "runs": entries})
+        except OSError as e:
+            print(f"[WARN] Could not update the run index: {e}")
+    return entries
+
+
+def list_artifacts(run_dir: str) -> list:
+    """Files of a run (relative path, size, mtime, kind), without reading any of them."""
+    artifacts = []
+    for dirpath, dirnames, filenames in os.walk(run_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_FOLDERS)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if filename.endswith(".tmp") or os.path.islink(path):
+                continue
+            stat = os.stat(path)
+            artifacts.append({
+                "path": os.path.relpath(path, run_dir),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "kind": artifact_kind(filename),
+            })
+    return artifacts
+
+
+def artifact_kind(filename: str) -> str:
+    if filename.endswith(SNAPSHOT_FILE) or filename.endswith(".jsonl.gz"):
+        return "snapshots"
+    return TEXT_KINDS.get(os.path.splitext(filename)[1].lower(), "binary")
+
+
+def line_offsets(path: str) -> list:
+    """Byte offset of every line start, so any page of a large log can be read with one seek."""
+    offsets, position = [0], 0
+    with open(path, "rb") as f:
+        for line in f:
+            position += len(line)
+            offsets.append(position)
+    return offsets
+
+
+def read_lines(path: str, offsets: list, start: int, count: int) -> str:
+    """Lines [start, start + count) of a text file, using offsets from line_offsets()."""
+    line_count = len(offsets) - 1
+    if start >= line_count:
+        return ""
+    end = min(start + count, line_count)
+    with open(path, "rb") as f:
+        f.seek(offsets[start])
+        return f.read(offsets[end] - offsets[start]).decode("utf-8", errors="replace")
+
+
+def snapshot_index(path: str) -> list:
+    """One row per DOM snapshot (step, url, element count), built in one streaming pass."""
+    return [{"position": position, "step": snapshot.get("step"), "url": snapshot.get("url"),
+             "elements": len(snapshot.get("elements", []))}
+            for position, snapshot in enumerate(iter_snapshots(path))]
+
+
+def read_snapshot(path: str, position: int) -> dict:
+    for current, snapshot in enumerate(iter_snapshots(path)):
+        if current == position:
+            return snapshot
+    return {}
@@ -0,0 +1,177 @@
+# === tools/selector_cache.py ===
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, but concurrent savers may drop each other's updates
+    fcntl = None
+
+SELECTOR_CACHE_PATH = os.getenv("SELECTOR_CACHE_PATH", ".selector_cache.json")
+FINGERPRINT_ATTRS = ("id", "name", "type", "role", "data-testid", "aria-label", "placeholder")
+MIN_HIT_RATE = 0.5        # Cached selectors below this smoothed hit rate are not preferred
+MAX_SELECTORS_PER_ELEMENT = 10
+
+# Path segments that vary between runs: numbers, uuids, long hex ids
+VOLATILE_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,})$", re.IGNORECASE)
+
+
+def normalize_url_pattern(url: str) -> str:
+    parts = urlsplit(url or "")
+    segments = ["{id}" if VOLATILE_SEGMENT.match(seg) else seg for seg in parts.path.split("/") if seg]
+    return f"{parts.netloc.lower()}/{'/'.join(segments)}"
+
+
+def element_fingerprint(el: dict) -> str:
+    """
+    Identify an element by intent (tag, text, stable attributes) rather than by selector,
+    so the same element is recognised across runs even when its selectors change.
+    """
+    attrs = el.get("attrs") or {}
+    text = re.sub(r"^[\d₹$€¥\s\-]+", "", (el.get("text") or "")).strip().lower()
+    identity = {
+        "tag": el.get("tag"),
+        "text": re.sub(r"\s+", " ", text)[:80],
+        "attrs": {key: attrs.get(key) or el.get(key) for key in FINGERPRINT_ATTRS if attrs.get(key) or el.get(key)},
+    }
+    return hashlib.sha1(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class SelectorCache:
+    """
+    Local selector knowledge base keyed by URL pattern and element fingerprint.
+    Tracks which selectors actually worked and their historical hit rate.
+    Several processes (e.g. queue workers) may share one file: each keeps the outcomes it
+    recorded since its last save and adds them to what is on disk when saving.
+    """
+
+    def __init__(self, path: str = SELECTOR_CACHE_PATH):
+        self.path = path
+        self.entries = self._load()
+        self.pending = {}  # outcomes recorded since the last save, same layout as entries
+        self.dirty = False
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (IOError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable selector cache {self.path}: {e}")
+            return {}
+
+    def _element_entry(self, url: str, el: dict, create: bool = False, entries: dict = None):
+        entries = self.entries if entries is None else entries
+        page_entries = entries.get(normalize_url_pattern(url))
+        if page_entries is None:
+            if not create:
+                return None
+            page_entries = entries.setdefault(normalize_url_pattern(url), {})
+        fingerprint = element_fingerprint(el)
+        if fingerprint not in page_entries and create:
+            page_entries[fingerprint] = {"tag": el.get("tag"), "text": (el.get("text") or "")[:80], "selectors": {}}
+        return page_entries.get(fingerprint)
+
+    @staticmethod
+    def hit_rate(stats: dict) -> float:
+        # Laplace smoothing so one lucky hit does not outrank a long track record
+        return (stats["hits"] + 1) / (stats["hits"] + stats["misses"] + 2)
+
+    @classmethod
+    def _trim(cls, entry: dict) -> None:
+        # Keep only the best selectors per element
+        if len(entry["selectors"]) > MAX_SELECTORS_PER_ELEMENT:
+            ranked = sorted(entry["selectors"].items(), key=lambda item: cls.hit_rate(item[1]), reverse=True)
+            entry["selectors"] = dict(ranked[:MAX_SELECTORS_PER_ELEMENT])
+
+    @staticmethod
+    def _add_stats(stats: dict, hits: int, misses: int, last_success) -> None:
+        stats["hits"] += hits
+        stats["misses"] += misses
+        if last_success and (stats["last_success"] or 0) < last_success:
+            stats["last_success"] = last_success
+
+    def record(self, url: str, el: dict, selector: str, success: bool) -> None:
+        now = time.time() if success else None
+        for entries in (self.entries, self.pending):
+            entry = self._element_entry(url, el, create=True, entries=entries)
+            stats = entry["selectors"].setdefault(selector, {"hits": 0, "misses": 0, "last_success": None})
+            self._add_stats(stats, int(success), int(not success), now)
+        self._trim(self._element_entry(url, el, entries=self.entries))
+        self.dirty = True
+
+    def selector_hit_rate(self, url: str, el: dict, selector: str):
+        entry = self._element_entry(url, el)
+        stats = entry["selectors"].get(selector) if entry else None
+        return self.hit_rate(stats) if stats else None
+
+    def best_selectors(self, url: str, el: dict, limit: int = 3) -> list:
+        entry = self._element_entry(url, el)
+        if not entry:
+            return []
+        ranked = sorted(
+            ((selector, stats) for selector, stats in entry["selectors"].items()
+             if stats["hits"] and self.hit_rate(stats) >= MIN_HIT_RATE),
+            key=lambda item: (self.hit_rate(item[1]), item[1]["hits"]),
+            reverse=True,
+        )
+        return [selector for selector, _ in ranked[:limit]]
+
+    def rank_locators(self, url: str, el: dict) -> dict:
+        """Move selectors with a good track record to the front of preferred_locators."""
+        best = self.best_selectors(url, el)
+        if best:
+            el["preferred_locators"] = best + [loc for loc in el.get("preferred_locators", []) if loc not in best]
+            el["cached_locators"] = best
+        return el
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self) -> None:
+        """Add the outcomes recorded since the last save to the file as it is now, not as it was loaded."""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with self._file_lock():
+                merged = self._load()
+                for pattern, page_entries in self.pending.items():
+                    for fingerprint, pending_entry in page_entries.items():
+                        entry = merged.setdefault(pattern, {}).setdefault(
+                            fingerprint, {**pending_entry, "selectors": {}})
+                        for selector, pending_stats in pending_entry["selectors"].items():
+                            stats = entry["selectors"].setdefault(selector, {"hits": 0, "misses": 0, "last_success": None})
+                            self._add_stats(stats, pending_stats["hits"], pending_stats["misses"], pending_stats["last_success"])
+                        self._trim(entry)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "entries": merged}, f)
+                os.replace(tmp_path, self.path)
+            self.entries = merged
+            self.pending = {}
+            self.dirty = False
+        except IOError as e:
+            print(f"[WARN] Failed to save selector cache: {e}")
+
+
+def find_element_for_selector(dom: dict, selector: str):
+    """Find the snapshot element the selector was taken from."""
+    for el in dom.get("elements", []):
+        if selector in (el.get("preferred_locators") or []):
+            return el
+    return None
@@ -0,0 +1,98 @@
+# === tools/snapshot_store.py ===
+import gzip
+import hashlib
+import json
+import os
+import zlib
+
+SNAPSHOT_FILE = "dom_flow_output.jsonl.gz"
+
+
+def element_hash(el: dict) -> str:
+    return hashlib.sha1(json.dumps(el, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class SnapshotStore:
+    """
+    Append-only DOM snapshot log. Each append writes one gzip member holding the elements
+    not seen before ("element" records) followed by the snapshot itself, which refers to
+    its elements by content hash. A crash loses at most the step being written.
+    """
+
+    def __init__(self, path: str, reset: bool = True):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if reset and os.path.exists(path):
+            os.remove(path)
+        self.known = set()
+        self.snapshot_count = 0
+        self.element_count = 0
+
+    def append(self, dom: dict, step: int = None) -> None:
+        lines, refs = [], []
+        for el in dom.get("elements", []):
+            h = element_hash(el)
+            refs.append(h)
+            if h not in self.known:
+                self.known.add(h)
+                lines.append(json.dumps({"type": "element", "hash": h, "element": el}, ensure_ascii=False))
+        snapshot = {key: value for key, value in dom.items() if key != "elements"}
+        lines.append(json.dumps({"type": "snapshot", "step": step, **snapshot, "elements": refs}, ensure_ascii=False))
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.snapshot_count += 1
+        self.element_count += len(refs)
+
+    def stats(self) -> dict:
+        return {
+            "snapshots": self.snapshot_count,
+            "elements": self.element_count,
+            "unique_elements": len(self.known),
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+def _records(path: str):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (EOFError, zlib.error, json.JSONDecodeError) as e:
+        # Truncated last member after a crash: everything before it is still valid
+        print(f"[WARN] Snapshot store {path} ends early: {e}")
+
+
+def iter_snapshots(path: str):
+    """Stream snapshots with their elements restored. Only unique elements are held in memory."""
+    elements = {}
+    for record in _records(path):
+        if record.get("type") == "element":
+            elements[record["hash"]] = record["element"]
+        elif record.get("type") == "snapshot":
+            snapshot = {key: value for key, value in record.items() if key != "type"}
+            snapshot["elements"] = [elements[h] for h in record.get("elements", []) if h in elements]
+            yield snapshot
+
+
+def iter_unique_elements(path: str):
+    """Each distinct element once, without rebuilding snapshots."""
+    for record in _records(path):
+        if record.get("type") == "element":
+            yield record["element"]
+
+
+class SnapshotReader:
+    """Lazy, re-iterable view of a snapshot store, usable wherever a list of snapshots was."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self):
+        return iter_snapshots(self.path)
+
+    def __bool__(self) -> bool:
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def unique_elements(self):
+        return iter_unique_elements(self.path)
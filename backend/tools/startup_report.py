@@ -0,0 +1,100 @@
+# === tools/startup_report.py ===
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULE = "agents.qa_agent"  # Everything main.py loads before the first prompt
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "0"))  # 0 disables the budget check
+# Dependencies that should only be imported on first use
+LAZY_PACKAGES = {
+    "playwright", "langchain_anthropic", "langchain_google_genai", "langchain_core", "openai",
+    "anthropic", "google", "black", "streamlit",
+}
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def measure_imports(module: str = STARTUP_MODULE, python: str = None) -> dict:
+    """Import `module` in a fresh interpreter with -X importtime and parse the per-module costs."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": max(0, (len(indent) - 1) // 2),
+            })
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {"module": module, "wall_ms": round(wall_ms, 1), "modules": modules, "error": error}
+
+
+def summarize_imports(measurement: dict, top: int = 15) -> dict:
+    modules = measurement["modules"]
+    by_package = {}
+    for entry in modules:
+        package = entry["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_ms"]
+    import_ms = sum(entry["cumulative_ms"] for entry in modules if entry["depth"] == 0)
+    return {
+        "module": measurement["module"],
+        "process_wall_ms": measurement["wall_ms"],
+        "import_ms": round(import_ms, 1),
+        "modules_loaded": len(modules),
+        "slowest_modules": sorted(modules, key=lambda e: -e["cumulative_ms"])[:top],
+        "packages": sorted(({"package": p, "self_ms": round(ms, 1)} for p, ms in by_package.items()),
+                           key=lambda row: -row["self_ms"])[:top],
+        "eager_heavy_packages": sorted(p for p in by_package if p in LAZY_PACKAGES),
+        "error": measurement["error"],
+    }
+
+
+def print_startup_report(module: str = STARTUP_MODULE, top: int = 15, budget_ms: float = STARTUP_BUDGET_MS) -> int:
+    """Print the import-cost report; returns a non-zero status when over budget or a lazy package loads eagerly."""
+    summary = summarize_imports(measure_imports(module), top)
+    print(f"[INFO] Startup import of '{module}': {summary['import_ms']:.1f} ms in imports, "
+          f"{summary['process_wall_ms']:.1f} ms process wall time, {summary['modules_loaded']} modules.")
+    if summary["error"]:
+        print(f"[WARN] Import failed: {summary['error']}")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for entry in summary["slowest_modules"]:
+        print(f"{entry['cumulative_ms']:>14.1f} {entry['self_ms']:>9.1f}  {'  ' * entry['depth']}{entry['module']}")
+    print(f"\n{'self ms':>9}  package")
+    for row in summary["packages"]:
+        print(f"{row['self_ms']:>9.1f}  {row['package']}")
+
+    status = 0
+    if summary["eager_heavy_packages"]:
+        print(f"\n[WARN] Loaded at startup but meant to be lazy: {', '.join(summary['eager_heavy_packages'])}")
+        status = 1
+    if budget_ms and summary["import_ms"] > budget_ms:
+        print(f"[WARN] Startup imports take {summary['import_ms']:.1f} ms, over the {budget_ms:.0f} ms budget.")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import cost of the CLI startup path.")
+    parser.add_argument("--module", default=STARTUP_MODULE)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+    if args.json:
+        print(json.dumps(summarize_imports(measure_imports(args.module), args.top), indent=4))
+        sys.exit(0)
+    sys.exit(print_startup_report(args.module, args.top, args.budget_ms))
@@ -0,0 +1,229 @@
+# === tools/step_profile.py ===
+"""
+Per-step timing profile of navigator flows.
+
+Every step of ai_guided_flow_navigator records where its wall time went ("step_timing" on the
+step's first actions_log entry), and the log ends with one "flow_profile" entry summarizing the
+flow. This module also aggregates many logs into percentile tables per phase:
+
+    cd backend
+    python -m tools.step_profile                         # every actions_log.json under RUNS_FOLDER
+    python -m tools.step_profile path/to/actions_log.json other/actions_log.json --json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from run_context import LATEST_LINK, RUNS_FOLDER
+
+# Exclusive phases of one step, in the order they happen
+PHASES = (
+    "ready_ms",        # settle delay and waiting for the page to go network-idle
+    "fingerprint_ms",  # in-page fingerprint that decides whether to re-extract
+    "extract_ms",      # DOM extraction and snapshot write
+    "prompt_ms",       # relevance pruning and prompt assembly
+    "llm_ms",          # LLM round-trip
+    "parse_ms",        # parsing the LLM answer into actions
+    "action_ms",       # executing the actions and assertions, including element readiness waits
+    "retry_wait_ms",   # back-off sleeps between failed action attempts
+)
+PROFILE_ENTRY_TYPE = "flow_profile"
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StepTimer:
+    """
+    Wall-clock breakdown of one navigator step. Phases are exclusive: time spent in a nested
+    phase (e.g. the readiness wait inside DOM extraction) is counted only for the inner one.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.retries = 0
+        self._nested = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield self
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.phases[name] += elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def add(self, name: str, ms: float) -> None:
+        """Time measured by the caller, e.g. a stretch of code that does not fit a `with` block."""
+        self.phases[name] += ms
+        if self._nested:
+            self._nested[-1] += ms
+
+    def move(self, source: str, target: str, ms: float) -> None:
+        """Re-attribute time already counted in `source`, e.g. retry back-off measured inside an action."""
+        ms = min(ms or 0.0, self.phases[source])
+        self.phases[source] -= ms
+        self.phases[target] += ms
+
+    def add_action(self, result: dict) -> None:
+        """Fold an execute_action timing breakdown into the step: retries and their back-off."""
+        timing = result.get("timing") or {}
+        self.retries += max(0, timing.get("attempts", 1) - 1) + timing.get("fallbacks_tried", 0)
+        self.move("action_ms", "retry_wait_ms", timing.get("backoff_ms", 0.0))
+
+    def as_dict(self) -> dict:
+        total = (time.perf_counter() - self.started) * 1000
+        phases = {name: round(ms, 1) for name, ms in self.phases.items()}
+        return {"total_ms": round(total, 1), **phases,
+                "other_ms": round(max(0.0, total - sum(self.phases.values())), 1), "retries": self.retries}
+
+
+def percentile(values: list, pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def phase_table(step_timings: list) -> dict:
+    """Per phase: count, total, mean, percentiles, max and share of the summed step time."""
+    all_phases = PHASES + ("other_ms",)
+    grand_total = sum(timing.get("total_ms", 0) for timing in step_timings) or 1
+    table = {}
+    for name in all_phases + ("total_ms",):
+        values = [timing.get(name, 0.0) for timing in step_timings]
+        if not values:
+            continue
+        row = {"count": len(values), "total_ms": round(sum(values), 1), "mean_ms": round(sum(values) / len(values), 1)}
+        row.update({f"p{pct}_ms": round(percentile(values, pct), 1) for pct in PERCENTILES})
+        row["max_ms"] = round(max(values), 1)
+        row["share"] = round(sum(values) / grand_total, 3)
+        table[name] = row
+    return table
+
+
+def flow_profile_entry(step_timings: list, flow_started: float) -> dict:
+    """The summary entry appended at the end of actions_log."""
+    return {
+        "action_type": PROFILE_ENTRY_TYPE,
+        "description": "Timing profile of this flow",
+        "steps": len(step_timings),
+        "wall_ms": round((time.perf_counter() - flow_started) * 1000, 1),
+        "retries": sum(timing.get("retries", 0) for timing in step_timings),
+        "phases": phase_table(step_timings),
+    }
+
+
+def is_profile_entry(entry: dict) -> bool:
+    return isinstance(entry, dict) and entry.get("action_type") == PROFILE_ENTRY_TYPE
+
+
+def flow_actions(actions_log: list) -> list:
+    """The log without its profile summary, i.e. only what happened in the flow."""
+    return [entry for entry in actions_log if not is_profile_entry(entry)]
+
+
+def collect_timings(paths: list) -> dict:
+    """Step timings and per-action execution times from many logs; entries replayed from the auth cache are skipped."""
+    steps, actions, flows, unprofiled = [], {}, [], []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                log = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[WARN] Skipping unreadable log {path}: {e}")
+            continue
+        if not isinstance(log, list):
+            continue
+        profiled = False
+        for entry in log:
+            if is_profile_entry(entry):
+                flows.append({"path": path, "steps": entry.get("steps"), "wall_ms": entry.get("wall_ms"),
+                              "retries": entry.get("retries")})
+                continue
+            if not isinstance(entry, dict) or entry.get("from_auth_cache"):
+                continue
+            if entry.get("step_timing"):
+                steps.append(entry["step_timing"])
+                profiled = True
+            timing = entry.get("timing") or {}
+            if timing.get("total_ms") is not None:
+                actions.setdefault(entry.get("action_type") or "unknown", []).append(timing["total_ms"])
+        if not profiled:
+            unprofiled.append(path)
+    return {"steps": steps, "actions": actions, "flows": flows, "unprofiled": unprofiled}
+
+
+def build_report(paths: list) -> dict:
+    collected = collect_timings(paths)
+    action_table = {}
+    for action_type, values in sorted(collected["actions"].items()):
+        row = {"count": len(values), "mean_ms": round(sum(values) / len(values), 1)}
+        row.update({f"p{pct}_ms": round(percentile(values, pct), 1) for pct in PERCENTILES})
+        row["max_ms"] = round(max(values), 1)
+        action_table[action_type] = row
+    flow_walls = [flow["wall_ms"] for flow in collected["flows"] if flow.get("wall_ms") is not None]
+    return {
+        "logs": len(paths),
+        "profiled_steps": len(collected["steps"]),
+        "unprofiled_logs": collected["unprofiled"],
+        "flows": {"count": len(flow_walls),
+                  **({f"p{pct}_ms": round(percentile(flow_walls, pct), 1) for pct in PERCENTILES} if flow_walls else {})},
+        "phases": phase_table(collected["steps"]),
+        "actions": action_table,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"[INFO] {report['logs']} logs, {report['profiled_steps']} profiled steps, {report['flows']['count']} flow summaries.")
+    if report["unprofiled_logs"]:
+        print(f"[INFO] {len(report['unprofiled_logs'])} logs predate step profiling and only count towards the action table.")
+    columns = ["count", "mean_ms"] + [f"p{pct}_ms" for pct in PERCENTILES] + ["max_ms"]
+    header = "".join(f"{column.replace('_ms', ''):>10}" for column in columns)
+    if report["phases"]:
+        print(f"\n{'phase':<16}{header}{'share':>8}")
+        for name, row in report["phases"].items():
+            share = f"{row['share']:.0%}" if name != "total_ms" else ""
+            print(f"{name.replace('_ms', ''):<16}" + "".join(f"{row[c]:>10}" for c in columns) + f"{share:>8}")
+    if report["actions"]:
+        print(f"\n{'action':<16}{header}")
+        for name, row in report["actions"].items():
+            print(f"{name:<16}" + "".join(f"{row[c]:>10}" for c in columns))
+
+
+def find_logs(runs_folder: str) -> list:
+    """actions_log.json of every run; the `latest` link and other symlinked runs would count a run twice."""
+    if not os.path.isdir(runs_folder):
+        return []
+    paths = []
+    for entry in os.scandir(runs_folder):
+        if entry.is_dir(follow_symlinks=False) and entry.name != LATEST_LINK:
+            paths.extend(glob.glob(os.path.join(entry.path, "*", "actions_log.json")))
+    return sorted(paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Percentile tables of where navigator flows spend their time.")
+    parser.add_argument("logs", nargs="*", help="actions_log.json files (default: every run under --runs-folder)")
+    parser.add_argument("--runs-folder", default=RUNS_FOLDER)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    paths = args.logs or find_logs(args.runs_folder)
+    if not paths:
+        print(f"[WARN] No actions_log.json found under {args.runs_folder}.")
+        sys.exit(1)
+    report = build_report(paths)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
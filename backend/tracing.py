@@ -0,0 +1,249 @@
+# === tracing.py ===
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "json")  # json | otlp | both | off
+TRACE_SUMMARY_ROWS = int(os.getenv("TRACE_SUMMARY_ROWS", "15"))
+SERVICE_NAME = "ai_test_assistant"
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent: "Span" = None, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.path = f"{parent.path};{name}" if parent else name
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "ok"
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "path": self.path,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class _NoopSpan:
+    """Returned when no trace is active, so instrumented code costs next to nothing."""
+    def set(self, **attributes) -> None:
+        pass
+
+    def event(self, name: str, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.spans = []
+
+
+class span:
+    """
+    Nested timing span: `with span("dom.extract", step=3) as s: ... s.set(element_count=n)`.
+    Parents follow contextvars, so spans opened in tasks created by asyncio.gather nest correctly.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = NOOP_SPAN
+        self._token = None
+
+    def __enter__(self):
+        trace = _current_trace.get()
+        if trace is None:
+            return NOOP_SPAN
+        self.span = Span(trace, self.name, _current_span.get(), self.attributes)
+        trace.spans.append(self.span)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is None:
+            return False
+        self.span.end_ns = time.time_ns()
+        if exc is not None:
+            self.span.status = "error"
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        return False
+
+
+def traced(name: str = None, **attributes):
+    """Decorator form of span() for async functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name or fn.__qualname__, **attributes):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def active_trace():
+    return _current_trace.get()
+
+
+class start_trace:
+    """Activate a trace with a root span for the duration of the block; nested calls reuse the active trace."""
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.trace = None
+        self._tokens = None
+        self._root = None
+
+    def __enter__(self):
+        if _current_trace.get() is not None:
+            self.trace = _current_trace.get()
+            return self.trace
+        self.trace = Trace(self.name, **self.attributes)
+        self._tokens = _current_trace.set(self.trace)
+        self._root = span(self.name, **self.attributes)
+        self._root.__enter__()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._tokens is None:
+            return False
+        self._root.__exit__(exc_type, exc, tb)
+        _current_trace.reset(self._tokens)
+        return False
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+
+def to_otlp(trace: Trace) -> dict:
+    """OTLP/JSON (ExportTraceServiceRequest) body, accepted by the OpenTelemetry collector's file and HTTP receivers."""
+    spans = []
+    for s in trace.spans:
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()],
+            "events": [
+                {"timeUnixNano": str(e["time_ns"]), "name": e["name"],
+                 "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in e["attributes"].items()]}
+                for e in s.events
+            ],
+            "status": {"code": 2, "message": s.error} if s.status == "error" else {"code": 1},
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+    }]}
+
+
+def flame_summary(trace: Trace) -> list:
+    """
+    Aggregate spans by call path: count, total and self time (total minus direct children).
+    Returned as rows sorted by self time, the flame-graph view of where the run went.
+    """
+    children_ms = {}
+    for s in trace.spans:
+        if s.parent_id:
+            children_ms[s.parent_id] = children_ms.get(s.parent_id, 0) + s.duration_ms
+    rows = {}
+    for s in trace.spans:
+        row = rows.setdefault(s.path, {"path": s.path, "count": 0, "total_ms": 0.0, "self_ms": 0.0, "errors": 0})
+        row["count"] += 1
+        row["total_ms"] += s.duration_ms
+        # Children of concurrent gathers can overlap, so self time never goes below zero
+        row["self_ms"] += max(0.0, s.duration_ms - children_ms.get(s.span_id, 0))
+        row["errors"] += s.status == "error"
+    return sorted(rows.values(), key=lambda r: -r["self_ms"])
+
+
+def folded_stacks(rows: list) -> str:
+    """Self time per path in the folded format read by flamegraph.pl and speedscope (microseconds)."""
+    return "\n".join(f"{row['path']} {int(row['self_ms'] * 1000)}" for row in rows if row["self_ms"] > 0)
+
+
+def print_summary(rows: list, limit: int = TRACE_SUMMARY_ROWS) -> None:
+    print(f"[INFO] Trace summary (top {limit} by self time):")
+    print(f"{'self ms':>12} {'total ms':>12} {'count':>6}  path")
+    for row in rows[:limit]:
+        print(f"{row['self_ms']:>12.1f} {row['total_ms']:>12.1f} {row['count']:>6}  {row['path']}")
+
+
+def export_trace(trace: Trace, folder: str, mode: str = TRACE_EXPORT) -> list:
+    """Write the trace into `folder` as trace.json and/or trace.otlp.json, plus trace.folded. Returns the paths."""
+    if not trace or mode == "off" or not trace.spans:
+        return []
+    os.makedirs(folder, exist_ok=True)
+    rows = flame_summary(trace)
+    written = []
+    if mode in ("json", "both"):
+        path = os.path.join(folder, "trace.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "trace_id": trace.trace_id, "name": trace.name, "attributes": trace.attributes,
+                "spans": [s.to_dict() for s in trace.spans], "summary": rows,
+            }, f, indent=2, default=str)
+        written.append(path)
+    if mode in ("otlp", "both"):
+        path = os.path.join(folder, "trace.otlp.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(to_otlp(trace), f, default=str)
+        written.append(path)
+    path = os.path.join(folder, "trace.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(folded_stacks(rows) + "\n")
+    written.append(path)
+    print_summary(rows)
+    return written
@@ -0,0 +1,197 @@
+# === worker.py ===
+"""
+Worker processes for the distributed job queue (see job_queue.py and coordinator.py).
+
+    cd backend
+    python worker.py --processes 4                  # 4 local workers on JOB_QUEUE_URL
+    python worker.py --processes 2 --kinds scrape   # e.g. a node that only runs browsers
+
+Each process leases one job at a time, keeps the lease alive with heartbeats while it runs,
+and on success stores the result and enqueues the flow's next job in the same transaction.
+Workers on other machines only need the same JOB_QUEUE_URL and RUNS_FOLDER on a shared filesystem.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+
+os.environ.setdefault("SCRAPE_HEADLESS", "1")  # no one is watching a worker's browser
+
+from job_queue import JOB_LEASE_SECONDS, new_job, open_queue
+from run_context import RunContext
+from tools.browser_pool import BrowserPool
+from tools.selector_cache import SelectorCache
+from tracing import export_trace, start_trace
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+JOB_KINDS = ["scrape", "generate", "execute"]
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+
+class Worker:
+    """Leases and runs jobs in one process, with a warm browser and selector cache shared by its jobs."""
+
+    def __init__(self, queue, kinds: list = None, worker_id: str = None, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_seconds: float = WORKER_POLL_SECONDS):
+        self.queue = queue
+        self.kinds = kinds or JOB_KINDS
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.browser_pool = BrowserPool(headless=True)  # launched by the first scrape job
+        self.selector_cache = SelectorCache()
+        self.processed = 0
+
+    async def run(self, max_jobs: int = None, exit_when_idle: bool = False) -> int:
+        print(f"[INFO] Worker {self.worker_id} started for {', '.join(self.kinds)} jobs.")
+        try:
+            while max_jobs is None or self.processed < max_jobs:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id, self.kinds, self.lease_seconds)
+                if job is None:
+                    if exit_when_idle:
+                        break
+                    await asyncio.sleep(self.poll_seconds)
+                    continue
+                await self.process(job)
+                self.processed += 1
+        finally:
+            await self.browser_pool.close()
+            self.selector_cache.save()
+        return self.processed
+
+    async def process(self, job: dict) -> None:
+        print(f"[INFO] Worker {self.worker_id} took {job['kind']} job {job['job_id'][:8]} "
+              f"of flow {job['flow_id']} (attempt {job['attempts']}/{job['max_attempts']}).")
+        task = asyncio.ensure_future(self._execute(job))
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, task))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            print(f"[WARN] Lost the lease on job {job['job_id'][:8]}, another worker will retry it.")
+            return
+        except Exception as e:
+            status = await asyncio.to_thread(self.queue.fail, job["job_id"], self.worker_id, f"{type(e).__name__}: {e}")
+            print(f"[ERROR] {job['kind']} job {job['job_id'][:8]} raised: {e} -> {status or 'lease lost'}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        follow_ups = []
+        if result.get("follow_up"):
+            payload = {**job["payload"], "upstream": result["follow_up"]["upstream"]}
+            follow_ups.append(new_job(result["follow_up"]["kind"], job["flow_id"], payload, job["max_attempts"]))
+        stored = {"outputs": result["outputs"], "failed": result["failed"], "report": result["report"],
+                  "worker_id": self.worker_id}
+        if not await asyncio.to_thread(self.queue.complete, job["job_id"], self.worker_id, stored, follow_ups):
+            print(f"[WARN] Job {job['job_id'][:8]} finished after its lease expired, the result was discarded.")
+            return
+        next_job = f", queued the {follow_ups[0]['kind']} job" if follow_ups else ""
+        print(f"[INFO] {job['kind']} job {job['job_id'][:8]} {'failed' if result['failed'] else 'done'}{next_job}.")
+
+    async def _heartbeat(self, job: dict, task: asyncio.Future) -> None:
+        while not task.done():
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job["job_id"], self.worker_id, self.lease_seconds):
+                task.cancel()
+                return
+
+    async def _execute(self, job: dict) -> dict:
+        from agents.test_scripts_generator_agent import run_pipeline_job
+
+        payload = job["payload"]
+        run_context = RunContext(run_id=job["flow_id"], runs_folder=payload["runs_folder"],
+                                 browser_pool=self.browser_pool, selector_cache=self.selector_cache)
+        with start_trace(f"job.{job['kind']}", run_id=job["flow_id"], worker_id=self.worker_id,
+                         attempt=job["attempts"]) as trace:
+            result = await run_pipeline_job(job["kind"], payload["prompt"], payload["llm_provider"], run_context,
+                                            upstream=payload.get("upstream"))
+        export_trace(trace, os.path.join(run_context.root, "traces", job["kind"]))
+        return result
+
+
+def worker_process_main(queue_url: str = None, kinds: list = None, lease_seconds: float = JOB_LEASE_SECONDS) -> None:
+    try:
+        asyncio.run(Worker(open_queue(queue_url), kinds, lease_seconds=lease_seconds).run())
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool:
+    """
+    Supervises N local worker processes and restarts the ones that die. A dead worker's job is
+    not lost: its lease runs out and the queue hands the job to another worker.
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, queue_url: str = None, kinds: list = None,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.size = processes
+        self.args = (queue_url, kinds, lease_seconds)
+        # spawn: Playwright and the SQLite connections must not be inherited through fork
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = []
+        self.restarts = 0
+
+    def _spawn(self):
+        process = self.context.Process(target=worker_process_main, args=self.args, daemon=True)
+        process.start()
+        return process
+
+    def start(self) -> "WorkerPool":
+        self.processes = [self._spawn() for _ in range(self.size)]
+        print(f"[INFO] Started {self.size} worker processes.")
+        return self
+
+    def check(self) -> int:
+        """Replace exited workers; returns how many were restarted."""
+        restarted = 0
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                print(f"[WARN] Worker process {process.pid} exited with code {process.exitcode}, restarting it.")
+                self.processes[index] = self._spawn()
+                restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def stop(self, timeout: float = 10) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def run_forever(self, check_seconds: float = 5) -> None:
+        with self:
+            try:
+                while True:
+                    time.sleep(check_seconds)
+                    self.check()
+            except KeyboardInterrupt:
+                print("\n[INFO] Stopping the worker processes...")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--kinds", nargs="+", choices=JOB_KINDS, default=JOB_KINDS, help="Job kinds this node takes")
+    parser.add_argument("--queue", default=None, help="Queue URL, defaults to JOB_QUEUE_URL")
+    parser.add_argument("--lease-seconds", type=float, default=JOB_LEASE_SECONDS)
+    args = parser.parse_args()
+    if args.processes <= 1:
+        worker_process_main(args.queue, args.kinds, args.lease_seconds)
+    else:
+        WorkerPool(args.processes, args.queue, args.kinds, args.lease_seconds).run_forever()
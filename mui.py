@@ -1,95 +1,248 @@
-import streamlit as st
-import asyncio
+import math
 import os
-import uuid
-from datetime import datetime
+import sys
+import time
+
+import streamlit as st
 
-# Dummy placeholders – replace with real implementations
-async def query_gemini(user_prompt: str, dom_data: str) -> str:
-    await asyncio.sleep(1)
-    return f"# AI-generated test script for: {user_prompt}\n# Using DOM: {dom_data}\nprint('Executing automation...')"
+# The UI drives the real backend in-process: jobs run on the resident service loop (backend/service.py),
+# so the page never blocks on a pipeline and several runs can be in flight at once.
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "automation_output")  # one session (run) folder per job
+# Absolute, because the backend later runs with backend/ as its working directory
+os.environ["RUNS_FOLDER"] = RUNS_DIR = os.path.abspath(os.environ.get("RUNS_FOLDER", OUTPUT_DIR))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
 
-async def scrape_dom(prompt: str) -> str:
-    await asyncio.sleep(1)
-    return "//button[1]\n//input[@id='username']\n//input[@id='password']"
+from tools import run_artifacts
 
-def run_code(code: str) -> str:
-    return "✅ Executed successfully.\nLog:\n- Clicked button\n- Entered username\n- Entered password"
+REFRESH_SECONDS = float(os.getenv("UI_REFRESH_SECONDS", "2"))
+LOG_TAIL_LINES = 40
+PAGE_LINES = 200   # lines per page of a log or source file
+PAGE_ROWS = 50     # rows per page of snapshot and element tables
+RESULT_PREVIEW_CHARS = 5000
+PROVIDERS = ["claude", "gemini", "gpt"]
+STATUS_ICONS = {"queued": "⏳", "running": "🔄", "completed": "✅", "failed": "❌", "cancelled": "⛔"}
 
-def generate_allure_report(output_dir: str):
-    report_path = os.path.join(output_dir, "allure_report.html")
-    with open(report_path, "w") as f:
-        f.write("<html><body><h1>Allure Report Placeholder</h1></body></html>")
 
 def is_prompt_valid(prompt: str) -> bool:
     return any(keyword in prompt.lower() for keyword in ["click", "login", "test", "form", "submit", "automation", "visit", "navigate", "example.com"])
 
+
+@st.cache_resource(show_spinner="Starting the automation backend...")
+def get_service():
+    """One service per Streamlit server: its loop, warm browser and LLM clients are shared by all sessions."""
+    os.chdir(BACKEND_DIR)  # the backend keeps its caches relative to its own folder, like main.py
+    from service import QAService
+    service = QAService()
+    service.start()
+    return service
+
+
+def render_job(job) -> None:
+    stages = {}
+    for event in job.events_of("stage"):
+        stages[event["stage"]] = event["status"]
+    snapshots = job.events_of("snapshot")
+    actions = [event["action"] for event in job.events_of("action")]
+    tests = job.events_of("test_results")
+
+    elapsed = (job.finished_at or time.time()) - (job.started_at or job.created_at)
+    st.markdown(f"**{STATUS_ICONS.get(job.status, '')} {job.status}** · run `{job.run_id or '-'}` · "
+                f"{job.llm_provider} · {elapsed:.0f}s")
+    if stages:
+        st.caption(" → ".join(f"{name}: {status}" for name, status in stages.items()))
+
+    col_snapshots, col_actions, col_tests = st.columns(3)
+    col_snapshots.metric("DOM snapshots", snapshots[-1]["snapshots"] if snapshots else 0)
+    col_actions.metric("Actions", len(actions), delta=f"{sum(1 for a in actions if a.get('success') is False)} failed",
+                       delta_color="inverse")
+    col_tests.metric("Tests", (tests[-1]["summary"] or f"exit code {tests[-1]['returncode']}") if tests else "-")
+
+    if snapshots:
+        latest = snapshots[-1]
+        st.caption(f"Latest snapshot: {latest['elements']} elements on {latest['url']}")
+    if actions:
+        st.dataframe(
+            [{"step": a.get("step"), "action": a.get("action_type"), "selector": a.get("selector"),
+              "success": a.get("success"), "description": a.get("description", "")} for a in actions],
+            use_container_width=True, hide_index=True,
+        )
+    if tests:
+        st.caption(f"Allure results: {tests[-1]['allure_results']}")
+
+    logs = job.events_of("log")
+    if logs:
+        with st.expander(f"Log ({len(logs)} lines, last {LOG_TAIL_LINES} shown)"):
+            st.text("\n".join(event["message"] for event in logs[-LOG_TAIL_LINES:]))
+    if job.finished and job.result is not None:
+        with st.expander("Result", expanded=job.status != "completed"):
+            result = str(job.result)
+            st.text(result[:RESULT_PREVIEW_CHARS])
+            if len(result) > RESULT_PREVIEW_CHARS:
+                st.caption(f"{len(result) - RESULT_PREVIEW_CHARS} more characters, browse session {job.run_id} under History.")
+
+
+def render_jobs(service) -> None:
+    job_ids = st.session_state.job_ids
+    if not job_ids:
+        st.info("No runs yet in this session.")
+        return
+    for job_id in reversed(job_ids):
+        job = service.jobs.get(job_id)
+        if job is None:
+            continue  # dropped from the service's history
+        title = job.prompt.strip().splitlines()[0][:90]
+        with st.container(border=True):
+            header, cancel = st.columns([6, 1])
+            header.markdown(f"##### {title}")
+            if not job.finished and cancel.button("Cancel", key=f"cancel_{job_id}"):
+                service.cancel(job)
+            render_job(job)
+
+
+# --- Results browser ---
+# Artifacts are cached per file and modification time, so reruns and reopened sessions reuse what was
+# already read, and nothing is read until the user asks for that artifact.
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_run_index(runs_folder: str, signature: tuple) -> list:
+    return run_artifacts.run_index(runs_folder)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_artifacts(run_dir: str, manifest_mtime: float) -> list:
+    return run_artifacts.list_artifacts(run_dir)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_line_offsets(path: str, mtime: float, size: int) -> list:
+    return run_artifacts.line_offsets(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_page(path: str, mtime: float, size: int, page: int) -> str:
+    offsets = cached_line_offsets(path, mtime, size)
+    return run_artifacts.read_lines(path, offsets, (page - 1) * PAGE_LINES, PAGE_LINES)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_snapshot_index(path: str, mtime: float, size: int) -> list:
+    return run_artifacts.snapshot_index(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_snapshot(path: str, mtime: float, size: int, position: int) -> dict:
+    return run_artifacts.read_snapshot(path, position)
+
+
+def page_picker(label: str, total: int, per_page: int, key: str, last: bool = False) -> int:
+    pages = max(1, math.ceil(total / per_page))
+    if pages == 1:
+        return 1
+    return st.number_input(f"{label} page (of {pages})", min_value=1, max_value=pages, value=pages if last else 1, key=key)
+
+
+def render_text_artifact(path: str, artifact: dict, key: str) -> None:
+    offsets = cached_line_offsets(path, artifact["mtime"], artifact["size"])
+    lines = len(offsets) - 1
+    # Logs are read from the end, sources from the top
+    page = page_picker(f"{lines} lines,", lines, PAGE_LINES, f"{key}_page", last=artifact["path"].endswith(".log"))
+    language = artifact["kind"] if artifact["kind"] not in ("text", "binary") else None
+    st.code(cached_page(path, artifact["mtime"], artifact["size"], page), language=language)
+
+
+def render_snapshot_artifact(path: str, artifact: dict, key: str) -> None:
+    rows = cached_snapshot_index(path, artifact["mtime"], artifact["size"])
+    if not rows:
+        st.info("No snapshots recorded.")
+        return
+    page = page_picker("Snapshot", len(rows), PAGE_ROWS, f"{key}_snap_page")
+    visible = rows[(page - 1) * PAGE_ROWS:page * PAGE_ROWS]
+    st.dataframe(visible, use_container_width=True, hide_index=True)
+    position = st.selectbox("Snapshot", [row["position"] for row in visible], key=f"{key}_snap",
+                            format_func=lambda i: f"#{i} · step {rows[i]['step']} · {rows[i]['url']} ({rows[i]['elements']} elements)")
+    elements = cached_snapshot(path, artifact["mtime"], artifact["size"], position).get("elements", [])
+    element_page = page_picker("Element", len(elements), PAGE_ROWS, f"{key}_el_page_{position}")
+    st.dataframe(
+        [{"tag": el.get("tag"), "text": (el.get("text") or "")[:80], "id": el.get("id"), "name": el.get("name"),
+          "locator": (el.get("preferred_locators") or [None])[0]}
+         for el in elements[(element_page - 1) * PAGE_ROWS:element_page * PAGE_ROWS]],
+        use_container_width=True, hide_index=True,
+    )
+
+
+def render_history() -> None:
+    runs = cached_run_index(RUNS_DIR, run_artifacts.runs_signature(RUNS_DIR))
+    if not runs:
+        st.info(f"No sessions in {RUNS_DIR} yet.")
+        return
+    by_id = {entry["run_id"]: entry for entry in runs}
+    run_id = st.selectbox(
+        "Session", list(by_id),
+        format_func=lambda rid: f"{STATUS_ICONS.get(by_id[rid]['status'], '❔')} {rid} · {by_id[rid]['summary'][:80]}",
+    )
+    entry = by_id[run_id]
+    run_dir = os.path.join(RUNS_DIR, run_id)
+    # A running session still gains files, finished ones are listed once per manifest version
+    artifacts = run_artifacts.list_artifacts(run_dir) if entry["status"] == "running" else cached_artifacts(run_dir, entry["mtime"])
+    st.caption(f"{entry['status']} · {len(artifacts)} files · {run_dir}")
+    for artifact in artifacts:
+        path = os.path.join(run_dir, artifact["path"])
+        key = f"{run_id}/{artifact['path']}"
+        with st.expander(f"{artifact['path']} · {artifact['size'] / 1000:.1f} KB"):
+            # Expander bodies always render, so the contents stay unread until asked for
+            if not st.toggle("Load contents", key=f"{key}_load"):
+                continue
+            if artifact["kind"] == "snapshots":
+                render_snapshot_artifact(path, artifact, key)
+            elif artifact["kind"] == "binary":
+                st.caption("Binary file, not shown.")
+            else:
+                render_text_artifact(path, artifact, key)
+
+
+def jobs_in_flight(service) -> bool:
+    return any(job_id in service.jobs and not service.jobs[job_id].finished for job_id in st.session_state.job_ids)
+
+
 # --- Streamlit UI ---
 st.set_page_config("AI Automation Assistant", layout="wide")
 st.title("AI Test Automation Assistant")
-st.markdown("Automate web testing with Gemini, Playwright & Allure. Just enter a prompt:")
+st.markdown("Automate web testing with Claude or Gemini, Playwright & Allure. Just enter a prompt:")
 
-# Prompt Input
-prompt = st.text_area("Test Prompt", height=150, placeholder="e.g., Test the login on https://example.com")
-execute = st.button("Execute")
+service = get_service()
+st.session_state.setdefault("job_ids", [])
 
-# Validate prompt
-if prompt and not is_prompt_valid(prompt):
-    st.warning("⚠️ Prompt doesn't seem automation-related. Please refine it.")
-    st.stop()
+# Prompt Input
+with st.form("new_run", clear_on_submit=True):
+    prompt = st.text_area("Test Prompt", height=150, placeholder="e.g., Test the login on https://example.com")
+    default_provider = service.default_provider if service.default_provider in PROVIDERS else PROVIDERS[0]
+    provider = st.selectbox("LLM provider", PROVIDERS, index=PROVIDERS.index(default_provider))
+    execute = st.form_submit_button("Execute")
 
-# --- Execution Block ---
 if execute and prompt:
-    with st.spinner("Running full automation pipeline..."):
-
-        # Create unique session directory
-        session_id = str(uuid.uuid4())[:8]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_dir = os.path.join("automation_output", f"{timestamp}_{session_id}")
-        os.makedirs(session_dir, exist_ok=True)
-
-        # Step 1: Scrape DOM
-        dom_data = asyncio.run(scrape_dom(prompt))
-        dom_file = os.path.join(session_dir, "dom_selectors.txt")
-        with open(dom_file, "w") as f:
-            f.write(dom_data)
-
-        # Show DOM
-        with st.expander("Scraped DOM Elements"):
-            st.code(dom_data, language="text")
-
-        # Step 2: Generate code using Gemini
-        code = asyncio.run(query_gemini(prompt, dom_data))
-        code_file = os.path.join(session_dir, "test_script.py")
-        with open(code_file, "w") as f:
-            f.write(code)
-
-        # Step 3: Run the code (mocked)
-        result = run_code(code)
-
-        # Step 4: Generate report
-        report_path = os.path.join(session_dir, "report.txt")
-        with open(report_path, "w") as f:
-            f.write(f"Prompt:\n{prompt}\n\nGenerated Code:\n{code}\n\nExecution Result:\n{result}")
-
-        # Step 5: Allure Report (mock)
-        generate_allure_report(session_dir)
-
-    # Display Results
-    st.success("✅ Automation completed.")
-
-    st.subheader("Generated Code")
-    st.code(code, language="python")
-
-    st.subheader("Execution Log")
-    st.text(result)
-
-    st.subheader("Report")
-    with open(report_path) as f:
-        st.text(f.read())
-
-    st.subheader("Allure Report (HTML)")
-    st.markdown(f"[📄 Open Allure Report]({session_dir}/allure_report.html)", unsafe_allow_html=True)
+    if not is_prompt_valid(prompt):
+        st.warning("⚠️ Prompt doesn't seem automation-related. Please refine it.")
+    else:
+        # Returns immediately: the job runs on the service loop and reports progress through its events
+        job = service.submit(prompt, provider)
+        st.session_state.job_ids.append(job.job_id)
+
+runs_tab, history_tab = st.tabs(["Runs", "History"])
+with history_tab:
+    render_history()
+with runs_tab:
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is not None:
+        # Only this part of the page reruns on the timer, the prompt form stays usable meanwhile
+        fragment(run_every=REFRESH_SECONDS)(render_jobs)(service)
+    else:
+        render_jobs(service)
+        if jobs_in_flight(service):
+            time.sleep(REFRESH_SECONDS)
+            st.rerun()
 
 # Footer
 st.markdown("---")